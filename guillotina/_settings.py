@@ -12,6 +12,15 @@ app_settings: Dict[str, Any] = {
     "databases": [],
     "storages": {},
     "conflict_retry_attempts": 3,
+    "conflict_retry": {
+        "backoff": 0.01,
+        "max_backoff": 0.5,
+        "hot_spot_threshold": 3,
+        "hot_spot_window": 10,
+        "serialize_hot_spots": True,
+        "hot_spot_lock_timeout": 5,
+        "max_tracked": 1000
+    },
     "host": "127.0.0.1",
     "port": 8080,
     "static": {},
@@ -27,11 +36,29 @@ app_settings: Dict[str, Any] = {
             "provides": "guillotina.interfaces.IAsyncJobPool",
             "factory": "guillotina.async_util.AsyncJobPool",
             "settings": {
-                "max_size": 5
+                "max_size": 5,
+                "queues": {
+                    "catalog": 2
+                }
             }
         }
     },
     "store_json": True,
+    "memory_cache": {
+        "max_size": 1024 * 1024 * 200
+    },
+    "blob_prefetch_chunks": 2,
+    "json_backend": "json",
+    "acl_cache": {
+        "max_size": 10000
+    },
+    "principal_cache": {
+        "max_size": 1000,
+        "ttl": 60
+    },
+    "websockets": {
+        "max_concurrent_frames": 10
+    },
     "root_user": {
         "password": ""
     },
@@ -66,7 +93,8 @@ app_settings: Dict[str, Any] = {
         'shell': 'guillotina.commands.shell.ShellCommand',
         'testdata': 'guillotina.commands.testdata.TestDataCommand',
         'initialize-db': 'guillotina.commands.initialize_db.DatabaseInitializationCommand',
-        'run': 'guillotina.commands.run.RunCommand'
+        'run': 'guillotina.commands.run.RunCommand',
+        'bench': 'guillotina.commands.bench.BenchCommand'
     },
     "json_schema_definitions": {},  # json schemas available to reference in docs
     "default_layer": interfaces.IDefaultLayer,
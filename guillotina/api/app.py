@@ -2,8 +2,12 @@ from guillotina import component
 from guillotina import configure
 from guillotina._settings import app_settings
 from guillotina.component import get_multi_adapter
+from guillotina.component import query_utility
+from guillotina.db.conflicts import conflict_tracker
 from guillotina.interfaces import IApplication
+from guillotina.interfaces import IAsyncJobPool
 from guillotina.interfaces import IResourceSerializeToJson
+from guillotina.response import HTTPPreconditionFailed
 from guillotina.utils import get_dotted_name
 
 
@@ -55,3 +59,25 @@ async def get_all_subscribers(context, request):
             subscribers[resource][event] = []
         subscribers[resource][event].append(handler)
     return subscribers
+
+
+@configure.service(
+    context=IApplication, method='GET',
+    name='@conflicts',
+    permission='guillotina.GetDatabases',
+    summary='Get conflict error and retry statistics of the process')
+async def get_conflicts(context, request):
+    return conflict_tracker.get_metrics()
+
+
+@configure.service(
+    context=IApplication, method='GET',
+    name='@async-jobs',
+    permission='guillotina.GetDatabases',
+    summary='Get job pool statistics of the process')
+async def get_async_jobs(context, request):
+    pool = query_utility(IAsyncJobPool)
+    if pool is None:
+        raise HTTPPreconditionFailed(content={
+            'reason': 'No job pool configured'})
+    return pool.get_metrics()
@@ -1,5 +1,8 @@
+from aiohttp.web import StreamResponse
+from collections import OrderedDict
 from guillotina import configure
 from guillotina import error_reasons
+from guillotina import glogging
 from guillotina import security
 from guillotina._cache import FACTORY_CACHE
 from guillotina._settings import app_settings
@@ -13,16 +16,21 @@ from guillotina.content import create_content_in_container
 from guillotina.content import get_all_behavior_interfaces
 from guillotina.content import get_all_behaviors
 from guillotina.content import get_cached_factory
+from guillotina.content import prefetch_behavior_annotations
+from guillotina.db.conflicts import conflict_tracker
 from guillotina.event import notify
 from guillotina.events import BeforeObjectMovedEvent
 from guillotina.events import BeforeObjectRemovedEvent
 from guillotina.events import ObjectAddedEvent
 from guillotina.events import ObjectDuplicatedEvent
+from guillotina.events import ObjectLoadedEvent
 from guillotina.events import ObjectModifiedEvent
 from guillotina.events import ObjectMovedEvent
 from guillotina.events import ObjectPermissionsViewEvent
 from guillotina.events import ObjectRemovedEvent
 from guillotina.events import ObjectVisitedEvent
+from guillotina.exceptions import ConflictError
+from guillotina.exceptions import ConflictIdOnContainer
 from guillotina.exceptions import PreconditionFailed
 from guillotina.i18n import default_message_factory as _
 from guillotina.interfaces import IAbsoluteURL
@@ -30,6 +38,7 @@ from guillotina.interfaces import IAnnotations
 from guillotina.interfaces import IAsyncContainer
 from guillotina.interfaces import IConstrainTypes
 from guillotina.interfaces import IContainer
+from guillotina.interfaces import IErrorResponseException
 from guillotina.interfaces import IFolder
 from guillotina.interfaces import IGetOwner
 from guillotina.interfaces import IIDGenerator
@@ -45,6 +54,9 @@ from guillotina.interfaces import IResponse
 from guillotina.interfaces import IRolePermissionMap
 from guillotina.json.utils import convert_interfaces_to_schema
 from guillotina.profile import profilable
+from guillotina.renderers import STREAM_CONTENT_TYPES
+from guillotina.renderers import JSONStream
+from guillotina.renderers import json_dumps
 from guillotina.response import ErrorResponse
 from guillotina.response import HTTPMethodNotAllowed
 from guillotina.response import HTTPMovedPermanently
@@ -52,6 +64,7 @@ from guillotina.response import HTTPNotFound
 from guillotina.response import HTTPUnauthorized
 from guillotina.response import Response
 from guillotina.security.utils import apply_sharing
+from guillotina.transactions import get_tm
 from guillotina.transactions import get_transaction
 from guillotina.utils import get_authenticated_user_id
 from guillotina.utils import get_object_by_oid
@@ -60,6 +73,19 @@ from guillotina.utils import iter_parents
 from guillotina.utils import navigate_to
 from guillotina.utils import valid_id
 
+import asyncio
+import base64
+import json
+import uuid
+
+
+logger = glogging.getLogger('guillotina')
+
+# number of resources committed together by @batch-create
+BATCH_CREATE_CHUNK_SIZE = 100
+# number of resources loaded at a time when @items is streamed
+ITEMS_STREAM_PAGE_SIZE = 100
+
 
 def get_content_json_schema_responses(content):
     return {
@@ -108,6 +134,13 @@ async def default_head(context, request):
         "name": "omit",
         "in": "query",
         "type": "string"
+    }, {
+        "name": "stream",
+        "in": "query",
+        "type": "string",
+        "enum": ["json", "ndjson"],
+        "description": "Stream all the items of a folder, as part of the json object "
+                       "or as newline delimited json"
     }])
 class DefaultGET(Service):
     @profilable
@@ -120,6 +153,12 @@ class DefaultGET(Service):
             include = self.request.query.get('include').split(',')
         if self.request.query.get('omit'):
             omit = self.request.query.get('omit').split(',')
+        stream_format = get_stream_format(self.request)
+        if stream_format is not None and hasattr(serializer, 'stream'):
+            resp = await serializer.stream(
+                JSONStream(self.request, stream_format), include=include, omit=omit)
+            await notify(ObjectVisitedEvent(self.context))
+            return resp
         try:
             result = await serializer(include=include, omit=omit)
         except TypeError:
@@ -148,10 +187,8 @@ class DefaultGET(Service):
     })
 class DefaultPOST(Service):
 
-    @profilable
-    async def __call__(self):
-        """To create a content."""
-        data = await self.get_data()
+    async def add_content(self, data):
+        """Create content inside of the context from the provided data."""
         type_ = data.get('@type', None)
         id_ = data.get('id', None)
         behaviors = data.get('@behaviors', None)
@@ -190,7 +227,7 @@ class DefaultPOST(Service):
             obj = await create_content_in_container(
                 self.context, type_, new_id, **options)
         except ValueError as e:
-            return ErrorResponse(
+            raise ErrorResponse(
                 'CreatingObject',
                 str(e),
                 status=412)
@@ -202,7 +239,7 @@ class DefaultPOST(Service):
         deserializer = query_multi_adapter((obj, self.request),
                                            IResourceDeserializeFromJson)
         if deserializer is None:
-            return ErrorResponse(
+            raise ErrorResponse(
                 'DeserializationError',
                 'Cannot deserialize type {}'.format(obj.type_name),
                 status=412,
@@ -219,6 +256,13 @@ class DefaultPOST(Service):
 
         data['id'] = obj.id
         await notify(ObjectAddedEvent(obj, self.context, obj.id, payload=data))
+        return obj
+
+    @profilable
+    async def __call__(self):
+        """To create a content."""
+        data = await self.get_data()
+        obj = await self.add_content(data)
 
         absolute_url = query_multi_adapter((obj, self.request), IAbsoluteURL)
 
@@ -766,6 +810,25 @@ async def ids(context, request):
         "in": "query",
         "type": "number",
         "default": 1
+    }, {
+        "name": "cursor",
+        "in": "query",
+        "type": "string",
+        "description": "Continuation token from a previous response to get the next page"
+    }, {
+        "name": "total",
+        "in": "query",
+        "type": "string",
+        "enum": ["exact", "estimate", "none"],
+        "default": "exact",
+        "description": "How to calculate the total number of items"
+    }, {
+        "name": "stream",
+        "in": "query",
+        "type": "string",
+        "enum": ["json", "ndjson"],
+        "description": "Stream all the items, as a json object or as newline delimited json. "
+                       "page_size is then the number of items loaded at a time"
     }],
     responses={
         "200": {
@@ -791,9 +854,57 @@ async def items(context, request):
     if request.query.get('omit'):
         omit = request.query.get('omit').split(',')
 
+    total = request.query.get('total', 'exact')
+    if total not in ('exact', 'estimate', 'none'):
+        raise ErrorResponse(
+            'PreconditionFailed', 'Invalid total, must be exact, estimate or none',
+            status=412, reason=error_reasons.PRECONDITION_FAILED)
+
+    stream_format = get_stream_format(request)
+    if stream_format is not None:
+        if 'page_size' not in request.query:
+            page_size = ITEMS_STREAM_PAGE_SIZE
+        return await stream_items(
+            context, request, JSONStream(request, stream_format),
+            after=decode_cursor(request.query.get('cursor')) or '',
+            page_size=page_size, include=include, omit=omit)
+
+    if 'cursor' in request.query:
+        # keyset pagination does not need to skip over previous pages
+        children = await txn.get_page_of_children(
+            context, after=decode_cursor(request.query['cursor']) or '',
+            page_size=page_size)
+    else:
+        children = await txn.get_page_of_children(
+            context, page=page, page_size=page_size)
+
+    results = await serialize_items(children, request, include, omit)
+
+    result = {
+        'items': results,
+        'total': None,
+        'page_size': page_size,
+        'cursor': None
+    }
+    if total == 'exact':
+        result['total'] = await context.async_len()
+    elif total == 'estimate':
+        result['total'] = await txn.estimate_len(context._p_oid)
+    if 'cursor' not in request.query:
+        result['page'] = page
+    if len(children) > 0 and len(children) == page_size:
+        result['cursor'] = encode_cursor(children[-1]._p_oid)
+    return result
+
+
+async def serialize_items(children, request, include, omit):
+    for ob in children:
+        # like children loaded with `async_get`
+        await notify(ObjectLoadedEvent(ob))
+    # behaviors of all the page are loaded with a single query
+    await prefetch_behavior_annotations(children)
     results = []
-    for key in await txn.get_page_of_keys(context._p_oid, page=page, page_size=page_size):
-        ob = await context.async_get(key)
+    for ob in children:
         serializer = get_multi_adapter(
             (ob, request),
             IResourceSerializeToJson)
@@ -801,13 +912,208 @@ async def items(context, request):
             results.append(await serializer(include=include, omit=omit))
         except TypeError:
             results.append(await serializer())
+    return results
 
-    return {
-        'items': results,
-        'total': await context.async_len(),
-        'page': page,
-        'page_size': page_size
-    }
+
+async def stream_items(context, request, stream, after='', page_size=20,
+                       include=[], omit=[]):
+    '''
+    Write all the children of `context` to `stream`, loading and serializing
+    them a page at a time so memory use does not grow with the folder size
+    '''
+    txn = get_transaction(request)
+    await stream.start()
+    while True:
+        children = await txn.get_page_of_children(
+            context, after=after, page_size=page_size)
+        for result in await serialize_items(children, request, include, omit):
+            await stream.write(result)
+        if len(children) < page_size:
+            break
+        after = children[-1]._p_oid
+    return await stream.finish({'total': stream.count})
+
+
+def get_stream_format(request):
+    stream_format = request.query.get('stream')
+    if stream_format and stream_format not in STREAM_CONTENT_TYPES:
+        raise ErrorResponse(
+            'PreconditionFailed', 'Invalid stream, must be json or ndjson',
+            status=412, reason=error_reasons.PRECONDITION_FAILED)
+    return stream_format or None
+
+
+def encode_cursor(oid):
+    return base64.urlsafe_b64encode(oid.encode('utf-8')).decode('utf-8')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return base64.b64decode(
+            cursor.encode('utf-8'), altchars=b'-_', validate=True).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        raise ErrorResponse(
+            'PreconditionFailed', 'Invalid cursor',
+            status=412, reason=error_reasons.PRECONDITION_FAILED)
+
+
+@configure.service(
+    context=IFolder, method='POST', name="@batch-create",
+    permission='guillotina.AddContent',
+    summary='Create many resources from a stream of newline delimited json',
+    parameters=[{
+        "name": "body",
+        "in": "body",
+        "description": "One AddableResource json object per line"
+    }, {
+        "name": "chunk_size",
+        "in": "query",
+        "type": "number",
+        "default": BATCH_CREATE_CHUNK_SIZE
+    }],
+    responses={
+        "200": {
+            "description": "Stream of newline delimited json results, one per line"
+        }
+    })
+class BatchPOST(DefaultPOST):
+    """
+    Read resources to create incrementally from the request body and commit
+    them in chunks. Results are streamed back once their chunk is committed.
+    """
+
+    async def iter_lines(self):
+        buffer = b''
+        async for data in self.request.content.iter_any():
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                yield line
+        yield buffer
+
+    async def write_results(self, resp, results):
+        for result in results:
+            await resp.write(json_dumps(result) + b'\n')
+        await resp.drain()
+
+    def get_error_result(self, line, exc):
+        if not isinstance(exc, Response):
+            error = query_adapter(exc, IErrorResponseException, kwargs={
+                'error': 'ServiceError',
+                'eid': uuid.uuid4().hex
+            })
+            if error is None:
+                logger.error(f'Error creating content on line {line}', exc_info=exc)
+                error = ErrorResponse('ServiceError', str(exc), status=500)
+            exc = error
+        return {
+            'line': line,
+            'status': exc.status_code,
+            'error': exc.content
+        }
+
+    async def create(self, txn, line, data, pending_ids):
+        '''
+        Add the resource of a line, leaving the transaction as it was when
+        it fails
+        '''
+        added = OrderedDict(txn.added)
+        modified = dict(txn.modified)
+        deleted = dict(txn.deleted)
+        try:
+            obj = await self.add_content(json.loads(data.decode('utf-8')))
+            if obj.id in pending_ids:
+                # not in the database yet so it is not detected on creation
+                raise ConflictIdOnContainer(
+                    f'Duplicate ID: {self.context} -> {obj.id}')
+        except Exception as ex:
+            # do not commit partially created content
+            for registered, snapshot in ((txn.added, added),
+                                         (txn.modified, modified),
+                                         (txn.deleted, deleted)):
+                registered.clear()
+                registered.update(snapshot)
+            return self.get_error_result(line, ex)
+        pending_ids.add(obj.id)
+        return {
+            'line': line,
+            'status': 201,
+            'id': obj.id,
+            '@id': get_object_url(obj, self.request)
+        }
+
+    async def commit(self, txn, pending, retries=0):
+        '''
+        Commit the chunk of (line, data, result) in pending, creating it again
+        once with a new transaction on conflict errors
+        '''
+        tm = get_tm(self.request)
+        results = [result for _, _, result in pending]
+        try:
+            await tm.commit(txn=txn)
+        except ConflictError as ex:
+            conflict_tracker.record_conflict(ex.oids, self.request.path)
+            if retries == 0:
+                conflict_tracker.record_retry(self.request.path)
+                await asyncio.sleep(conflict_tracker.get_retry_delay(retries + 1))
+                txn = await tm.begin(request=self.request)
+                pending_ids = set()
+                retried = []
+                for line, data, result in pending:
+                    if result['status'] == 201:
+                        result = await self.create(txn, line, data, pending_ids)
+                    retried.append((line, data, result))
+                return await self.commit(txn, retried, retries + 1)
+            conflict_tracker.record_exhausted(self.request.path)
+            error = ErrorResponse('ConflictError', str(ex), status=409)
+            results = [self.get_error_result(result['line'], error)
+                       if result['status'] == 201 else result for result in results]
+        except Exception as ex:
+            await tm.abort(txn=txn)
+            results = [self.get_error_result(result['line'], ex)
+                       if result['status'] == 201 else result for result in results]
+        return results, await tm.begin(request=self.request)
+
+    async def __call__(self):
+        try:
+            chunk_size = max(int(self.request.query['chunk_size']), 1)
+        except Exception:
+            chunk_size = BATCH_CREATE_CHUNK_SIZE
+
+        cors_renderer = app_settings['cors_renderer'](self.request)
+        headers = await cors_renderer.get_headers()
+        resp = StreamResponse(headers=headers)
+        resp.content_type = 'application/x-ndjson'
+        await resp.prepare(self.request)
+
+        txn = get_transaction(self.request)
+        pending = []
+        pending_ids = set()
+        created = 0
+        line = 0
+        async for data in self.iter_lines():
+            line += 1
+            if not data.strip():
+                continue
+            result = await self.create(txn, line, data, pending_ids)
+            if result['status'] != 201:
+                await self.write_results(resp, [result])
+                continue
+            pending.append((line, data, result))
+            created += 1
+            if created % chunk_size == 0:
+                results, txn = await self.commit(txn, pending)
+                await self.write_results(resp, results)
+                pending = []
+                pending_ids = set()
+
+        if len(pending) > 0:
+            results, txn = await self.commit(txn, pending)
+            await self.write_results(resp, results)
+        await resp.write_eof()
+        return resp
 
 
 @configure.service(
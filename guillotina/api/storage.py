@@ -3,7 +3,10 @@ from guillotina._settings import app_settings
 from guillotina.component import get_adapter
 from guillotina.db.interfaces import IDatabaseManager
 from guillotina.interfaces import IApplication
+from guillotina.interfaces import IDatabase
 from guillotina.response import HTTPNotFound
+from guillotina.response import HTTPPreconditionFailed
+from guillotina.transactions import get_tm
 from guillotina.utils import list_or_dict_items
 
 import re
@@ -97,3 +100,16 @@ async def get_db(context, request):
         'storage_id': storage_id,
         'type': config['storage']
     }
+
+
+@configure.service(
+    context=IDatabase, method='GET', permission='guillotina.GetDatabases',
+    name='@vacuum', summary='Get progress of deleting trashed objects')
+async def vacuum_get(context, request):
+    storage = get_tm(request)._storage
+    metrics = storage.get_vacuum_metrics()
+    if metrics is None:
+        raise HTTPPreconditionFailed(content={
+            'reason': 'Storage does not vacuum trashed objects'})
+    metrics['progress'] = await storage.get_vacuum_progress()
+    return metrics
@@ -1,4 +1,5 @@
 from aiohttp import web
+from aiohttp.streams import EMPTY_PAYLOAD
 from guillotina import configure
 from guillotina import jose
 from guillotina import logger
@@ -9,19 +10,38 @@ from guillotina.auth.extractors import BasicAuthPolicy
 from guillotina.component import get_adapter
 from guillotina.component import get_utility
 from guillotina.component import query_multi_adapter
+from guillotina.db.conflicts import conflict_tracker
+from guillotina.exceptions import ConflictError
+from guillotina.exceptions import TIDConflictError
 from guillotina.interfaces import IAioHTTPResponse
+from guillotina.interfaces import IAnnotations
 from guillotina.interfaces import IContainer
 from guillotina.interfaces import IInteraction
+from guillotina.interfaces import IParticipation
 from guillotina.interfaces import IPermission
+from guillotina.registry import REGISTRY_DATA_KEY
+from guillotina.response import Response
 from guillotina.security.utils import get_view_permission
 from guillotina.transactions import get_tm
+from multidict import CIMultiDict
+from zope.interface import directlyProvidedBy
+from zope.interface import directlyProvides
 
 import aiohttp
+import aiotask_context
+import asyncio
+import posixpath
 import time
 import ujson
 from urllib import parse
 
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
 @configure.service(
     context=IContainer, method='GET',
     permission='guillotina.AccessContent', name='@wstoken',
@@ -81,82 +101,186 @@ class WebsocketGetToken(Service):
     permission='guillotina.AccessContent', name='@ws',
     summary='Make a web socket connection')
 class WebsocketsView(Service):
+    '''
+    Run requests sent as frames of a websocket.
+
+    Frames are json text frames or, with the `msgpack` package, msgpack binary
+    frames with `op`(http method or `close`), `value`(path from the container),
+    `id` and optional `payload` and `headers` keys. Responses are sent with the
+    encoding of the frame they answer.
+
+    Frames are processed concurrently, up to `websockets.max_concurrent_frames`
+    per connection, each in its own transaction and security interaction. Only
+    the principals authenticated for the connection are shared by the frames.
+    '''
 
-    async def handle_ws_request(self, ws, message):
-        method = app_settings['http_methods']['GET']
+    async def handle_ws_request(self, ws, message, binary=False):
         try:
             frame_id = message['id']
         except KeyError:
             frame_id = '0'
+        method = message['op'].upper()
+        attempts = app_settings.get('conflict_retry_attempts', 3)
+        for attempt in range(attempts + 1):
+            try:
+                result = await self.handle_frame(message, method, attempt)
+                break
+            except (ConflictError, TIDConflictError) as e:
+                conflict_tracker.record_conflict(e.oids, message.get('value'))
+                if attempt >= attempts:
+                    conflict_tracker.record_exhausted(message.get('value'))
+                    result = {'error': 'Conflict', 'status': 409}
+                    break
+                conflict_tracker.record_retry(message.get('value'))
+                await asyncio.sleep(conflict_tracker.get_retry_delay(attempt + 1))
+        result['id'] = frame_id
+        await self.send(ws, result, binary)
 
+    def get_frame_request(self, message, method):
         parsed = parse.urlparse(message.get('path', message.get('value')))
-        path = tuple(p for p in parsed.path.split('/') if p)
+        base_path = self.request.path.rsplit('/', 1)[0]
+        rel_url = posixpath.join(base_path, parsed.path.lstrip('/'))
+        if parsed.query:
+            rel_url += '?' + parsed.query
+        headers = self.request.headers
+        if message.get('headers'):
+            headers = CIMultiDict(headers)
+            headers.update(message['headers'])
+        request = self.request.clone(method=method, rel_url=rel_url, headers=headers)
+
+        payload = message.get('payload')
+        if payload is None:
+            payload = b''
+        elif not isinstance(payload, (bytes, str)):
+            payload = ujson.dumps(payload)
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        # the body of the websocket is not the body of the frame
+        request._payload = EMPTY_PAYLOAD
+        request._read_bytes = payload
+
+        # state of the connection shared by the frames
+        for name in ('application', '_db_id', '_tm', '_container_id',
+                     'container_settings', '_cache_user'):
+            if hasattr(self.request, name):
+                setattr(request, name, getattr(self.request, name))
+        # layers of the container
+        directlyProvides(request, directlyProvidedBy(self.request))
+        # permissions checked by a frame are cached for that frame only
+        security = get_adapter(request, IInteraction)
+        for principal in self._principals:
+            participation = IParticipation(request)
+            participation.principal = principal
+            participation.interaction = None
+            security.add(participation)
+        request._db_write_enabled = app_settings['check_writable_request'](request)
+        return request, tuple(p for p in parsed.path.split('/') if p)
+
+    async def handle_frame(self, message, method, attempt=0):
+        request, path = self.get_frame_request(message, method)
+        if attempt > 0:
+            request._retry_attempt = attempt
+        aiotask_context.set('request', request)
 
+        tm = get_tm(request)
+        txn = await tm.begin(request=request)
+        try:
+            request.container = await txn.get(self.request.container._p_oid)
+            if request._db_write_enabled:
+                # registry changes need to be done in the transaction of the frame
+                annotations_container = IAnnotations(request.container)
+                request.container_settings = await annotations_container.async_get(
+                    REGISTRY_DATA_KEY)
+            result = await self.render_frame(request, method, path)
+            if request._db_write_enabled and not getattr(request, '_view_error', False):
+                await tm.commit(txn=txn)
+            else:
+                await tm.abort(txn=txn)
+        except Exception:
+            await tm.abort(txn=txn)
+            raise
+
+        # Wait for possible value
+        request.execute_futures()
+        return result
+
+    async def render_frame(self, request, method, path):
         from guillotina.traversal import traverse
-        obj, tail = await traverse(self.request, self.request.container, path)
+        obj, tail = await traverse(request, request.container, path)
 
         if tail and len(tail) > 0:
             # convert match lookups
             view_name = routes.path_to_view_name(tail)
-        elif not tail:
-            view_name = ''
         else:
-            raise
-
-        permission = get_utility(
-            IPermission, name='guillotina.AccessContent')
+            view_name = ''
 
-        security = get_adapter(self.request, IInteraction)
-        allowed = security.check_permission(permission.id, obj)
-        if not allowed:
-            return await ws.send_str(ujson.dumps({
-                'error': 'Not allowed'
-            }))
+        security = request.security
+        if not security.check_permission(self._access_permission.id, obj):
+            return {'error': 'Not allowed', 'status': 401}
 
         try:
             view = query_multi_adapter(
-                (obj, self.request), method, name=view_name)
-        except AttributeError:
+                (obj, request), app_settings['http_methods'][method], name=view_name)
+        except (AttributeError, KeyError):
             view = None
 
         try:
-            view.__route__.matches(self.request, tail or [])
-        except (KeyError, IndexError):
+            view.__route__.matches(request, tail or [])
+        except (KeyError, IndexError, AttributeError):
             view = None
 
         if view is None:
-            return await ws.send_str(ujson.dumps({
-                'error': 'Not found',
-                'id': frame_id
-            }))
+            return {'error': 'Not found', 'status': 404}
 
-        ViewClass = view.__class__
-        view_permission = get_view_permission(ViewClass)
+        view_permission = get_view_permission(view.__class__)
         if not security.check_permission(view_permission, view):
-            return await ws.send_str(ujson.dumps({
-                'error': 'No view access',
-                'id': frame_id
-            }))
+            return {'error': 'No view access', 'status': 401}
 
-        if hasattr(view, 'prepare'):
-            view = (await view.prepare()) or view
+        try:
+            if hasattr(view, 'prepare'):
+                view = (await view.prepare()) or view
+            view_result = await view()
+        except (ConflictError, TIDConflictError):
+            raise
+        except Response as exc:
+            request._view_error = True
+            view_result = exc
 
-        view_result = await view()
         if IAioHTTPResponse.providedBy(view_result):
             raise Exception('Do not accept raw aiohttp exceptions in ws')
         else:
             from guillotina.traversal import apply_rendering
-            resp = await apply_rendering(view, self.request, view_result)
+            resp = await apply_rendering(view, request, view_result)
 
         # Return the value, body is always encoded
-        response_object = ujson.dumps({
-            'data': resp.body.decode('utf-8'),
-            'id': frame_id
-        })
-        await ws.send_str(response_object)
+        return {
+            'data': resp.body,
+            'status': resp.status
+        }
 
-        # Wait for possible value
-        self.request.execute_futures()
+    async def send(self, ws, result, binary=False):
+        if binary:
+            await ws.send_bytes(msgpack.packb(result, use_bin_type=True))
+        else:
+            if isinstance(result.get('data'), bytes):
+                result['data'] = result['data'].decode('utf-8')
+            await ws.send_str(ujson.dumps(result))
+
+    async def run_frame(self, ws, message, binary, semaphore):
+        try:
+            await self.handle_ws_request(ws, message, binary)
+        except Exception:
+            logger.error('Exception on ws', exc_info=True)
+            try:
+                await self.send(ws, {
+                    'error': 'Error',
+                    'status': 500,
+                    'id': message.get('id', '0')
+                }, binary)
+            except Exception:
+                pass
+        finally:
+            semaphore.release()
 
     async def __call__(self):
         tm = get_tm(self.request)
@@ -164,30 +288,47 @@ class WebsocketsView(Service):
         ws = web.WebSocketResponse()
         await ws.prepare(self.request)
 
+        self._access_permission = get_utility(
+            IPermission, name='guillotina.AccessContent')
+        # frames reuse the principals authenticated for the connection
+        self._principals = [
+            participation.principal
+            for participation in get_adapter(self.request, IInteraction).participations]
+        max_concurrent = app_settings.get('websockets', {}).get('max_concurrent_frames', 10)
+        semaphore = asyncio.Semaphore(max_concurrent)
+        tasks = set()
+
         async for msg in ws:
-            if msg.type == aiohttp.WSMsgType.text:
+            if msg.type in (aiohttp.WSMsgType.text, aiohttp.WSMsgType.binary):
+                binary = msg.type == aiohttp.WSMsgType.binary
                 try:
-                    message = ujson.loads(msg.data)
-                except ValueError:
+                    if binary:
+                        if msgpack is None:
+                            raise ValueError('msgpack is not installed')
+                        message = msgpack.unpackb(msg.data, raw=False)
+                    else:
+                        message = ujson.loads(msg.data)
+                    op = message['op'].lower()
+                except (ValueError, TypeError, KeyError, AttributeError):
                     logger.warning('Invalid websocket payload, ignored: {}'.format(
                         msg.data))
                     continue
-                if message['op'] == 'close':
+                if op == 'close':
                     await ws.close()
-                elif message['op'].lower() == 'get':
-                    txn = await tm.begin(request=self.request)
-                    try:
-                        await self.handle_ws_request(ws, message)
-                    except Exception:
-                        logger.error('Exception on ws', exc_info=True)
-                    finally:
-                        # only currently support GET requests which are *never*
-                        # supposed to be commits
-                        await tm.abort(txn=txn)
+                elif op.upper() in app_settings['http_methods']:
+                    # wait here instead of reading more frames when too many are running
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(
+                        self.run_frame(ws, message, binary, semaphore))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
             elif msg.type == aiohttp.WSMsgType.error:
                 logger.debug('ws connection closed with exception {0:s}'
                              .format(ws.exception()))
 
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        aiotask_context.set('request', self.request)
         logger.debug('websocket connection closed')
 
         return {}
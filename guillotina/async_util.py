@@ -3,6 +3,7 @@ from dateutil.tz import tzutc
 from guillotina import logger
 from guillotina.browser import View
 from guillotina.db.transaction import Status
+from guillotina.exceptions import JobPoolFullException
 from guillotina.exceptions import ServerClosingException
 from guillotina.interfaces import IAsyncJobPool  # noqa
 from guillotina.interfaces import IAsyncUtility  # noqa
@@ -13,6 +14,11 @@ from guillotina.transactions import managed_transaction
 
 import aiotask_context
 import asyncio
+import bisect
+import collections
+import heapq
+import itertools
+import time
 import typing
 
 
@@ -113,14 +119,54 @@ class QueueObject(View):
         return self.time < view.time
 
 
+# job priorities, lower values run first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 50
+PRIORITY_LOW = 100
+
+DEFAULT_QUEUE = 'default'
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, float('inf'))
+
+
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        return {
+            'buckets': {
+                str(bucket): count for bucket, count in zip(self.buckets, self.counts)
+            },
+            'count': self.count,
+            'sum': self.sum
+        }
+
+
 class Job:
 
     def __init__(self, func: typing.Callable[[], typing.Coroutine],
-                 request=None, args=None, kwargs=None) -> None:
+                 request=None, args=None, kwargs=None,
+                 priority=PRIORITY_NORMAL, queue=DEFAULT_QUEUE, timeout=None) -> None:
         self._func = func
         self._request = request
         self._args = args
         self._kwargs = kwargs
+        self.priority = priority
+        self.queue = queue
+        self.timeout = timeout
+        self.created = time.monotonic()
+        self.started = None
 
     @property
     def func(self):
@@ -142,27 +188,84 @@ class Job:
 
 
 class AsyncJobPool:
+    '''
+    Run jobs in the background with a limited concurrency.
+
+    Pending jobs are run by priority and then in the order they were added.
+    Jobs can be assigned to a named queue with its own concurrency limit(the
+    `queues` setting) so one type of job can not take all the slots.
+
+    No more than `max_pending` jobs wait to run: `add_job` raises
+    `JobPoolFullException` when the limit is reached while `async_add_job`
+    and `add_job_after_commit` wait for a pending job to start.
+    '''
 
     def __init__(self, settings={'max_size': 5}, loop=None):
         self._loop = None
         self._running = []
-        self._pending = []
+        # queue name -> heap of (priority, sequence, job)
+        self._pending = {}
+        self._num_pending = 0
+        self._running_by_queue = collections.Counter()
+        self._sequence = itertools.count()
         self._max_size = settings['max_size']
+        self._queue_sizes = settings.get('queues', {})
+        self._max_pending = settings.get('max_pending')
+        self._timeout = settings.get('timeout')
         self._closing = False
+        self._idle = None
+        self._capacity = None
+        self._counters = collections.Counter()
+        self._wait_latency = Histogram()
+        self._run_latency = Histogram()
 
     def get_loop(self):
         if self._loop is None:
             self._loop = asyncio.get_event_loop()
         return self._loop
 
+    def _get_event(self, name, is_set):
+        # created lazily so they are bound to the loop running the jobs
+        event = getattr(self, name)
+        if event is None:
+            event = asyncio.Event(loop=self.get_loop())
+            setattr(self, name, event)
+        if is_set is True:
+            event.set()
+        elif is_set is False:
+            event.clear()
+        return event
+
+    def _update_events(self):
+        self._get_event('_idle', len(self._running) == 0 and self._num_pending == 0)
+        self._get_event(
+            '_capacity',
+            self._max_pending is None or self._num_pending < self._max_pending)
+
     @property
     def num_pending(self):
-        return len(self._pending)
+        return self._num_pending
 
     @property
     def num_running(self):
         return len(self._running)
 
+    def get_metrics(self):
+        return {
+            'queued': self._counters['queued'],
+            'completed': self._counters['completed'],
+            'failed': self._counters['failed'],
+            'timed_out': self._counters['timed_out'],
+            'rejected': self._counters['rejected'],
+            'pending': self.num_pending,
+            'running': self.num_running,
+            'pending_by_queue': {
+                name: len(pending) for name, pending in self._pending.items()},
+            'running_by_queue': dict(self._running_by_queue),
+            'wait_latency': self._wait_latency.to_dict(),
+            'run_latency': self._run_latency.to_dict()
+        }
+
     async def initialize(self, app=None):
         pass
 
@@ -170,45 +273,108 @@ class AsyncJobPool:
         await self.join()
 
     def add_job(self, func: typing.Callable[[], typing.Coroutine],
-                request=None, args=None, kwargs=None):
+                request=None, args=None, kwargs=None,
+                priority=PRIORITY_NORMAL, queue=DEFAULT_QUEUE, timeout=None):
         if self._closing:
             raise ServerClosingException('Can not schedule job')
-        job = Job(func, request=request, args=args, kwargs=kwargs)
-        self._pending.insert(0, job)
+        if self._max_pending is not None and self._num_pending >= self._max_pending:
+            self._counters['rejected'] += 1
+            raise JobPoolFullException(f'{self._num_pending} jobs are pending')
+        job = Job(func, request=request, args=args, kwargs=kwargs,
+                  priority=priority, queue=queue, timeout=timeout or self._timeout)
+        heapq.heappush(self._pending.setdefault(queue, []),
+                       (priority, next(self._sequence), job))
+        self._num_pending += 1
+        self._counters['queued'] += 1
         self._schedule()
+        self._update_events()
         return job
 
-    def _add_job_after_commit(self, status, func, request=None, args=None, kwargs=None):
-        self.add_job(func, request=request, args=args, kwargs=kwargs)
+    async def async_add_job(self, func: typing.Callable[[], typing.Coroutine],
+                            request=None, args=None, kwargs=None, **options):
+        '''
+        Same as `add_job` but wait until the number of pending jobs is under
+        the `max_pending` setting
+        '''
+        self._update_events()
+        while not self._capacity.is_set():
+            await self._capacity.wait()
+        return self.add_job(func, request=request, args=args, kwargs=kwargs, **options)
+
+    async def _add_job_after_commit(self, status, func, request=None, args=None,
+                                    kwargs=None, **options):
+        await self.async_add_job(func, request=request, args=args, kwargs=kwargs, **options)
 
     def add_job_after_commit(self, func: typing.Callable[[], typing.Coroutine],
-                             request=None, args=None, kwargs=None):
+                             request=None, args=None, kwargs=None, **options):
         txn = get_transaction(request)
+        options.update({
+            'request': request,
+            'args': args,
+            'kwargs': kwargs
+        })
         txn.add_after_commit_hook(
             self._add_job_after_commit,
             args=[func],
-            kws={
-                'request': request,
-                'args': args,
-                'kwargs': kwargs
-            })
+            kws=options)
+
+    async def _run(self, job):
+        job.started = time.monotonic()
+        self._wait_latency.observe(job.started - job.created)
+        try:
+            if job.timeout:
+                await asyncio.wait_for(job.run(), job.timeout)
+            else:
+                await job.run()
+            self._counters['completed'] += 1
+        except asyncio.TimeoutError:
+            self._counters['timed_out'] += 1
+            logger.warning(f'Job {job.func} timed out after {job.timeout} seconds')
+        except Exception:
+            self._counters['failed'] += 1
+            raise
+        finally:
+            self._run_latency.observe(time.monotonic() - job.started)
 
     def _done_callback(self, task):
         self._running.remove(task)
+        self._running_by_queue[task._job.queue] -= 1
         self._schedule()  # see if we can schedule now
+        self._update_events()
+
+    def _next_job(self):
+        '''
+        highest priority pending job of queues that are not at their limit
+        '''
+        selected = None
+        for name, pending in self._pending.items():
+            if len(pending) == 0:
+                continue
+            limit = self._queue_sizes.get(name)
+            if limit is not None and self._running_by_queue[name] >= limit:
+                continue
+            if selected is None or pending[0][:2] < selected[0][:2]:
+                selected = pending
+        if selected is not None:
+            self._num_pending -= 1
+            return heapq.heappop(selected)[2]
 
     def _schedule(self):
         '''
-        check if we can schedule a new job
+        check if we can schedule new jobs
         '''
-        if len(self._running) < self._max_size and len(self._pending) > 0:
-            job = self._pending.pop()
-            task = self.get_loop().create_task(job.run())
+        while len(self._running) < self._max_size and self._num_pending > 0:
+            job = self._next_job()
+            if job is None:
+                # all queues with pending jobs are at their limit
+                return
+            task = self.get_loop().create_task(self._run(job))
             task._job = job
             self._running.append(task)
+            self._running_by_queue[job.queue] += 1
             task.add_done_callback(self._done_callback)
 
     async def join(self):
         self._closing = True
-        while len(self._running) > 0 or len(self._pending) > 0:
-            await asyncio.sleep(0.1)
+        self._update_events()
+        await self._idle.wait()
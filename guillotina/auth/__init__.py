@@ -4,6 +4,7 @@ from datetime import timedelta
 import jwt
 from guillotina._settings import app_settings
 from guillotina.auth import groups  # noqa
+from guillotina.auth.cache import principal_cache
 from guillotina.auth.users import ROOT_USER_ID
 from guillotina.profile import profilable
 
@@ -13,12 +14,18 @@ async def authenticate_request(request):
     for policy in app_settings['auth_extractors']:
         token = await policy(request).extract_token()
         if token:
+            key = principal_cache.get_key(policy.name, token, request)
+            user = principal_cache.get(key)
+            if user is not None:
+                return user
             for validator in app_settings['auth_token_validators']:
                 if (validator.for_validators is not None and
                         policy.name not in validator.for_validators):
                     continue
                 user = await validator(request).validate(token)
                 if user is not None:
+                    # validators set `exp` for tokens expiring
+                    principal_cache.put(key, user, token.get('exp'))
                     return user
 
 
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from guillotina import configure
+from guillotina._settings import app_settings
+from guillotina.auth.users import GuillotinaUser
+from guillotina.interfaces import IObjectModifiedEvent
+from guillotina.interfaces import IObjectRemovedEvent
+from guillotina.interfaces import IPrincipal
+
+import hashlib
+import time
+
+
+class PrincipalCache:
+    '''
+    Process wide store of the principals authenticated with a credential.
+
+    Entries are keyed by a hash of the extracted token, so credentials are not
+    kept in memory, and of the database and container of the request, as user
+    identifiers can find different principals per container. They expire after
+    the `principal_cache.ttl` setting or when the token expires. The least
+    recently used entries are dropped once there are more than
+    `principal_cache.max_size`.
+
+    Only the id, groups, roles, permissions and properties of principals are
+    kept and a new principal is built from them on every hit: principals stored
+    as content are bound to the transaction they were loaded with.
+    '''
+
+    def __init__(self):
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def settings(self):
+        return app_settings.get('principal_cache', {})
+
+    def get_key(self, policy_name, token, request=None):
+        value = '\n'.join(
+            [str(token.get(name, '')) for name in ('type', 'id', 'token')] +
+            [str(getattr(request, name, None) or '') for name in ('_db_id', '_container_id')])
+        return hashlib.sha256(f'{policy_name}\n{value}'.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        try:
+            expires, data = self._data[key]
+        except KeyError:
+            return None
+        if expires < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return GuillotinaUser(
+            user_id=data['id'],
+            groups=list(data['groups']),
+            roles=dict(data['roles']),
+            permissions=dict(data['permissions']),
+            properties=dict(data['properties']))
+
+    def put(self, key, principal, expires=None):
+        ttl = self.settings.get('ttl', 60)
+        if not ttl:
+            return
+        expires = min(time.time() + ttl, expires or float('inf'))
+        self._data[key] = (expires, {
+            'id': principal.id,
+            'groups': list(getattr(principal, 'groups', None) or []),
+            'roles': dict(getattr(principal, 'roles', None) or {}),
+            'permissions': dict(getattr(principal, 'permissions', None) or {}),
+            'properties': dict(getattr(principal, 'properties', None) or {})
+        })
+        self._data.move_to_end(key)
+        max_size = self.settings.get('max_size', 1000)
+        while len(self._data) > max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, principal_id):
+        '''
+        Drop the entries of a principal and of the members of a group
+        '''
+        for key, (_, data) in list(self._data.items()):
+            if data['id'] == principal_id or principal_id in data['groups']:
+                del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+@configure.subscriber(for_=(IPrincipal, IObjectModifiedEvent))
+@configure.subscriber(for_=(IPrincipal, IObjectRemovedEvent))
+def invalidate_principal(principal, event):
+    principal_cache.invalidate(principal.id)
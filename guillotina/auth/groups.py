@@ -1,4 +1,6 @@
+from collections import OrderedDict
 from guillotina import configure
+from guillotina._settings import app_settings
 from guillotina.auth.users import GuillotinaUser
 from guillotina.interfaces import IGroups
 from guillotina.utils import get_current_request
@@ -22,10 +24,18 @@ class GuillotinaGroup(GuillotinaUser):
 class GroupsUtility(object):
     """ Class used to get groups. """
 
+    def __init__(self):
+        # groups only depend on their id, share the most recently used
+        # ones between requests
+        self._groups = OrderedDict()
+
     def get_principal(self, ident):
-        request = get_current_request()
-        if not hasattr(request, '_cache_groups'):
-            request._cache_groups = {}
-        if ident not in request._cache_groups.keys():
-            request._cache_groups[ident] = GuillotinaGroup(request, ident)
-        return request._cache_groups[ident]
+        try:
+            self._groups.move_to_end(ident)
+            return self._groups[ident]
+        except KeyError:
+            group = self._groups[ident] = GuillotinaGroup(get_current_request(), ident)
+            max_size = app_settings.get('principal_cache', {}).get('max_size', 1000)
+            while len(self._groups) > max_size:
+                self._groups.popitem(last=False)
+            return group
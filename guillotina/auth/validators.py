@@ -101,6 +101,8 @@ class JWTValidator(object):
                 app_settings['jwt']['secret'],
                 algorithms=[app_settings['jwt']['algorithm']])
             token['id'] = validated_jwt['id']
+            if 'exp' in validated_jwt:
+                token['exp'] = validated_jwt['exp']
             user = await find_user(self.request, token)
             if user is not None and user.id == token['id']:
                 return user
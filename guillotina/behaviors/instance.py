@@ -8,6 +8,8 @@ from zope.interface import implementer
 
 
 _default = object()
+# schema the behavior classes provide
+_schemas: dict = {}
 
 
 @implementer(IAsyncBehavior)
@@ -22,8 +24,12 @@ class AnnotationBehavior:
     __annotations_data_key__ = 'default'
 
     def __init__(self, context):
-        self.__dict__['schema'] = [x for x in self.__implemented__][0]
-        self.__dict__['prefix'] = self.__dict__['schema'].__identifier__ + '.'
+        try:
+            schema = _schemas[self.__class__]
+        except KeyError:
+            schema = _schemas[self.__class__] = [x for x in self.__implemented__][0]
+        self.__dict__['schema'] = schema
+        self.__dict__['prefix'] = schema.__identifier__ + '.'
         self.__dict__['data'] = {}
         self.__dict__['context'] = context
 
@@ -15,11 +15,16 @@ class Blob:
         data = await blob.async_read()
     """
 
+    # size of every chunk written, not available on blobs written before it
+    # was tracked
+    chunk_sizes = None
+
     def __init__(self, resource):
         self.bid = app_settings['oid_generator'](resource)
         self.resource_zoid = resource._p_oid
         self.size = 0
         self.chunks = 0
+        self.chunk_sizes = []
 
     def open(self, mode='r', transaction=None):
         return BlobFile(self, mode, transaction)
@@ -51,6 +56,7 @@ class BlobFile:
             await self.transaction.del_blob(self.blob.bid)
             self.blob.size = 0
             self.blob.chunks = 0
+            self.blob.chunk_sizes = []
 
         self._started_writing = True
 
@@ -59,6 +65,8 @@ class BlobFile:
 
         self.blob.chunks += 1
         self.blob.size += len(data)
+        if self.blob.chunk_sizes is not None:
+            self.blob.chunk_sizes.append(len(data))
 
     async def async_write(self, data, chunk_size=1024 * 1024 * 1):
         if isinstance(data, bytes):
@@ -78,18 +86,91 @@ class BlobFile:
                 self.blob.bid, chunk_index
             ))
 
-    async def iter_async_read(self):
+    async def iter_async_read(self, prefetch=None, start_index=0, end_index=None):
         '''
         yield chunks of data...
+
+        Committed chunks are read with a cursor of the storage, on its own
+        connection when supported, getting `prefetch` more chunks with every
+        round trip. Blobs of objects changed in the transaction are read
+        through it to get their uncommitted chunks.
         '''
-        for chunk_index in range(self.blob.chunks):
-            yield await self.async_read_chunk(chunk_index)
+        if prefetch is None:
+            prefetch = app_settings.get('blob_prefetch_chunks', 0)
+        if end_index is None:
+            end_index = self.blob.chunks
+        if start_index >= end_index:
+            return
+        zoid = self.blob.resource_zoid
+        if zoid in self.transaction.added or zoid in self.transaction.modified:
+            for index in range(start_index, end_index):
+                yield await self.async_read_chunk(index)
+            return
+        next_index = start_index
+        records = self.transaction.iter_blob_chunks(
+            self.blob.bid, start_index, end_index, prefetch=prefetch + 1)
+        try:
+            async for record in records:
+                if record['chunk_index'] != next_index:
+                    break
+                yield record['data']
+                next_index += 1
+        finally:
+            await records.aclose()
+        if next_index < end_index:
+            raise BlobChunkNotFound('Could not find blob({}), chunk({})'.format(
+                self.blob.bid, next_index
+            ))
+
+    async def iter_async_read_range(self, start, end, prefetch=None):
+        '''
+        yield data from byte `start` up to byte `end`(exclusive) reading
+        only the chunks holding it
+
+        Blobs without `chunk_sizes` are read from their first chunk.
+        '''
+        start_index = 0
+        end_index = None
+        offset = 0  # byte position of the first chunk read
+        if self.blob.chunk_sizes is not None:
+            position = 0
+            for index, size in enumerate(self.blob.chunk_sizes):
+                if position + size <= start:
+                    start_index = index + 1
+                    offset = position + size
+                if position < end:
+                    end_index = index + 1
+                position += size
+            if end_index is None or start_index >= end_index:
+                return
+        chunks = self.iter_async_read(
+            prefetch=prefetch, start_index=start_index, end_index=end_index)
+        try:
+            async for chunk in chunks:
+                chunk_start = offset
+                offset += len(chunk)
+                if offset <= start:
+                    # no chunk sizes, skip over chunks before the range
+                    continue
+                if chunk_start < start or offset > end:
+                    chunk = chunk[max(start - chunk_start, 0):end - chunk_start]
+                yield chunk
+                if offset >= end:
+                    break
+        finally:
+            # do not keep prefetching chunks we will not use
+            await chunks.aclose()
 
     async def async_read(self, chunk_size=None):
         '''
         read all the data... should this implement complete file-like api?
         '''
-        data = b''
-        async for chunk in self.iter_async_read():
-            data += chunk
-        return data
+        chunks = []
+        reader = self.iter_async_read()
+        try:
+            async for chunk in reader:
+                chunks.append(chunk)
+        finally:
+            await reader.aclose()
+        # join allocates the result once instead of copying on every chunk
+        return b''.join(chunks)
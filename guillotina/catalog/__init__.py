@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 from guillotina import directives
+from guillotina.interfaces import IContainer
 from guillotina.interfaces import IResource
 from guillotina.security.security_code import role_permission_manager
 from guillotina.security.utils import get_principals_with_access_content
 from guillotina.security.utils import get_roles_with_access_content
 from guillotina.utils import get_content_depth
 from guillotina.utils import get_content_path
+from guillotina.utils import iter_parents
 
 
 global_roles_for_permission = role_permission_manager.get_roles_for_permission
@@ -58,3 +60,10 @@ def get_parent_uuid(ob):
 @directives.index_field.with_accessor(IResource, 'tid', type='keyword')
 def get_tid(ob):
     return ob._p_serial
+
+
+@directives.index_field.with_accessor(IResource, 'container_uuid', type='keyword')
+def get_container_uuid(ob):
+    for parent in iter_parents(ob):
+        if IContainer.providedBy(parent):
+            return parent.uuid
@@ -1,6 +1,7 @@
 from guillotina import configure
 from guillotina.component import query_adapter
 from guillotina.content import iter_schemata
+from guillotina.content import prefetch_behavior_annotations
 from guillotina.directives import index
 from guillotina.directives import merged_tagged_value_dict
 from guillotina.directives import merged_tagged_value_list
@@ -153,6 +154,10 @@ class DefaultCatalogDataAdapter(object):
         }
         if schemas is None:
             schemas = iter_schemata(self.content)
+        schemas = list(schemas)
+        if indexes is None:
+            # every behavior will be loaded
+            await prefetch_behavior_annotations([self.content], schemas)
 
         for schema in schemas:
             behavior = schema(self.content)
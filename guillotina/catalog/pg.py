@@ -0,0 +1,421 @@
+from guillotina import glogging
+from guillotina._cache import FACTORY_CACHE
+from guillotina._settings import app_settings
+from guillotina.catalog.catalog import DefaultSearchUtility
+from guillotina.catalog.utils import get_index_fields
+from guillotina.content import prefetch_behavior_annotations
+from guillotina.db import TRASHED_ID
+from guillotina.db.interfaces import IPostgresStorage
+from guillotina.exceptions import QueryParsingError
+from guillotina.interfaces import IContainer
+from guillotina.interfaces import IInteraction
+from guillotina.transactions import get_transaction
+from guillotina.utils import get_content_path
+from guillotina.utils import get_current_request
+from guillotina.utils import get_object_by_oid
+from guillotina.utils import get_object_url
+from guillotina.utils import iter_parents
+from urllib.parse import parse_qsl
+
+import re
+import ujson
+
+
+logger = glogging.getLogger('guillotina')
+
+# index types with sortable scalar values
+ORDERED_TYPES = ('int', 'long', 'float', 'date', 'boolean')
+NUMERIC_TYPES = ('int', 'long', 'float')
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+
+REMOVE_SUBTREE = """
+UPDATE objects SET json = NULL
+WHERE json->'container_uuid' ? $1::text
+    AND (json->>'path' = $2 OR json->>'path' LIKE $3)"""
+
+UPDATE_JSON = """
+UPDATE objects SET json = batch.json::jsonb
+FROM unnest($1::varchar[], $2::text[]) AS batch(zoid, json)
+WHERE objects.zoid = batch.zoid
+"""
+
+# number of objects written together when reindexing
+REINDEX_BATCH_SIZE = 100
+
+OPERATORS = {
+    'gt': '>',
+    'gte': '>=',
+    'lt': '<',
+    'lte': '<=',
+    'not': '!='
+}
+
+
+def get_all_index_fields():
+    '''
+    Map of index name -> index definition for all registered types
+    '''
+    fields = {}
+    for type_name in FACTORY_CACHE.keys():
+        for field_name, index_data in get_index_fields(type_name).items():
+            fields[index_data.get('index_name', field_name)] = index_data
+    return fields
+
+
+def get_index_name(name):
+    return 'objects_json_{}'.format(re.sub('[^a-z0-9_]', '_', name.lower()))[:63]
+
+
+def get_index_statements():
+    '''
+    GIN indexes for keyword fields, btree expression indexes for fields
+    that can be sorted and prefix searched.
+    '''
+    statements = []
+    for name, index_data in sorted(get_all_index_fields().items()):
+        type_ = index_data.get('type')
+        key = name.replace("'", "''")
+        if type_ == 'keyword':
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {get_index_name(name)} "
+                f"ON objects USING gin ((json->'{key}'));")
+        elif type_ == 'path':
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {get_index_name(name)} "
+                f"ON objects ((json->>'{key}') text_pattern_ops);")
+        elif type_ in ORDERED_TYPES:
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {get_index_name(name)} "
+                f"ON objects ((json->'{key}'));")
+    return statements
+
+
+def get_principals_and_roles(request, container):
+    '''
+    Principals and roles of the current user to filter results with
+    '''
+    interaction = IInteraction(request)
+    users = []
+    roles = []
+    for participation in interaction.participations:
+        principal = participation.principal
+        if principal is None:
+            continue
+        groups = getattr(principal, 'groups', None) or []
+        users.append(principal.id)
+        users.extend(groups)
+        principal_roles = interaction.cached_principal_roles(
+            container, principal.id, groups, 'o')
+        roles.extend([role for role, allowed in principal_roles.items() if allowed])
+    return list(set(users)), list(set(roles))
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class SQLQuery:
+    '''
+    Translate a guillotina search query into sql against the `objects.json` column.
+
+    Supported query keys:
+        - `<index>=<value>`: match value
+        - `<index>__not=<value>`: does not match value
+        - `<index>__gt`, `__gte`, `__lt`, `__lte`: range queries
+        - `<index>__in=<value>`: text fields containing value or keyword
+          fields matching any of the comma separated values
+        - `<index>__starts=<value>`: starts with value
+        - `_sort_asc=<index>` or `_sort_des=<index>`
+        - `_from=<number>` and `_size=<number>` to paginate
+        - `_metadata=<name,name>` or `_metadata_not=<name,name>` to choose the
+          data returned
+    '''
+
+    def __init__(self, index_fields):
+        self.index_fields = index_fields
+        self.wheres = []
+        self.args = []
+        self.order_by = 'zoid'
+        self.offset = 0
+        self.limit = DEFAULT_PAGE_SIZE
+        self.metadata = None
+        self.metadata_not = None
+
+    def add_arg(self, value):
+        self.args.append(value)
+        return f'${len(self.args)}'
+
+    def get_field(self, name):
+        if name not in self.index_fields:
+            raise QueryParsingError(f'Unknown index: {name}')
+        return "'{}'".format(name.replace("'", "''")), self.index_fields[name].get('type')
+
+    def convert(self, type_, value):
+        if type_ in NUMERIC_TYPES:
+            try:
+                return float(value) if '.' in str(value) else int(value)
+            except ValueError:
+                raise QueryParsingError(f'Invalid number: {value}')
+        if type_ == 'boolean':
+            return str(value).lower() in ('true', '1', 'yes')
+        return value
+
+    def add_keyword(self, key, value):
+        self.wheres.append(f"json->{key} ? {self.add_arg(value)}::text")
+
+    def add_condition(self, name, operator, value):
+        key, type_ = self.get_field(name)
+        if operator is None:
+            if type_ == 'keyword':
+                return self.add_keyword(key, value)
+            operator = '='
+        elif operator == 'in':
+            if type_ == 'keyword':
+                values = [v.strip() for v in value.split(',') if v.strip()]
+                self.wheres.append(f"json->{key} ?| {self.add_arg(values)}::text[]")
+            else:
+                self.wheres.append(
+                    f"json->>{key} ILIKE {self.add_arg('%' + escape_like(value) + '%')}")
+            return
+        elif operator == 'starts':
+            self.wheres.append(
+                f"json->>{key} LIKE {self.add_arg(escape_like(value) + '%')}")
+            return
+        else:
+            operator = OPERATORS[operator]
+
+        if type_ in ORDERED_TYPES:
+            value = ujson.dumps(self.convert(type_, value))
+            self.wheres.append(f"json->{key} {operator} {self.add_arg(value)}::jsonb")
+        elif type_ == 'keyword' and operator == '!=':
+            self.wheres.append(f"NOT COALESCE(json->{key} ? {self.add_arg(value)}::text, false)")
+        else:
+            self.wheres.append(f"json->>{key} {operator} {self.add_arg(str(value))}")
+
+    def parse(self, query):
+        for name, value in query.items():
+            if name in ('_sort_asc', '_sort_des'):
+                key, type_ = self.get_field(value)
+                direction = 'ASC' if name == '_sort_asc' else 'DESC'
+                self.order_by = f'json->{key} {direction}, zoid'
+            elif name in ('_from', '_size'):
+                try:
+                    value = max(int(value), 0)
+                except ValueError:
+                    raise QueryParsingError(f'Invalid {name}: {value}')
+                if name == '_from':
+                    self.offset = value
+                else:
+                    self.limit = min(value, MAX_PAGE_SIZE)
+            elif name == '_metadata':
+                self.metadata = value.split(',')
+            elif name == '_metadata_not':
+                self.metadata_not = value.split(',')
+            elif name.startswith('_'):
+                continue
+            else:
+                operator = None
+                if '__' in name:
+                    name, operator = name.rsplit('__', 1)
+                    if operator not in OPERATORS and operator not in ('in', 'starts'):
+                        raise QueryParsingError(f'Unknown operator: {operator}')
+                self.add_condition(name, operator, value)
+
+    def get_sql(self):
+        where = ' AND '.join(self.wheres)
+        return f'''
+SELECT zoid, json, count(*) OVER() AS full_count
+FROM objects
+WHERE {where}
+ORDER BY {self.order_by}
+LIMIT {self.limit} OFFSET {self.offset}'''
+
+
+class PGSearchUtility(DefaultSearchUtility):
+    '''
+    Search content with the catalog data postgresql storages store in the
+    `json` column of the objects table.
+
+    Index data is written by the storage every time an object is stored so
+    `index` and `update` do not need to do anything.
+    '''
+
+    def __init__(self, settings={}, loop=None):
+        self.settings = settings
+        self.loop = loop
+
+    async def initialize(self, app):
+        if not app_settings.get('store_json', True):
+            logger.warning('postgresql catalog can not work with `store_json` disabled')
+
+    def _get_storage(self, txn):
+        if txn is None or not IPostgresStorage.providedBy(txn.storage):
+            return None
+        return txn.storage
+
+    def _get_container(self, context):
+        if IContainer.providedBy(context):
+            return context
+        for parent in iter_parents(context):
+            if IContainer.providedBy(parent):
+                return parent
+
+    async def initialize_catalog(self, container):
+        txn = get_transaction()
+        if self._get_storage(txn) is None:
+            return
+        conn = await txn.get_connection()
+        for statement in get_index_statements():
+            async with txn._lock:
+                await conn.execute(statement)
+
+    async def remove_catalog(self, container):
+        '''
+        Indexes are shared by all the containers of the database
+        and container data is removed with the container
+        '''
+        pass
+
+    async def _search(self, context, query):
+        request = get_current_request()
+        container = self._get_container(context)
+        txn = get_transaction(request)
+        if self._get_storage(txn) is None or container is None:
+            return {
+                'items_count': 0,
+                'member': []
+            }
+
+        if isinstance(query, str):
+            query = self._parse_query_string(query)
+        sql_query = SQLQuery(get_all_index_fields())
+        sql_query.parse(query or {})
+        sql_query.add_keyword("'container_uuid'", container.uuid)
+        sql_query.wheres.append(f'parent_id != {sql_query.add_arg(TRASHED_ID)}')
+        if context is not container:
+            path = escape_like(get_content_path(context)) + '/%'
+            sql_query.wheres.append(f"json->>'path' LIKE {sql_query.add_arg(path)}")
+        users, roles = get_principals_and_roles(request, container)
+        sql_query.wheres.append(
+            f"(json->'access_users' ?| {sql_query.add_arg(users)}::text[] OR "
+            f"json->'access_roles' ?| {sql_query.add_arg(roles)}::text[])")
+
+        conn = await txn.get_connection()
+        async with txn._lock:
+            records = await conn.fetch(sql_query.get_sql(), *sql_query.args)
+
+        container_url = get_object_url(container, request)
+        members = []
+        for record in records:
+            original = data = ujson.loads(record['json'])
+            if sql_query.metadata is not None:
+                data = {k: v for k, v in data.items() if k in sql_query.metadata}
+            if sql_query.metadata_not is not None:
+                data = {k: v for k, v in data.items() if k not in sql_query.metadata_not}
+            data.update({
+                '@absolute_url': container_url + original.get('path', ''),
+                '@type': original.get('type_name'),
+                '@uid': record['zoid'],
+                '@name': original.get('id')
+            })
+            members.append(data)
+        return {
+            'items_count': records[0]['full_count'] if len(records) > 0 else 0,
+            'member': members
+        }
+
+    def _parse_query_string(self, query):
+        '''
+        Query strings can be urlencoded queries or text to look for in titles
+        '''
+        if '=' not in query:
+            return {'title__in': query}
+        return dict(parse_qsl(query))
+
+    async def search(self, container, query):
+        return await self._search(container, query)
+
+    async def query(self, context, q):
+        return await self._search(context, q)
+
+    async def get_by_uuid(self, container, uuid):
+        return await self._search(container, {'uuid': uuid})
+
+    async def get_object_by_uuid(self, container, uuid):
+        result = await self.get_by_uuid(container, uuid)
+        if result['items_count'] == 0:
+            raise KeyError(uuid)
+        return await get_object_by_oid(uuid)
+
+    async def get_by_type(self, container, doc_type, query={}):
+        if isinstance(query, str):
+            query = self._parse_query_string(query)
+        query = dict(query or {}, type_name=doc_type)
+        return await self._search(container, query)
+
+    async def get_by_path(self, container, path, depth=-1, query={}, doc_type=None):
+        if isinstance(query, str):
+            query = self._parse_query_string(query)
+        query = dict(query or {})
+        path = '/' + path.strip('/')
+        if path != '/':
+            query['path__starts'] = path + '/'
+        if depth > -1:
+            query['depth__lte'] = len([p for p in path.split('/') if p]) + 1 + depth
+        if doc_type is not None:
+            query['type_name'] = doc_type
+        return await self._search(container, query)
+
+    async def get_folder_contents(self, container, parent_uid):
+        return await self._search(container, {'parent_uuid': parent_uid})
+
+    async def remove(self, container, uids):
+        '''
+        Objects are removed from the database with vacuuming so we need to
+        remove catalog data of deleted objects and their children now.
+        '''
+        txn = getattr(container, '_p_jar', None)
+        storage = self._get_storage(txn)
+        if storage is None:
+            return
+        conn = await storage.open()
+        try:
+            for ob in uids:
+                path = get_content_path(ob)
+                await conn.execute(
+                    REMOVE_SUBTREE, container.uuid, path, escape_like(path) + '/%')
+        finally:
+            await storage.close(conn)
+
+    async def reindex_all_content(self, obj, security=False, request=None):
+        '''
+        Write new catalog data of the object and all its children
+        '''
+        txn = get_transaction(request)
+        if self._get_storage(txn) is None:
+            return
+        conn = await txn.get_connection()
+        batch = []
+        if not IContainer.providedBy(obj):
+            batch.append(obj)
+        # objects below are loaded from a single query instead of walking every folder
+        async for ob in txn.iter_subtree(obj):
+            batch.append(ob)
+            if len(batch) >= REINDEX_BATCH_SIZE:
+                await self._reindex(conn, txn, batch)
+                batch = []
+        if len(batch) > 0:
+            await self._reindex(conn, txn, batch)
+
+    async def _reindex(self, conn, txn, batch):
+        await prefetch_behavior_annotations(batch)
+        oids = []
+        datas = []
+        for ob in batch:
+            oids.append(ob._p_oid)
+            datas.append(ujson.dumps(await self.get_data(ob)))
+        async with txn._lock:
+            await conn.execute(UPDATE_JSON, oids, datas)
+
@@ -1,3 +1,4 @@
+from guillotina.async_util import PRIORITY_LOW
 from guillotina.component import get_utility
 from guillotina.component import query_utility
 from guillotina.content import get_all_possible_schemas_for_type
@@ -34,4 +35,5 @@ def reindex_in_future(context, request, security=False):
         pool = get_utility(IAsyncJobPool)
         pool.add_job_after_commit(
             search.reindex_all_content, request=request,
-            args=[context, security], kwargs={'request': request})
+            args=[context, security], kwargs={'request': request},
+            priority=PRIORITY_LOW, queue='catalog')
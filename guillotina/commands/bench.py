@@ -0,0 +1,322 @@
+from aiohttp.test_utils import TestServer
+from guillotina import __version__
+from guillotina._settings import app_settings
+from guillotina.behaviors.attachment import IAttachment
+from guillotina.commands import Command
+from guillotina.component import get_utility
+from guillotina.db.conflicts import conflict_tracker
+from guillotina.interfaces import IApplication
+from guillotina.interfaces import IDatabase
+
+import aiohttp
+import argparse
+import asyncio
+import base64
+import json
+import random
+import sys
+import time
+
+
+OPERATIONS = ('traverse', 'get', 'items', 'patch', 'post', 'upload')
+
+DEFAULT_MIX = 'traverse=20,get=30,items=15,patch=15,post=10,upload=10'
+
+WORDS = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing',
+         'elit', 'sed', 'do', 'eiusmod', 'tempor', 'incididunt', 'ut', 'labore',
+         'et', 'dolore', 'magna', 'aliqua', 'enim', 'ad', 'minim', 'veniam')
+
+
+def parse_mix(value):
+    '''
+    `get=30,patch=10` to the weight of each operation
+    '''
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f'Unknown operation {name}, available: {", ".join(OPERATIONS)}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Invalid weight for {name}: {weight}')
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError('The weights of the operations must not be 0')
+    return mix
+
+
+def get_percentiles(timings):
+    '''
+    Latency summary in milliseconds of a list of durations in seconds
+    '''
+    if len(timings) == 0:
+        return {}
+    timings = sorted(timings)
+
+    def _get(percentile):
+        idx = int(round((percentile / 100) * (len(timings) - 1)))
+        return round(timings[idx] * 1000, 3)
+
+    return {
+        'min': round(timings[0] * 1000, 3),
+        'mean': round(sum(timings) / len(timings) * 1000, 3),
+        'p50': _get(50),
+        'p90': _get(90),
+        'p95': _get(95),
+        'p99': _get(99),
+        'max': round(timings[-1] * 1000, 3)
+    }
+
+
+class BenchCommand(Command):
+    description = '''Benchmark guillotina with generated content.
+
+A tree of content is generated in a container of the database and a mixed
+workload of requests is run through the application in process. Results
+are printed as json to compare them across versions and configurations.
+'''
+
+    def get_parser(self):
+        parser = super(BenchCommand, self).get_parser()
+        parser.add_argument('--db', help='Database to run the benchmark with, '
+                                         'defaults to the first one', default=None)
+        parser.add_argument('--container', help='Container to generate the content in, '
+                                                'replaced when it exists', default='bench')
+        parser.add_argument('--width', help='Children of each folder',
+                            type=int, default=5)
+        parser.add_argument('--depth', help='Levels of content, the last one are items',
+                            type=int, default=3)
+        parser.add_argument('--behavior', help='Behavior to enable on generated content',
+                            action='append', dest='behaviors', default=[])
+        parser.add_argument('--requests', help='Number of requests of the workload',
+                            type=int, default=1000)
+        parser.add_argument('--concurrency', help='Requests running at the same time',
+                            type=int, default=10)
+        parser.add_argument('--mix', help='Weight of each operation of the workload, '
+                                          f'defaults to {DEFAULT_MIX}',
+                            type=parse_mix, default=parse_mix(DEFAULT_MIX))
+        parser.add_argument('--upload-size', help='Bytes of uploaded files',
+                            type=int, default=64 * 1024)
+        parser.add_argument('--seed', help='Seed of the generated content and workload',
+                            type=int, default=0)
+        parser.add_argument('--output', help='File to write the json results to',
+                            default=None)
+        return parser
+
+    def get_database(self, db_id=None):
+        root = get_utility(IApplication, name='root')
+        for _id, db in root:
+            if IDatabase.providedBy(db) and db_id in (None, _id):
+                return db
+
+    def get_headers(self):
+        token = base64.b64encode('root:{}'.format(
+            app_settings['root_user']['password']).encode('utf-8')).decode('utf-8')
+        return {
+            'Accept': 'application/json',
+            'Authorization': f'Basic {token}',
+            # to get the number of queries of the request
+            'X-Debug': '1'
+        }
+
+    def get_text(self, rng, size):
+        return ' '.join(rng.choice(WORDS) for _ in range(size))
+
+    async def make_request(self, method, path, **kwargs):
+        start = time.time()
+        async with self.session.request(
+                method, self.server.make_url(path), headers=kwargs.pop('headers', {}),
+                **kwargs) as resp:
+            await resp.read()
+            self.queries += int(resp.headers.get('XG-Num-Queries', 0))
+            return resp.status, time.time() - start
+
+    async def generate(self, arguments, rng):
+        '''
+        Create `width` children in the container and in every folder down
+        to `depth` levels, returning the paths of the folders and items
+        '''
+        base_path = f'/{self.db.id}/{arguments.container}'
+        status, _ = await self.make_request('GET', base_path)
+        if status == 200:
+            await self.make_request('DELETE', base_path)
+        status, _ = await self.make_request('POST', f'/{self.db.id}', data=json.dumps({
+            '@type': 'Container',
+            'id': arguments.container,
+            'title': 'Benchmark'
+        }))
+        if status not in (200, 201):
+            raise Exception(f'Could not create container {arguments.container}: {status}')
+
+        behaviors = list(arguments.behaviors)
+        if arguments.mix.get('upload') and IAttachment.__identifier__ not in behaviors:
+            behaviors.append(IAttachment.__identifier__)
+
+        semaphore = asyncio.Semaphore(arguments.concurrency)
+        folders = [base_path]
+        items = []
+        parents = [base_path]
+
+        async def _create(parent, payload):
+            async with semaphore:
+                status, _ = await self.make_request('POST', parent, data=json.dumps(payload))
+            if status != 201:
+                raise Exception(f'Could not create {payload["id"]} in {parent}: {status}')
+
+        for level in range(1, arguments.depth + 1):
+            type_name = 'Item' if level == arguments.depth else 'Folder'
+            children = []
+            creates = []
+            for parent in parents:
+                for _ in range(arguments.width):
+                    _id = f'{type_name.lower()}-{level}-{len(children)}'
+                    children.append(f'{parent}/{_id}')
+                    creates.append(_create(parent, {
+                        '@type': type_name,
+                        '@behaviors': behaviors,
+                        'id': _id,
+                        'title': self.get_text(rng, 4),
+                        'description': self.get_text(rng, 30)
+                    }))
+            await asyncio.gather(*creates)
+            if type_name == 'Item':
+                items.extend(children)
+            else:
+                folders.extend(children)
+            parents = children
+        return folders, items
+
+    def get_workload(self, arguments, rng, folders, items):
+        '''
+        Deterministic list of (operation, method, path, kwargs) to run
+        '''
+        names = [name for name in OPERATIONS if arguments.mix.get(name)]
+        weights = [arguments.mix[name] for name in names]
+        contents = folders[1:] + items
+        leaves = items or folders
+        workload = []
+        for idx in range(arguments.requests):
+            name = rng.choices(names, weights)[0]
+            if name == 'traverse':
+                workload.append((name, 'GET', rng.choice(leaves) + '/@canido', {
+                    'params': {'permission': 'guillotina.ViewContent'}}))
+            elif name == 'get':
+                workload.append((name, 'GET', rng.choice(contents or folders), {}))
+            elif name == 'items':
+                workload.append((name, 'GET', rng.choice(folders) + '/@items', {}))
+            elif name == 'patch':
+                workload.append((name, 'PATCH', rng.choice(contents or folders), {
+                    'data': json.dumps({'title': self.get_text(rng, 4)})}))
+            elif name == 'post':
+                workload.append((name, 'POST', rng.choice(folders), {
+                    'data': json.dumps({
+                        '@type': 'Item',
+                        'id': f'bench-{idx}',
+                        'title': self.get_text(rng, 4)
+                    })}))
+            elif name == 'upload':
+                if not items:
+                    continue
+                workload.append((name, 'PATCH', rng.choice(items) + '/@upload/file', {
+                    'data': b'X' * arguments.upload_size,
+                    'headers': {'X-UPLOAD-SIZE': str(arguments.upload_size)}}))
+        return workload
+
+    async def run_workload(self, arguments, workload):
+        timings = {}
+        errors = {}
+        operations = iter(workload)
+
+        async def _worker():
+            for name, method, path, kwargs in operations:
+                status, duration = await self.make_request(method, path, **kwargs)
+                timings.setdefault(name, []).append(duration)
+                if status >= 400:
+                    errors[name] = errors.get(name, 0) + 1
+
+        start = time.time()
+        await asyncio.gather(*[_worker() for _ in range(arguments.concurrency)])
+        return timings, errors, time.time() - start
+
+    async def run(self, arguments, settings, app):
+        self.db = self.get_database(arguments.db)
+        if self.db is None:
+            sys.stderr.write(f'Could not find database {arguments.db}\n')
+            return
+        rng = random.Random(arguments.seed)
+        self.queries = 0
+        self.server = TestServer(app)
+        await self.server.start_server(loop=self.get_loop())
+        self.session = aiohttp.ClientSession(
+            headers=self.get_headers(),
+            connector=aiohttp.TCPConnector(limit=arguments.concurrency))
+        try:
+            start = time.time()
+            folders, items = await self.generate(arguments, rng)
+            generate_seconds = time.time() - start
+
+            workload = self.get_workload(arguments, rng, folders, items)
+            storage = self.db.storage
+            hits, misses = storage._hits, storage._misses
+            self.queries = 0
+            conflict_tracker.clear()
+            timings, errors, seconds = await self.run_workload(arguments, workload)
+            hits, misses = storage._hits - hits, storage._misses - misses
+        finally:
+            await self.session.close()
+            await self.server.close()
+
+        all_timings = [t for values in timings.values() for t in values]
+        results = {
+            'version': __version__,
+            'storage': storage.__class__.__name__,
+            'cache_strategy': storage._cache_strategy,
+            'transaction_strategy': storage._transaction_strategy,
+            'arguments': {
+                'width': arguments.width,
+                'depth': arguments.depth,
+                'behaviors': arguments.behaviors,
+                'requests': arguments.requests,
+                'concurrency': arguments.concurrency,
+                'mix': arguments.mix,
+                'upload_size': arguments.upload_size,
+                'seed': arguments.seed
+            },
+            'generate': {
+                'objects': len(folders) - 1 + len(items),
+                'seconds': round(generate_seconds, 3),
+                'objects_per_second': round(
+                    (len(folders) - 1 + len(items)) / (generate_seconds or 1), 3)
+            },
+            'requests': len(all_timings),
+            'errors': sum(errors.values()),
+            'seconds': round(seconds, 3),
+            'requests_per_second': round(len(all_timings) / (seconds or 1), 3),
+            'latency': get_percentiles(all_timings),
+            'operations': {
+                name: {
+                    'requests': len(values),
+                    'errors': errors.get(name, 0),
+                    'latency': get_percentiles(values)
+                } for name, values in sorted(timings.items())
+            },
+            'queries': self.queries,
+            'queries_per_request': round(self.queries / (len(all_timings) or 1), 3),
+            'cache': {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / ((hits + misses) or 1), 3)
+            },
+            'conflicts': {
+                name: value for name, value in conflict_tracker.get_metrics().items()
+                if name in ('conflicts', 'retries', 'exhausted')
+            }
+        }
+        output = json.dumps(results, indent=2)
+        if arguments.output:
+            with open(arguments.output, 'w') as fi:
+                fi.write(output)
+        else:
+            print(output)
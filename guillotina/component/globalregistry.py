@@ -12,6 +12,7 @@
 #
 ##############################################################################
 # flake8: noqa
+from guillotina import _settings
 from guillotina.component._compat import _BLANK
 from guillotina.component.interfaces import IComponentLookup
 from guillotina.profile import profilable
@@ -24,32 +25,83 @@ from zope.interface.registry import Components
 import asyncio
 
 
+# number of subscriber plans kept before the cache is reset
+MAX_SUBSCRIBER_PLANS = 2000
+
+
 class GuillotinaAdapterLookup(AdapterLookup):
 
+    _subscriber_plans = None
+
+    def changed(self, originally_changed=None):
+        super().changed(originally_changed)
+        # registrations changed, plans need to be computed again
+        self._subscriber_plans = None
+
+    def get_subscriber_plan(self, objects, provided):
+        '''
+        Subscriptions for objects grouped by priority, in the order they run,
+        as tuples of (priority, ((subscription, is coroutine function), ...))
+        '''
+        required = tuple(map(providedBy, objects))
+        if self._subscriber_plans is None:
+            self._subscriber_plans = {}
+        try:
+            return self._subscriber_plans[(required, provided)]
+        except KeyError:
+            pass
+
+        groups = []
+        for subscription in sorted(self.subscriptions(required, provided),
+                                   key=lambda sub: getattr(sub, 'priority', 100)):
+            priority = getattr(subscription, 'priority', 100)
+            entry = (subscription, asyncio.iscoroutinefunction(subscription))
+            if len(groups) > 0 and groups[-1][0] == priority:
+                groups[-1][1].append(entry)
+            else:
+                groups.append((priority, [entry]))
+        plan = tuple((priority, tuple(entries)) for priority, entries in groups)
+
+        if len(self._subscriber_plans) >= MAX_SUBSCRIBER_PLANS:
+            self._subscriber_plans.clear()
+        self._subscriber_plans[(required, provided)] = plan
+        return plan
+
     @profilable
     async def asubscribers(self, objects, provided):
-        subscriptions = self.subscriptions(map(providedBy, objects), provided)
+        concurrent = _settings.app_settings.get('concurrent_subscribers', False)
         results = []
-        for subscription in sorted(subscriptions,
-                                   key=lambda sub: getattr(sub, 'priority', 100)):
-            if asyncio.iscoroutinefunction(subscription):
-                results.append(await subscription(*objects))
-            else:
-                results.append(subscription(*objects))
+        for _, subscriptions in self.get_subscriber_plan(objects, provided):
+            if concurrent and len(subscriptions) > 1:
+                # subscribers with the same priority do not depend on each other
+                results.extend(await asyncio.gather(*[
+                    _call_subscription(subscription, is_async, objects)
+                    for subscription, is_async in subscriptions]))
+                continue
+            for subscription, is_async in subscriptions:
+                if is_async:
+                    results.append(await subscription(*objects))
+                else:
+                    results.append(subscription(*objects))
         return results
 
 
     @profilable
     def subscribers(self, objects, provided):
-        subscriptions = self.subscriptions(map(providedBy, objects), provided)
         result = []
-        for subscription in sorted(subscriptions,
-                                   key=lambda sub: getattr(sub, 'priority', 100)):
-            if not asyncio.iscoroutinefunction(subscription):
-                result.append(subscription(*objects))
+        for _, subscriptions in self.get_subscriber_plan(objects, provided):
+            for subscription, is_async in subscriptions:
+                if not is_async:
+                    result.append(subscription(*objects))
         return result
 
 
+async def _call_subscription(subscription, is_async, objects):
+    if is_async:
+        return await subscription(*objects)
+    return subscription(*objects)
+
+
 class GuillotinaAdapterRegistry(AdapterRegistry):
     """
     Customized adapter registry for async
@@ -646,3 +646,41 @@ async def get_all_behaviors(content, create=False, load=True) -> list:
                 await behavior.load(create=create)
         behaviors.append((behavior_schema, behavior))
     return behaviors
+
+
+async def prefetch_behavior_annotations(obs, schemas=None) -> None:
+    '''
+    Load the annotations the async behaviors of `obs` are stored in with one
+    query per transaction so loading the behaviors afterwards does not query
+    the database for each behavior of each object.
+
+    :param schemas: only prefetch for these schemas instead of all the behaviors
+    '''
+    groups: dict = {}  # txn -> (obs, annotation ids)
+    for ob in obs:
+        txn = ob._p_jar
+        if txn is None or ob._p_oid is None:
+            continue
+        annotations = ob.__gannotations__
+        for behavior_schema in (schemas if schemas is not None
+                                else get_all_behavior_interfaces(ob)):
+            try:
+                behavior = behavior_schema(ob)
+            except TypeError:
+                continue
+            if not IAsyncBehavior.implementedBy(behavior.__class__):  # pylint: disable=E1120
+                continue
+            key = behavior.__annotations_data_key__
+            if key not in annotations:
+                if txn not in groups:
+                    groups[txn] = ({}, set())
+                groups[txn][0][id(ob)] = ob
+                groups[txn][1].add(key)
+
+    for txn, (group_obs, ids) in groups.items():
+        found = await txn.get_annotations(list(group_obs.values()), list(ids))
+        for ob in group_obs.values():
+            annotations = ob.__gannotations__
+            for key in ids:
+                if key not in annotations and (ob._p_oid, key) in found:
+                    annotations[key] = found[(ob._p_oid, key)]
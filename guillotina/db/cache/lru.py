@@ -0,0 +1,126 @@
+from collections import OrderedDict
+
+
+# how many invalidated keys we remember to detect stale writes
+MAX_INVALIDATION_HISTORY = 10000
+
+
+def get_size(value):
+    '''
+    Rough estimate of how many bytes a cached value uses.
+    '''
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(get_size(v) for v in value) + 8 * len(value)
+    if isinstance(value, int):
+        return 8
+    try:
+        # db record or dict of values
+        return sum(get_size(v) for v in value.values() if v is not None)
+    except AttributeError:
+        return 0
+
+
+def get_tid(value):
+    try:
+        return value['tid']
+    except (TypeError, KeyError, IndexError):
+        return None
+
+
+class LRU:
+    '''
+    Least recently used store bounded by the estimated size of the values.
+
+    Every invalidation bumps the `generation` counter and is remembered so
+    values read before the invalidation happened can be refused when they
+    are finally written to the cache.
+
+    Invalidations can provide the tid of the commit that caused them. Cached
+    values with a newer tid survive late invalidations and values older than
+    the last known invalidation of the key are refused.
+    '''
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.generation = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._invalidated = OrderedDict()
+        self._history_floor = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value, _ = self._data[key]
+        except KeyError:
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, size):
+        if size > self.max_size:
+            return
+        tid = get_tid(value)
+        if tid is not None and key in self._invalidated:
+            invalidated_tid = self._invalidated[key][1]
+            if invalidated_tid is not None and tid < invalidated_tid:
+                return
+        self._remove(key)
+        self._data[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, old_size) = self._data.popitem(last=False)
+            self.size -= old_size
+            self.evictions += 1
+
+    def _remove(self, key):
+        try:
+            _, size = self._data.pop(key)
+            self.size -= size
+        except KeyError:
+            pass
+
+    def delete(self, key):
+        self.invalidate([key])
+
+    def invalidate(self, keys, tid=None):
+        self.generation += 1
+        for key in keys:
+            if tid is not None and key in self._data:
+                cached_tid = get_tid(self._data[key][0])
+                if cached_tid is not None and cached_tid > tid:
+                    # late message, we already have a newer version
+                    continue
+            self._remove(key)
+            key_tid = tid
+            previous = self._invalidated.pop(key, None)
+            if previous is not None and previous[1] is not None:
+                key_tid = max(previous[1], tid or 0)
+            self._invalidated[key] = (self.generation, key_tid)
+        while len(self._invalidated) > MAX_INVALIDATION_HISTORY:
+            _, (generation, _) = self._invalidated.popitem(last=False)
+            self._history_floor = generation
+
+    def invalidated_since(self, key, generation):
+        '''
+        Whether the key was invalidated after the given generation.
+        Once a key is not in the history anymore, we need to be conservative.
+        '''
+        if key in self._invalidated:
+            return self._invalidated[key][0] > generation
+        return self._history_floor > generation
+
+    def clear(self):
+        self.generation += 1
+        self._history_floor = self.generation
+        self._data.clear()
+        self._invalidated.clear()
+        self.size = 0
@@ -0,0 +1,98 @@
+from guillotina import configure
+from guillotina._settings import app_settings
+from guillotina.db.cache.base import BaseCache
+from guillotina.db.cache.lru import LRU
+from guillotina.db.cache.lru import get_size
+from guillotina.db.interfaces import IStorageCache
+from guillotina.db.interfaces import ITransaction
+
+import weakref
+
+
+_stores = weakref.WeakKeyDictionary()
+
+
+def get_memory_store(storage):
+    '''
+    Process wide store of cached values for a storage
+    '''
+    try:
+        return _stores[storage]
+    except KeyError:
+        settings = app_settings.get('memory_cache', {})
+        store = _stores[storage] = LRU(settings.get('max_size', 1024 * 1024 * 200))
+
+        def invalidate(keys, tid=None):
+            if keys is None:
+                store.clear()
+            else:
+                store.invalidate(keys, tid)
+        try:
+            storage.add_invalidation_listener(invalidate)
+        except AttributeError:
+            # storage does not support invalidations from other processes
+            pass
+        return store
+
+
+@configure.adapter(for_=ITransaction, provides=IStorageCache, name="memory")
+class MemoryCache(BaseCache):
+    '''
+    Cache values in process memory so they can be shared between transactions.
+    '''
+
+    def __init__(self, transaction):
+        super().__init__(transaction)
+        self._store = get_memory_store(self._storage)
+        self._generation = self._store.generation
+        # key -> store generation at the time we missed the value
+        self._pending = {}
+
+    async def get(self, **kwargs):
+        key = self.get_key(**kwargs)
+        value = self._store.get(key)
+        if value is None:
+            self._pending[key] = self._store.generation
+        elif isinstance(value, list):
+            # do not let consumers modify cached values
+            return value[:]
+        return value
+
+    async def set(self, value, **kwargs):
+        key = self.get_key(**kwargs)
+        size = get_size(value)
+        if size > self.max_cache_record_size:
+            return
+        generation = self._pending.pop(key, self._generation)
+        if self._store.invalidated_since(key, generation):
+            # object changed while we were loading it, value might be stale
+            return
+        if isinstance(value, list):
+            value = value[:]
+        self._store.set(key, value, size)
+
+    async def clear(self):
+        self._store.clear()
+
+    async def delete(self, key):
+        await self.delete_all([key])
+
+    async def delete_all(self, keys):
+        self._store.invalidate(keys)
+        await self._publish(keys)
+
+    async def _publish(self, keys, tid=None):
+        try:
+            publish = self._storage.publish_invalidations
+        except AttributeError:
+            return
+        await publish(self._transaction, keys, tid)
+
+    async def close(self, invalidate=True):
+        if invalidate:
+            keys = self.get_transaction_cache_keys()
+            if len(keys) > 0:
+                self._store.invalidate(keys, self._transaction._tid)
+                await self._publish(keys, self._transaction._tid)
+        self._pending.clear()
+        self._generation = self._store.generation
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from guillotina._settings import app_settings
+
+import asyncio
+import random
+import time
+
+
+class ConflictTracker:
+    '''
+    Process wide statistics of conflict errors used to schedule retries.
+
+    Retries wait an exponential backoff with full jitter so requests that
+    conflicted together do not collide again. Oids conflicting at least
+    `conflict_retry.hot_spot_threshold` times within `hot_spot_window` seconds
+    are hot spots: retries of requests that conflicted on one of them run one
+    at a time in the process, holding a lock for the oid. The first attempt of
+    write requests to a path that last conflicted on a hot spot takes the lock
+    too so it does not collide with the retries.
+    '''
+
+    def __init__(self):
+        self._oids = OrderedDict()
+        self._paths = OrderedDict()
+        # oids of the last conflict of every path
+        self._path_oids = OrderedDict()
+        self._locks = {}
+        self._counters = {
+            'conflicts': 0,
+            'retries': 0,
+            'exhausted': 0
+        }
+
+    @property
+    def settings(self):
+        return app_settings.get('conflict_retry', {})
+
+    def _get_path_counters(self, path):
+        try:
+            counters = self._paths[path]
+        except KeyError:
+            counters = self._paths[path] = {
+                'conflicts': 0,
+                'retries': 0,
+                'exhausted': 0
+            }
+            max_tracked = self.settings.get('max_tracked', 1000)
+            while len(self._paths) > max_tracked:
+                self._paths.popitem(last=False)
+        else:
+            self._paths.move_to_end(path)
+        return counters
+
+    def _count(self, name, path):
+        self._counters[name] += 1
+        if path is not None:
+            self._get_path_counters(path)[name] += 1
+
+    def record_conflict(self, oids, path=None):
+        self._count('conflicts', path)
+        now = time.time()
+        window = self.settings.get('hot_spot_window', 10)
+        max_tracked = self.settings.get('max_tracked', 1000)
+        if path is not None:
+            self._path_oids.pop(path, None)
+            self._path_oids[path] = tuple(oids)
+            while len(self._path_oids) > max_tracked:
+                self._path_oids.popitem(last=False)
+        for oid in oids:
+            entry = self._oids.pop(oid, None)
+            if entry is None or now - entry[1] > window:
+                # [number of conflicts, start of the window]
+                entry = [0, now]
+            entry[0] += 1
+            self._oids[oid] = entry
+        while len(self._oids) > max_tracked:
+            self._oids.popitem(last=False)
+
+    def record_retry(self, path=None):
+        self._count('retries', path)
+
+    def record_exhausted(self, path=None):
+        self._count('exhausted', path)
+
+    def is_hot(self, oid):
+        entry = self._oids.get(oid)
+        if entry is None:
+            return False
+        if time.time() - entry[1] > self.settings.get('hot_spot_window', 10):
+            return False
+        return entry[0] >= self.settings.get('hot_spot_threshold', 3)
+
+    def get_hot_oids(self, path):
+        '''
+        Hot oids the last conflict of requests to path was on
+        '''
+        return [oid for oid in self._path_oids.get(path, ()) if self.is_hot(oid)]
+
+    def get_retry_delay(self, attempt):
+        '''
+        Seconds to wait before the retry number `attempt` of a request
+        '''
+        backoff = self.settings.get('backoff', 0.01)
+        max_backoff = self.settings.get('max_backoff', 0.5)
+        return random.uniform(0, min(max_backoff, backoff * (2 ** (attempt - 1))))
+
+    async def acquire(self, oids, request):
+        '''
+        Lock the hot oids of a conflict for an attempt of request.
+        Returns the oids to release when the attempt is done.
+        '''
+        if not self.settings.get('serialize_hot_spots', True):
+            return []
+        held = getattr(request, '_conflict_locks', None)
+        if held is None:
+            held = request._conflict_locks = set()
+        timeout = self.settings.get('hot_spot_lock_timeout', 5)
+        acquired = []
+        for oid in sorted(set(oids)):
+            if oid in held or not self.is_hot(oid):
+                continue
+            lock = self._locks.get(oid)
+            if lock is None:
+                lock = self._locks[oid] = asyncio.Lock()
+            try:
+                await asyncio.wait_for(lock.acquire(), timeout)
+            except asyncio.TimeoutError:
+                # do not wait forever on requests holding other hot spots
+                continue
+            held.add(oid)
+            acquired.append(oid)
+        return acquired
+
+    def release(self, oids, request):
+        for oid in oids:
+            request._conflict_locks.discard(oid)
+            lock = self._locks[oid]
+            lock.release()
+            if not lock.locked() and not lock._waiters:
+                del self._locks[oid]
+
+    def get_metrics(self):
+        return {
+            'conflicts': self._counters['conflicts'],
+            'retries': self._counters['retries'],
+            'exhausted': self._counters['exhausted'],
+            'hot_spots': {
+                oid: entry[0] for oid, entry in self._oids.items() if self.is_hot(oid)},
+            'locked': len(self._locks),
+            'paths': {path: dict(counters) for path, counters in self._paths.items()}
+        }
+
+    def clear(self):
+        self._oids.clear()
+        self._paths.clear()
+        self._path_oids.clear()
+        for name in self._counters:
+            self._counters[name] = 0
+
+
+conflict_tracker = ConflictTracker()
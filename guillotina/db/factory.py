@@ -86,7 +86,7 @@ async def CRDatabaseConfigurationFactory(key, dbconfig, loop=None):
 
 @configure.utility(provides=IDatabaseConfigurationFactory, name="DUMMY")
 async def DummyDatabaseConfigurationFactory(key, dbconfig, loop=None):
-    dss = DummyStorage()
+    dss = DummyStorage(cache_strategy=dbconfig.get('cache_strategy', 'dummy'))
     db = Database(key, dss)
     await db.initialize()
     return db
@@ -94,7 +94,8 @@ async def DummyDatabaseConfigurationFactory(key, dbconfig, loop=None):
 
 @configure.utility(provides=IDatabaseConfigurationFactory, name="DUMMY_FILE")
 async def DummyFileDatabaseConfigurationFactory(key, dbconfig, loop=None):
-    dss = DummyFileStorage(dbconfig.get('filename', 'g.db'))
+    dss = DummyFileStorage(dbconfig.get('filename', 'g.db'),
+                           cache_strategy=dbconfig.get('cache_strategy', 'dummy'))
     db = Database(key, dss)
     await db.initialize()
     return db
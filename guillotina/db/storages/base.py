@@ -1,11 +1,19 @@
 
 
+import logging
+
+
+logger = logging.getLogger('guillotina')
+
+
 class BaseStorage:
 
     _cache_strategy = 'dummy'
     _read_only = False
     _transaction_strategy = 'resolve'
     _supports_unique_constraints = False
+    # number of objects pending in a commit to start using store_batch
+    _store_batch_threshold = None
 
     def __init__(self, read_only=False, transaction_strategy='resolve',
                  cache_strategy='dummy'):
@@ -15,6 +23,7 @@ class BaseStorage:
         self._hits = 0
         self._misses = 0
         self._stored = 0
+        self._invalidation_listeners = []
 
     @property
     def supports_unique_constraints(self):
@@ -23,6 +32,41 @@ class BaseStorage:
     def read_only(self):
         return self._read_only
 
+    def add_invalidation_listener(self, callback):
+        '''
+        callback(keys, tid) is called when cache keys are invalidated by
+        other processes. `keys` is None when everything needs to be invalidated.
+        '''
+        self._invalidation_listeners.append(callback)
+
+    def invalidate_cache(self, keys, tid=None):
+        for callback in self._invalidation_listeners:
+            try:
+                callback(keys, tid)
+            except Exception:
+                logger.warning('Error invalidating cache', exc_info=True)
+
+    async def publish_invalidations(self, txn, keys, tid=None):
+        '''
+        Let other processes know about the cache keys invalidated by txn.
+        `tid` is the transaction id of the commit that caused the invalidation.
+        '''
+        pass
+
+    def get_vacuum_metrics(self):
+        '''
+        Progress of deleting trashed objects or None if the storage
+        deletes them right away
+        '''
+        return None
+
+    async def get_vacuum_progress(self):
+        '''
+        Objects left to delete of every trashed object being vacuumed or
+        None if the storage deletes them right away
+        '''
+        return None
+
     async def finalize(self):
         raise NotImplemented()  # pragma: no cover
 
@@ -38,9 +82,30 @@ class BaseStorage:
     async def load(self, txn, oid):
         raise NotImplemented()  # pragma: no cover
 
+    async def load_with_ancestors(self, txn, oid):
+        '''
+        record of the object followed by the records of its parents
+        '''
+        records = []
+        while oid:
+            try:
+                record = await self.load(txn, oid)
+            except KeyError:
+                break
+            records.append(record)
+            oid = record['parent_id']
+        return records
+
     async def store(self, oid, old_serial, writer, obj, txn):
         raise NotImplemented()  # pragma: no cover
 
+    async def store_batch(self, txn, objects):
+        '''
+        Store list of (oid, old_serial, writer, obj)
+        '''
+        for oid, old_serial, writer, obj in objects:
+            await self.store(oid, old_serial, writer, obj, txn)
+
     async def delete(self, txn, oid):
         raise NotImplemented()  # pragma: no cover
 
@@ -68,24 +133,90 @@ class BaseStorage:
     async def get_page_of_keys(self, txn, oid, page=1, page_size=1000):
         raise NotImplemented()  # pragma: no cover
 
+    async def get_keys_after(self, txn, oid, after=None, page_size=1000):
+        raise NotImplemented()  # pragma: no cover
+
+    async def get_page_of_children(self, txn, oid, page=1, page_size=1000, after=None):
+        raise NotImplemented()  # pragma: no cover
+
     async def keys(self, txn, oid):
         raise NotImplemented()  # pragma: no cover
 
     async def get_child(self, txn, parent_oid, id):
         raise NotImplemented()  # pragma: no cover
 
+    async def get_children_by_path(self, txn, parent_oid, path):
+        '''
+        records of the children along `path`, stops at the first id not found
+        '''
+        records = []
+        for id in path:
+            try:
+                record = await self.get_child(txn, parent_oid, id)
+            except KeyError:
+                record = None
+            if record is None:
+                break
+            records.append(record)
+            parent_oid = record['zoid']
+        return records
+
+    async def count_subtree(self, txn, oid):
+        '''
+        number of objects below `oid`
+        '''
+        count = 0
+        async for _ in self.iter_subtree(txn, oid):
+            count += 1
+        return count
+
+    async def iter_subtree(self, txn, oid, batch_size=1000):
+        '''
+        records, with their `parent_id`, of the objects below `oid`. Parents are
+        before their children and siblings are sorted by oid
+        '''
+        after = None
+        while True:
+            records = await self.get_page_of_children(
+                txn, oid, page_size=batch_size, after=after)
+            for record in records:
+                yield dict(record, parent_id=oid)
+                async for child in self.iter_subtree(txn, record['zoid'], batch_size):
+                    yield child
+            if len(records) < batch_size:
+                break
+            after = records[-1]['zoid']
+
     async def has_key(self, txn, parent_oid, id):
         raise NotImplemented()  # pragma: no cover
 
     async def len(self, txn, oid):
         raise NotImplemented()  # pragma: no cover
 
+    async def estimate_len(self, txn, oid):
+        return await self.len(txn, oid)
+
     async def items(self, txn, oid):
         raise NotImplemented()  # pragma: no cover
 
     async def get_annotation(self, txn, oid, id):
         raise NotImplemented()  # pragma: no cover
 
+    async def get_annotations(self, txn, oids, ids):
+        '''
+        records of the annotations `ids` of all the objects in `oids`
+        '''
+        records = []
+        for oid in oids:
+            for id in ids:
+                try:
+                    record = await self.get_annotation(txn, oid, id)
+                except KeyError:
+                    continue
+                if record is not None:
+                    records.append(record)
+        return records
+
     async def get_annotation_keys(self, txn, oid):
         raise NotImplemented()  # pragma: no cover
 
@@ -98,6 +229,17 @@ class BaseStorage:
     async def read_blob_chunks(self, txn, bid):
         raise NotImplemented()  # pragma: no cover
 
+    async def iter_blob_chunks(self, txn, bid, start_index, end_index, prefetch=1):
+        '''
+        records, with their `chunk_index`, of the chunks of a blob from
+        `start_index` up to `end_index`(exclusive)
+        '''
+        for index in range(start_index, end_index):
+            record = await self.read_blob_chunk(txn, bid, index)
+            if record is None:
+                return
+            yield dict(record, chunk_index=index)
+
     async def del_blob(self, txn, bid):
         raise NotImplemented()  # pragma: no cover
 
@@ -110,5 +252,5 @@ class BaseStorage:
     async def get_total_resources_of_type(self, txn, type_):
         raise NotImplemented()  # pragma: no cover
 
-    async def _get_page_resources_of_type(self, txn, type_, page, page_size):
+    async def _get_page_resources_of_type(self, txn, type_, page, page_size, after=None):
         raise NotImplemented()  # pragma: no cover
@@ -1,12 +1,14 @@
 from guillotina import glogging
 from guillotina.db.oid import MAX_OID_LENGTH
 from guillotina.db.storages import pg
+from guillotina.db.storages.base import BaseStorage
 from guillotina.exceptions import ConflictError
 from guillotina.exceptions import ConflictIdOnContainer
 from guillotina.exceptions import RestartCommit
 from guillotina.exceptions import TIDConflictError
 
 import asyncpg
+import time
 
 
 logger = glogging.getLogger('guillotina')
@@ -108,6 +110,27 @@ SAVEPOINT cockroach_restart;''')
         self._status = 'rolledback'
 
 
+class CockroachVacuum(pg.PGVacuum):
+    '''
+    Temporary tables and recursive queries are not supported so the
+    objects below a trashed object are deleted along with it
+    '''
+
+    _setup_statement = None
+
+    async def vacuum(self, oid):
+        self._current = oid
+        conn = await self.get_connection()
+        start = time.time()
+        await conn.execute(pg.DELETE_OBJECT, oid)
+        self._elapsed += time.time() - start
+        self._counters['deleted_objects'] += 1
+        self._counters['vacuumed'] += 1
+
+    async def get_progress(self):
+        return {}
+
+
 class CockroachStorage(pg.PostgresqlStorage):
     '''
     Differences that we use from postgresql:
@@ -126,7 +149,10 @@ class CockroachStorage(pg.PostgresqlStorage):
     '''
 
     _db_transaction_factory = CockroachDBTransaction
+    _vacuum_class = CockroachVacuum
     _vacuum = _vacuum_task = None
+    # LISTEN/NOTIFY is not supported
+    _invalidations_class = None
 
     def __init__(self, *args, **kwargs):
         transaction_strategy = kwargs.get('transaction_strategy', 'dbresolve_readcommitted')
@@ -138,6 +164,8 @@ class CockroachStorage(pg.PostgresqlStorage):
             transaction_strategy = 'dbresolve_readcommitted'
         kwargs['transaction_strategy'] = transaction_strategy
         super().__init__(*args, **kwargs)
+        # batched statements use jsonb
+        self._store_batch_threshold = None
 
     async def initialize_tid_statements(self):
         self._stmt_next_tid = await self._read_conn.prepare(NEXT_TID)
@@ -145,6 +173,27 @@ class CockroachStorage(pg.PostgresqlStorage):
     async def get_current_tid(self, txn):
         raise Exception("cockroach does not support voting")
 
+    async def get_children_by_path(self, txn, parent_oid, path):
+        # recursive queries are not supported
+        return await BaseStorage.get_children_by_path(self, txn, parent_oid, path)
+
+    async def load_with_ancestors(self, txn, oid):
+        return await BaseStorage.load_with_ancestors(self, txn, oid)
+
+    async def count_subtree(self, txn, oid):
+        return await BaseStorage.count_subtree(self, txn, oid)
+
+    def iter_subtree(self, txn, oid, batch_size=pg.SUBTREE_BATCH_SIZE):
+        return BaseStorage.iter_subtree(self, txn, oid, batch_size)
+
+    def iter_blob_chunks(self, txn, bid, start_index, end_index, prefetch=1):
+        # cursors are not supported
+        return BaseStorage.iter_blob_chunks(self, txn, bid, start_index, end_index, prefetch)
+
+    async def estimate_len(self, txn, oid):
+        # EXPLAIN output is not compatible with postgresql
+        return await self.len(txn, oid)
+
     async def has_unique_constraint(self):
         try:
             for result in await self._read_conn.fetch('''SHOW CONSTRAINTS FROM objects;'''):
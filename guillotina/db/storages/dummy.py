@@ -25,11 +25,11 @@ class DummyStorage(BaseStorage):
 
     _db = None
 
-    def __init__(self, read_only=False):
+    def __init__(self, read_only=False, cache_strategy='dummy'):
         self._lock = asyncio.Lock()
         self._db = {}
         self._blobs = {}
-        super().__init__(read_only)
+        super().__init__(read_only, cache_strategy=cache_strategy)
 
     async def finalize(self):
         pass
@@ -164,6 +164,15 @@ class DummyStorage(BaseStorage):
         parent_ob = self._db[parent_id]
         return await self.load(txn, parent_ob['children'][id])
 
+    async def get_children_by_path(self, txn, parent_id, path):
+        records = []
+        for id in path:
+            if id not in self._db.get(parent_id, {}).get('children', {}):
+                break
+            parent_id = self._db[parent_id]['children'][id]
+            records.append(await self.load(txn, parent_id))
+        return records
+
     async def has_key(self, txn, parent_id, id):
         if parent_id in self._db:
             parent_ob = self._db[parent_id]
@@ -191,6 +200,15 @@ class DummyStorage(BaseStorage):
     async def get_annotation(self, txn, oid, id):
         return await self.load(txn, self._db[oid]['ofs'][id])
 
+    async def get_annotations(self, txn, oids, ids):
+        records = []
+        for oid in oids:
+            ofs = self._db[oid]['ofs'] if oid in self._db else {}
+            for id in ids:
+                if id in ofs:
+                    records.append(await self.load(txn, ofs[id]))
+        return records
+
     async def get_annotation_keys(self, txn, oid):
         keys = []
         for of_id in self._db[oid]['ofs'].values():
@@ -211,9 +229,12 @@ class DummyStorage(BaseStorage):
         self._blobs[bid]['chunks'].append(data)
 
     async def read_blob_chunk(self, txn, bid, chunk=0):
-        return {
-            'data': self._blobs[bid]['chunks'][chunk]
-        }
+        try:
+            return {
+                'data': self._blobs[bid]['chunks'][chunk]
+            }
+        except IndexError:
+            return None
 
     async def get_conflicts(self, txn):
         return []
@@ -225,12 +246,46 @@ class DummyStorage(BaseStorage):
         end = start + page_size
         return [self._db[key]['id'] for key in keys[start:end]]
 
+    async def get_keys_after(self, txn, oid, after=None, page_size=1000):
+        children = self._db[oid]['children']
+        keys = [k for k in sorted(children.values()) if after is None or k > after]
+        return [{
+            'zoid': key,
+            'id': self._db[key]['id']
+        } for key in keys[:page_size]]
+
+    async def get_page_of_children(self, txn, oid, page=1, page_size=1000, after=None):
+        children = self._db[oid]['children']
+        keys = sorted(children.values())
+        if after is not None:
+            keys = [k for k in keys if k > after][:page_size]
+        else:
+            start = (page - 1) * page_size
+            keys = keys[start:start + page_size]
+        return [await self.load(txn, key) for key in keys]
+
+    async def get_total_resources_of_type(self, txn, type_):
+        return len([
+            oid for oid, record in self._db.items()
+            if record is not None and record['type'] == type_])
+
+    async def _get_page_resources_of_type(self, txn, type_, page, page_size, after=None):
+        keys = sorted(
+            oid for oid, record in self._db.items()
+            if record is not None and record['type'] == type_)
+        if after is not None:
+            keys = [k for k in keys if k > after][:page_size]
+        else:
+            start = (page - 1) * page_size
+            keys = keys[start:start + page_size]
+        return [await self.load(txn, key) for key in keys]
+
 
 @implementer(IStorage)
 class DummyFileStorage(DummyStorage):  # pragma: no cover
 
-    def __init__(self, filename='g.db'):
-        super(DummyFileStorage, self).__init__()
+    def __init__(self, filename='g.db', cache_strategy='dummy'):
+        super(DummyFileStorage, self).__init__(cache_strategy=cache_strategy)
         self.filename = filename
         self.blob_filename = self.filename + '.blobs'
         self.__load()
@@ -1,4 +1,5 @@
 from asyncio import shield
+from contextlib import contextmanager
 from guillotina._settings import app_settings
 from guillotina.db import TRASHED_ID
 from guillotina.db.interfaces import IPostgresStorage
@@ -16,12 +17,16 @@ import asyncpg
 import asyncpg.connection
 import concurrent
 import logging
+import re
 import time
 import ujson
+import uuid
 
 
 log = logging.getLogger("guillotina.storage")
 
+# guard against parent_id cycles when loading the parents of an object
+MAX_ANCESTORS = 256
 
 # we can not use FOR UPDATE or FOR SHARE unfortunately because
 # it can cause deadlocks on the database--we need to resolve them ourselves
@@ -31,6 +36,24 @@ GET_OID = f"""
     WHERE zoid = $1::varchar({MAX_OID_LENGTH})
     """
 
+# object and all of its parents, the object first
+GET_OID_WITH_ANCESTORS = f"""
+    WITH RECURSIVE ancestors(zoid, tid, state_size, resource, of, parent_id, id, type,
+                             state, depth) AS (
+        SELECT zoid, tid, state_size, resource, of, parent_id, id, type, state, 0
+        FROM objects
+        WHERE zoid = $1::varchar({MAX_OID_LENGTH})
+        UNION ALL
+        SELECT o.zoid, o.tid, o.state_size, o.resource, o.of, o.parent_id, o.id, o.type,
+               o.state, a.depth + 1
+        FROM objects o, ancestors a
+        WHERE o.zoid = a.parent_id AND a.depth < {MAX_ANCESTORS}
+    )
+    SELECT zoid, tid, state_size, resource, of, parent_id, id, type, state
+    FROM ancestors
+    ORDER BY depth
+    """
+
 GET_CHILDREN_KEYS = f"""
     SELECT id
     FROM objects
@@ -49,6 +72,49 @@ GET_CHILD = f"""
     WHERE parent_id = $1::varchar({MAX_OID_LENGTH}) AND id = $2::text
     """
 
+# children along a path of ids, one row per path segment found
+GET_CHILDREN_BY_PATH = f"""
+    WITH RECURSIVE children(zoid, tid, state_size, resource, type, state, id, depth) AS (
+        SELECT zoid, tid, state_size, resource, type, state, id, 1
+        FROM objects
+        WHERE parent_id = $1::varchar({MAX_OID_LENGTH}) AND id = ($2::text[])[1]
+        UNION ALL
+        SELECT o.zoid, o.tid, o.state_size, o.resource, o.type, o.state, o.id,
+               c.depth + 1
+        FROM objects o, children c
+        WHERE o.parent_id = c.zoid AND o.id = ($2::text[])[c.depth + 1]
+    )
+    SELECT zoid, tid, state_size, resource, type, state, id
+    FROM children
+    ORDER BY depth
+    """
+
+# objects below an object with the oids of their parents from it, sorting by
+# that path lists parents before their children and siblings in key order
+_SUBTREE = f"""
+    WITH RECURSIVE subtree(zoid, path) AS (
+        SELECT zoid, ARRAY[zoid]::varchar[]
+        FROM objects
+        WHERE parent_id = $1::varchar({MAX_OID_LENGTH})
+        UNION ALL
+        SELECT o.zoid, s.path || o.zoid
+        FROM objects o, subtree s
+        WHERE o.parent_id = s.zoid AND array_length(s.path, 1) < {MAX_ANCESTORS}
+    )
+    """
+
+COUNT_SUBTREE = _SUBTREE + """
+    SELECT count(*) FROM subtree
+    """
+
+GET_SUBTREE = _SUBTREE + """
+    SELECT o.zoid, o.tid, o.state_size, o.resource, o.parent_id, o.type, o.state, o.id
+    FROM subtree s, objects o
+    WHERE o.zoid = s.zoid
+    ORDER BY s.path
+    """
+
+
 GET_CHILDREN_BATCH = f"""
     SELECT zoid, tid, state_size, resource, type, state, id
     FROM objects
@@ -77,6 +143,14 @@ GET_ANNOTATION = f"""
         id = $2::text
     """
 
+GET_ANNOTATIONS = f"""
+    SELECT zoid, tid, state_size, resource, type, state, id, parent_id, of
+    FROM objects
+    WHERE
+        of = ANY($1::varchar({MAX_OID_LENGTH})[]) AND
+        id = ANY($2::text[])
+    """
+
 def _wrap_return_count(txt):
     return """WITH rows AS (
 {}
@@ -85,6 +159,11 @@ def _wrap_return_count(txt):
 SELECT count(*) FROM rows""".format(txt)
 
 
+def _get_row_count(status):
+    # command tags look like `DELETE 10` or `INSERT 0 10`
+    return int(status.split()[-1])
+
+
 # upsert without checking matching tids on updated object
 NAIVE_UPSERT = f"""
 INSERT INTO objects
@@ -132,6 +211,58 @@ UPDATE = _wrap_return_count(NAIVE_UPDATE + """ AND tid = $7::int""")
 NAIVE_UPDATE = _wrap_return_count(NAIVE_UPDATE)
 
 
+_BATCH_COLUMNS = f"""unnest(
+        $1::varchar({MAX_OID_LENGTH})[], $2::bigint[], $3::bigint[], $4::bigint[],
+        $5::boolean[], $6::varchar({MAX_OID_LENGTH})[], $7::bigint[],
+        $8::varchar({MAX_OID_LENGTH})[], $9::text[], $10::text[], $11::text[], $12::bytea[]
+    ) AS batch(zoid, tid, state_size, part, resource, of, otid, parent_id, id, type,
+               json, state)"""
+
+
+# multi row version of NAIVE_UPSERT
+BATCHED_UPSERT = f"""
+INSERT INTO objects
+(zoid, tid, state_size, part, resource, of, otid, parent_id, id, type, json, state)
+SELECT zoid, tid, state_size, part, resource, of, otid, parent_id, id, type,
+       json::jsonb, state
+FROM {_BATCH_COLUMNS}
+ON CONFLICT (zoid)
+DO UPDATE SET
+    tid = EXCLUDED.tid,
+    state_size = EXCLUDED.state_size,
+    part = EXCLUDED.part,
+    resource = EXCLUDED.resource,
+    of = EXCLUDED.of,
+    otid = EXCLUDED.otid,
+    parent_id = EXCLUDED.parent_id,
+    id = EXCLUDED.id,
+    type = EXCLUDED.type,
+    json = EXCLUDED.json,
+    state = EXCLUDED.state
+RETURNING zoid"""
+
+
+# multi row version of UPDATE, objects with mismatched tids are not returned
+BATCHED_UPDATE = f"""
+UPDATE objects
+SET
+    tid = batch.tid,
+    state_size = batch.state_size,
+    part = batch.part,
+    resource = batch.resource,
+    of = batch.of,
+    otid = batch.otid,
+    parent_id = batch.parent_id,
+    id = batch.id,
+    type = batch.type,
+    json = batch.json::jsonb,
+    state = batch.state
+FROM {_BATCH_COLUMNS}
+WHERE
+    objects.zoid = batch.zoid AND objects.tid = batch.otid
+RETURNING objects.zoid"""
+
+
 NEXT_TID = "SELECT nextval('tid_sequence');"
 MAX_TID = "SELECT last_value FROM tid_sequence;"
 
@@ -155,6 +286,15 @@ RESOURCES_BY_TYPE = """
     OFFSET $3::int
     """
 
+# keyset pagination of RESOURCES_BY_TYPE
+RESOURCES_BY_TYPE_AFTER = f"""
+    SELECT zoid, tid, state_size, resource, type, state, id
+    FROM objects
+    WHERE type=$1::TEXT AND zoid > $2::varchar({MAX_OID_LENGTH})
+    ORDER BY zoid
+    LIMIT $3::int
+    """
+
 
 GET_CHILDREN = f"""
     SELECT zoid, tid, state_size, resource, type, state, id
@@ -192,6 +332,14 @@ READ_BLOB_CHUNK = f"""
     AND chunk_index = $2::int
 """
 
+READ_BLOB_CHUNKS_RANGE = f"""
+    SELECT chunk_index, data from blobs
+    WHERE bid = $1::VARCHAR({MAX_OID_LENGTH})
+    AND chunk_index >= $2::int
+    AND chunk_index < $3::int
+    ORDER BY chunk_index
+"""
+
 
 DELETE_BLOB = f"""
     DELETE FROM blobs WHERE bid = $1::VARCHAR({MAX_OID_LENGTH});
@@ -214,11 +362,112 @@ BATCHED_GET_CHILDREN_KEYS = f"""
     OFFSET $3::int
     """
 
+# keyset pagination of BATCHED_GET_CHILDREN_KEYS
+GET_CHILDREN_KEYS_AFTER = f"""
+    SELECT zoid, id
+    FROM objects
+    WHERE parent_id = $1::varchar({MAX_OID_LENGTH})
+        AND zoid > $2::varchar({MAX_OID_LENGTH})
+    ORDER BY zoid
+    LIMIT $3::int
+    """
+
+# page of children rows with their state so they can be loaded in one query
+GET_PAGE_OF_CHILDREN = f"""
+    SELECT zoid, tid, state_size, resource, type, state, id
+    FROM objects
+    WHERE parent_id = $1::varchar({MAX_OID_LENGTH})
+    ORDER BY zoid
+    LIMIT $2::int
+    OFFSET $3::int
+    """
+
+GET_PAGE_OF_CHILDREN_AFTER = f"""
+    SELECT zoid, tid, state_size, resource, type, state, id
+    FROM objects
+    WHERE parent_id = $1::varchar({MAX_OID_LENGTH})
+        AND zoid > $2::varchar({MAX_OID_LENGTH})
+    ORDER BY zoid
+    LIMIT $3::int
+    """
+
+# planner estimate(from pg_class.reltuples and column statistics) of number of children
+ESTIMATE_NUM_CHILDREN = f"""
+    EXPLAIN (FORMAT JSON)
+    SELECT zoid FROM objects WHERE parent_id = $1::varchar({MAX_OID_LENGTH})
+    """
+
 DELETE_OBJECT = f"""
 DELETE FROM objects
 WHERE zoid = $1::varchar({MAX_OID_LENGTH});
 """
 
+# objects left to vacuum of every trashed object being vacuumed, kept
+# between restarts to resume vacuuming where it stopped
+CREATE_VACUUM_TABLE = f"""
+CREATE TABLE IF NOT EXISTS vacuum_objects (
+    root_zoid varchar({MAX_OID_LENGTH}) NOT NULL,
+    zoid varchar({MAX_OID_LENGTH}) NOT NULL,
+    path varchar[] NOT NULL,
+    PRIMARY KEY (root_zoid, zoid));
+CREATE INDEX IF NOT EXISTS vacuum_objects_path ON vacuum_objects (root_zoid, path);
+"""
+
+COUNT_VACUUM_OBJECTS = f"""
+    SELECT count(*) FROM vacuum_objects
+    WHERE root_zoid = $1::varchar({MAX_OID_LENGTH})
+    """
+
+GET_VACUUM_PROGRESS = """
+    SELECT root_zoid, count(*) AS remaining FROM vacuum_objects
+    GROUP BY root_zoid
+    """
+
+# the trashed object sorts after all of its children
+FILL_VACUUM_TABLE = _SUBTREE + f"""
+    INSERT INTO vacuum_objects
+    SELECT $1::varchar({MAX_OID_LENGTH}), zoid, path FROM subtree
+    UNION ALL
+    SELECT $1::varchar({MAX_OID_LENGTH}), $1::varchar({MAX_OID_LENGTH}), ARRAY[]::varchar[]
+    ON CONFLICT DO NOTHING
+    """
+
+# annotations sort before the object they belong to
+FILL_VACUUM_TABLE_ANNOTATIONS = f"""
+    INSERT INTO vacuum_objects
+    SELECT v.root_zoid, o.zoid, v.path || o.zoid
+    FROM objects o, vacuum_objects v
+    WHERE o.of = v.zoid AND v.root_zoid = $1::varchar({MAX_OID_LENGTH})
+    ON CONFLICT DO NOTHING
+    """
+
+DELETE_VACUUM_BLOBS = f"""
+    DELETE FROM blobs
+    WHERE ctid = ANY(ARRAY(
+        SELECT b.ctid FROM blobs b, vacuum_objects v
+        WHERE b.zoid = v.zoid AND v.root_zoid = $1::varchar({MAX_OID_LENGTH})
+        LIMIT $2::int))
+    """
+
+# children before their parents so deleting them does not cascade.
+# objects already deleted by other processes are consumed too.
+DELETE_VACUUM_OBJECTS = f"""
+    WITH batch AS (
+        DELETE FROM vacuum_objects
+        WHERE root_zoid = $1::varchar({MAX_OID_LENGTH}) AND zoid IN (
+            SELECT zoid FROM vacuum_objects
+            WHERE root_zoid = $1::varchar({MAX_OID_LENGTH})
+            ORDER BY path DESC
+            LIMIT $2::int)
+        RETURNING zoid),
+    deleted AS (
+        DELETE FROM objects
+        WHERE zoid IN (SELECT zoid FROM batch)
+        RETURNING zoid)
+    SELECT (SELECT count(*) FROM batch) AS consumed,
+           (SELECT count(*) FROM deleted) AS deleted
+    """
+
 GET_TRASHED_OBJECTS = f"""
 SELECT zoid from objects where parent_id = '{TRASHED_ID}';
 """
@@ -231,9 +480,53 @@ RETURNING id;
 '''
 
 
+PUBLISH_INVALIDATIONS = """
+    SELECT pg_notify($1::text, payload)
+    FROM unnest($2::text[]) AS payload
+"""
+
+
+# max number of rows written with one batched statement
+BATCH_STORE_SIZE = 500
+
+# number of rows fetched at a time when working on a subtree
+SUBTREE_BATCH_SIZE = 1000
+
+# number of objects or blob chunks deleted with one statement by the vacuum
+VACUUM_BATCH_SIZE = 1000
+
+# seconds to wait between two full batches of the vacuum
+VACUUM_DELAY = 0.0
+
 # how long to wait before trying to recover bad connections
 BAD_CONNECTION_RESTART_DELAY = 0.25
 
+# NOTIFY payloads must be shorter than 8000 bytes
+MAX_NOTIFY_PAYLOAD_SIZE = 7000
+
+# how often we check the invalidation connection is still alive
+INVALIDATION_KEEPALIVE_INTERVAL = 5
+
+
+# missing object referenced by a stored row
+_FOREIGN_KEY_DETAIL = re.compile(r'Key \((?P<column>parent_id|of)\)=\((?P<oid>[^)]*)\)')
+
+
+def _get_failing_stores(ex, objects):
+    '''
+    (oid, old_serial, writer, obj) of objects that reference the missing
+    object of a foreign key violation storing `objects`
+    '''
+    match = _FOREIGN_KEY_DETAIL.search(getattr(ex, 'detail', None) or '')
+    if match is not None:
+        failing = [
+            stored for stored in objects
+            if getattr(stored[2], match.group('column')) == match.group('oid')]
+        if len(failing) > 0:
+            return failing
+    # row not reported, blame all of them
+    return objects
+
 
 class LightweightConnection(asyncpg.connection.Connection):
     '''
@@ -260,13 +553,39 @@ class LightweightConnection(asyncpg.connection.Connection):
 
 
 class PGVacuum:
+    '''
+    Delete trashed objects in the background.
+
+    A dedicated connection is used so vacuuming does not compete with requests
+    for connections of the pool. The objects below a trashed object are listed
+    in the `vacuum_objects` table and deleted in batches, blob chunks first and
+    then children before their parents, and every batch is committed on its
+    own. The trashed object is deleted last so vacuuming resumes from the trash,
+    with the objects left in `vacuum_objects`, after a restart.
+    '''
 
-    def __init__(self, storage, loop):
+    # run on every new connection
+    _setup_statement = CREATE_VACUUM_TABLE
+
+    def __init__(self, storage, loop, batch_size=VACUUM_BATCH_SIZE, delay=VACUUM_DELAY):
         self._storage = storage
         self._loop = loop
         self._queue = asyncio.Queue(loop=loop)
         self._closed = False
         self._active = False
+        self._conn = None
+        self._batch_size = batch_size
+        self._delay = delay
+        self._current = None
+        self._remaining = 0
+        self._elapsed = 0.0
+        self._counters = {
+            'vacuumed': 0,
+            'resumed': 0,
+            'deleted_objects': 0,
+            'deleted_blob_chunks': 0,
+            'errors': 0
+        }
 
     async def initialize(self):
         while not self._closed:
@@ -279,20 +598,20 @@ class PGVacuum:
     async def _initialize(self):
         # get existing trashed objects, push them on the queue...
         # there might be contention, but that is okay
-        conn = None
         try:
-            conn = await self._storage.open()
+            conn = await self.get_connection()
             for record in await conn.fetch(GET_TRASHED_OBJECTS):
                 self._queue.put_nowait(record['zoid'])
+        except (concurrent.futures.CancelledError, RuntimeError):
+            raise
         except concurrent.futures.TimeoutError:
             log.info('Timed out connecting to storage')
         except Exception:
-            log.warning('Error deleting trashed object', exc_info=True)
-        finally:
-            if conn is not None:
-                await self._storage.close(conn)
+            log.warning('Error getting trashed objects', exc_info=True)
+            await self._close_connection()
 
-        while not self._closed:
+        # keep going after closing until the queue finalize waits on is empty
+        while not self._closed or not self._queue.empty():
             oid = None
             try:
                 oid = await self._queue.get()
@@ -301,14 +620,40 @@ class PGVacuum:
             except (concurrent.futures.CancelledError, RuntimeError):
                 raise
             except Exception:
+                self._counters['errors'] += 1
                 log.warning(f'Error vacuuming oid {oid}', exc_info=True)
+                # reconnect on the next object, it stays in the trash until then
+                await self._close_connection()
             finally:
                 self._active = False
+                self._current = None
+                self._remaining = 0
                 try:
                     self._queue.task_done()
                 except ValueError:
                     pass
 
+    async def get_connection(self):
+        if self._conn is None or self._conn.is_closed():
+            self._conn = await asyncpg.connect(
+                dsn=self._storage._dsn, loop=self._loop,
+                **self._storage._connection_options)
+            if self._setup_statement is not None:
+                try:
+                    await self._conn.execute(self._setup_statement)
+                except asyncpg.exceptions.UniqueViolationError:
+                    # created by another process at the same time
+                    pass
+        return self._conn
+
+    async def _close_connection(self):
+        if self._conn is not None:
+            try:
+                await shield(self._conn.close())
+            except Exception:
+                pass
+            self._conn = None
+
     async def add_to_queue(self, oid):
         if self._closed:
             raise Exception('Closing down')
@@ -318,20 +663,179 @@ class PGVacuum:
         '''
         DELETED objects has parent id changed to the trashed ob for the oid...
         '''
+        self._current = oid
+        conn = await self.get_connection()
+        self._remaining = await conn.fetchval(COUNT_VACUUM_OBJECTS, oid)
+        if self._remaining > 0:
+            # stopped before finishing, or being vacuumed by another process
+            self._counters['resumed'] += 1
+        else:
+            async with conn.transaction():
+                await conn.execute(FILL_VACUUM_TABLE, oid)
+                await conn.execute(FILL_VACUUM_TABLE_ANNOTATIONS, oid)
+            self._remaining = await conn.fetchval(COUNT_VACUUM_OBJECTS, oid)
+        while True:
+            start = time.time()
+            count = _get_row_count(
+                await conn.execute(DELETE_VACUUM_BLOBS, oid, self._batch_size))
+            self._elapsed += time.time() - start
+            self._counters['deleted_blob_chunks'] += count
+            if count < self._batch_size:
+                # blobs left by concurrent deletes cascade with their objects
+                break
+            await self._wait()
+        while True:
+            start = time.time()
+            result = await conn.fetchrow(DELETE_VACUUM_OBJECTS, oid, self._batch_size)
+            self._elapsed += time.time() - start
+            self._counters['deleted_objects'] += result['deleted']
+            # other processes vacuuming the same trash may have deleted some
+            # of the objects, end with the rows left in vacuum_objects
+            self._remaining -= result['consumed']
+            if result['consumed'] < self._batch_size:
+                break
+            await self._wait()
+        self._counters['vacuumed'] += 1
+
+    async def _wait(self):
+        if self._delay:
+            # let requests use the database
+            await asyncio.sleep(self._delay)
+
+    def get_metrics(self):
+        return {
+            'queued': self._queue.qsize(),
+            'active': self._active,
+            'current': self._current,
+            'remaining': self._remaining,
+            'vacuumed': self._counters['vacuumed'],
+            'resumed': self._counters['resumed'],
+            'deleted_objects': self._counters['deleted_objects'],
+            'deleted_blob_chunks': self._counters['deleted_blob_chunks'],
+            'errors': self._counters['errors'],
+            'objects_per_second': (
+                self._counters['deleted_objects'] / self._elapsed
+                if self._elapsed > 0 else 0.0)
+        }
+
+    async def get_progress(self):
+        '''
+        objects left to vacuum of every trashed object being vacuumed,
+        by any process
+        '''
         conn = await self._storage.open()
         try:
-            await conn.execute(DELETE_OBJECT, oid)
-        except Exception:
-            log.warning('Error deleting trashed object', exc_info=True)
+            return {
+                record['root_zoid']: record['remaining']
+                for record in await conn.fetch(GET_VACUUM_PROGRESS)
+            }
+        except asyncpg.exceptions.UndefinedTableError:
+            # vacuum did not connect yet
+            return {}
         finally:
+            await self._storage.close(conn)
+
+    async def finalize(self):
+        self._closed = True
+        await self._queue.join()
+        await self._close_connection()
+
+
+class PGInvalidations:
+    '''
+    Publish and listen to cache invalidations between processes
+    with postgresql LISTEN/NOTIFY
+    '''
+
+    def __init__(self, storage, loop, channel='guillotina_invalidations'):
+        self._storage = storage
+        self._loop = loop
+        self._channel = channel
+        self._conn = None
+        self._closed = False
+        self._listening = False
+        # so we can ignore messages we published ourselves
+        self._origin = uuid.uuid4().hex
+        self.last_tid = 0
+
+    async def initialize(self):
+        while not self._closed:
             try:
-                await self._storage.close(conn)
-            except asyncpg.exceptions.ConnectionDoesNotExistError:
+                await self._initialize()
+            except (concurrent.futures.CancelledError, RuntimeError):
+                # we're okay with the task getting cancelled
+                return
+            except Exception:
+                log.warning('Error listening to cache invalidations', exc_info=True)
+            if self._listening:
+                # we can not know what we missed while we were not listening
+                self._listening = False
+                self._storage.invalidate_cache(None)
+            await asyncio.sleep(BAD_CONNECTION_RESTART_DELAY)
+
+    async def _initialize(self):
+        self._conn = await asyncpg.connect(
+            dsn=self._storage._dsn, loop=self._loop,
+            **self._storage._connection_options)
+        try:
+            await self._conn.add_listener(self._channel, self.receive)
+            self._listening = True
+            while not self._closed:
+                await asyncio.sleep(INVALIDATION_KEEPALIVE_INTERVAL)
+                await self._conn.fetchval('SELECT 1')
+        except (concurrent.futures.CancelledError, RuntimeError):
+            # connection closed on finalize
+            raise
+        except Exception:
+            await self._close_connection()
+            raise
+
+    async def _close_connection(self):
+        if self._conn is not None:
+            try:
+                await shield(self._conn.close())
+            except Exception:
                 pass
+            self._conn = None
+
+    def receive(self, conn, pid, channel, payload):
+        try:
+            data = ujson.loads(payload)
+            if data['origin'] == self._origin:
+                return
+            tid = data.get('tid')
+            keys = data['keys']
+        except (ValueError, KeyError, TypeError):
+            log.warning(f'Invalid cache invalidation message: {payload}')
+            return
+        if tid is not None and tid > self.last_tid:
+            self.last_tid = tid
+        self._storage.invalidate_cache(keys, tid)
+
+    def get_payloads(self, keys, tid=None):
+        base_size = len(ujson.dumps({
+            'origin': self._origin, 'tid': tid, 'keys': []
+        }))
+        batch = []
+        size = base_size
+        for key in keys:
+            key_size = len(ujson.dumps(key)) + 1
+            if len(batch) > 0 and size + key_size > MAX_NOTIFY_PAYLOAD_SIZE:
+                yield ujson.dumps({'origin': self._origin, 'tid': tid, 'keys': batch})
+                batch = []
+                size = base_size
+            batch.append(key)
+            size += key_size
+        if len(batch) > 0:
+            yield ujson.dumps({'origin': self._origin, 'tid': tid, 'keys': batch})
+
+    async def publish(self, conn, keys, tid=None):
+        await conn.execute(
+            PUBLISH_INVALIDATIONS, self._channel, list(self.get_payloads(keys, tid)))
 
     async def finalize(self):
         self._closed = True
-        await self._queue.join()
+        await self._close_connection()
 
 
 @implementer(IPostgresStorage)
@@ -344,6 +848,10 @@ class PostgresqlStorage(BaseStorage):
     _pool = None
     _large_record_size = 1 << 24
     _vacuum_class = PGVacuum
+    _vacuum = None
+    _invalidations_class = PGInvalidations
+    _invalidations = None
+    _store_batch_threshold = 10
 
     _object_schema = {
         'zoid': f'VARCHAR({MAX_OID_LENGTH}) NOT NULL PRIMARY KEY',
@@ -372,8 +880,10 @@ class PostgresqlStorage(BaseStorage):
         'CREATE INDEX IF NOT EXISTS object_of ON objects (of);',
         'CREATE INDEX IF NOT EXISTS object_part ON objects (part);',
         'CREATE INDEX IF NOT EXISTS object_parent ON objects (parent_id);',
+        'CREATE INDEX IF NOT EXISTS object_parent_zoid ON objects (parent_id, zoid);',
         'CREATE INDEX IF NOT EXISTS object_id ON objects (id);',
         'CREATE INDEX IF NOT EXISTS object_type ON objects (type);',
+        'CREATE INDEX IF NOT EXISTS object_type_zoid ON objects (type, zoid);',
         'CREATE INDEX IF NOT EXISTS blob_bid ON blobs (bid);',
         'CREATE INDEX IF NOT EXISTS blob_zoid ON blobs (zoid);',
         'CREATE INDEX IF NOT EXISTS blob_chunk ON blobs (chunk_index);',
@@ -399,12 +909,17 @@ class PostgresqlStorage(BaseStorage):
         self._lock = asyncio.Lock()
         self._conn_acquire_timeout = conn_acquire_timeout
         self._options = options
+        self._store_batch_threshold = options.get(
+            'store_batch_threshold', self._store_batch_threshold)
         self._connection_options = {}
         self._connection_initialized_on = time.time()
 
     async def finalize(self):
         await self._vacuum.finalize()
         self._vacuum_task.cancel()
+        if self._invalidations is not None:
+            self._invalidations_task.cancel()
+            await self._invalidations.finalize()
         try:
             await shield(self._pool.release(self._read_conn))
         except asyncpg.exceptions.InterfaceError:
@@ -414,6 +929,14 @@ class PostgresqlStorage(BaseStorage):
         # connections should not be staying open at this step
         self._pool.terminate()
 
+    def get_vacuum_metrics(self):
+        if self._vacuum is not None:
+            return self._vacuum.get_metrics()
+
+    async def get_vacuum_progress(self):
+        if self._vacuum is not None:
+            return await self._vacuum.get_progress()
+
     async def create(self):
         # Check DB
         log.info('Creating initial database objects')
@@ -516,7 +1039,10 @@ ALTER TABLE blobs ALTER COLUMN bid TYPE varchar({MAX_OID_LENGTH})''')
             await self._read_conn.execute(f'''
 ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
 
-        self._vacuum = self._vacuum_class(self, loop)
+        self._vacuum = self._vacuum_class(
+            self, loop,
+            batch_size=self._options.get('vacuum_batch_size', VACUUM_BATCH_SIZE),
+            delay=self._options.get('vacuum_delay', VACUUM_DELAY))
         self._vacuum_task = asyncio.Task(self._vacuum.initialize(), loop=loop)
 
         def vacuum_done(task):
@@ -527,6 +1053,14 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
                         'No database vacuuming will be done here anymore.')
 
         self._vacuum_task.add_done_callback(vacuum_done)
+
+        if self._invalidations_class is not None and self._cache_strategy != 'dummy':
+            self._invalidations = self._invalidations_class(
+                self, loop, channel=self._options.get(
+                    'invalidation_channel', 'guillotina_invalidations'))
+            self._invalidations_task = asyncio.Task(
+                self._invalidations.initialize(), loop=loop)
+
         self._connection_initialized_on = time.time()
 
     async def initialize_tid_statements(self):
@@ -537,6 +1071,7 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
         """Reset the tables"""
         async with self._pool.acquire() as conn:
             await conn.execute("DROP TABLE IF EXISTS blobs;")
+            await conn.execute("DROP TABLE IF EXISTS vacuum_objects;")
             await conn.execute("DROP TABLE IF EXISTS objects;")
 
     async def open(self):
@@ -565,10 +1100,12 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
             raise KeyError(oid)
         return objects
 
-    @profilable
-    async def store(self, oid, old_serial, writer, obj, txn):
-        assert oid is not None
+    async def load_with_ancestors(self, txn, oid):
+        conn = await txn.get_connection()
+        async with txn._lock:
+            return await conn.fetch(GET_OID_WITH_ANCESTORS, oid)
 
+    async def _get_store_values(self, oid, old_serial, writer, obj, txn):
         pickled = writer.serialize()  # This calls __getstate__ of obj
         if len(pickled) >= self._large_record_size:
             log.info(f"Large object {obj.__class__}: {len(pickled)}")
@@ -577,51 +1114,72 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
         part = writer.part
         if part is None:
             part = 0
+        return (
+            oid,                 # The OID of the object
+            txn._tid,            # Our TID
+            len(pickled),        # Len of the object
+            part,                # Partition indicator
+            writer.resource,     # Is a resource ?
+            writer.of,           # It belogs to a main
+            old_serial,          # Old serial
+            writer.parent_id,    # Parent OID
+            writer.id,           # Traversal ID
+            writer.type,         # Guillotina type
+            json,                # JSON catalog
+            pickled              # Pickle state)
+        )
 
-        update = False
+    @contextmanager
+    def _translate_store_errors(self, txn, objects):
+        '''
+        Convert database errors raised storing the list of
+        (oid, old_serial, writer, obj) into guillotina conflict errors
+        '''
+        oid, old_serial, writer, obj = objects[0]
+        try:
+            yield
+        except asyncpg.exceptions.UniqueViolationError as ex:
+            if 'Key (parent_id, id)' in ex.detail:
+                raise ConflictIdOnContainer(ex)
+            raise
+        except asyncpg.exceptions.ForeignKeyViolationError as ex:
+            # only the objects of the batch referencing the missing object
+            failing = _get_failing_stores(ex, objects)
+            for _, _, _, stored_obj in failing:
+                txn.deleted[stored_obj._p_oid] = stored_obj
+            oid, old_serial, writer, obj = failing[0]
+            raise TIDConflictError(
+                f'Bad value inserting into database that could be caused '
+                f'by a bad cache value. This should resolve on request retry.',
+                oid, txn, old_serial, writer, oids=[stored[0] for stored in failing])
+        except asyncpg.exceptions._base.InterfaceError as ex:
+            if 'another operation is in progress' in ex.args[0]:
+                raise ConflictError(
+                    f'asyncpg error, another operation in progress.',
+                    oid, txn, old_serial, writer)
+            raise
+        except asyncpg.exceptions.DeadlockDetectedError:
+            raise ConflictError(f'Deadlock detected.',
+                                oid, txn, old_serial, writer)
+
+    def _is_update(self, obj):
+        # we should be confident this is an object update
+        return not obj.__new_marker__ and obj._p_serial is not None
+
+    @profilable
+    async def store(self, oid, old_serial, writer, obj, txn):
+        assert oid is not None
+
+        values = await self._get_store_values(oid, old_serial, writer, obj, txn)
+        update = self._is_update(obj)
         statement_sql = NAIVE_UPSERT
-        if not obj.__new_marker__ and obj._p_serial is not None:
-            # we should be confident this is an object update
+        if update:
             statement_sql = UPDATE
-            update = True
 
         conn = await txn.get_connection()
         async with txn._lock:
-            try:
-                result = await conn.fetch(
-                    statement_sql,
-                    oid,                 # The OID of the object
-                    txn._tid,            # Our TID
-                    len(pickled),        # Len of the object
-                    part,                # Partition indicator
-                    writer.resource,     # Is a resource ?
-                    writer.of,           # It belogs to a main
-                    old_serial,          # Old serial
-                    writer.parent_id,    # Parent OID
-                    writer.id,           # Traversal ID
-                    writer.type,         # Guillotina type
-                    json,                # JSON catalog
-                    pickled              # Pickle state)
-                )
-            except asyncpg.exceptions.UniqueViolationError as ex:
-                if 'Key (parent_id, id)' in ex.detail:
-                    raise ConflictIdOnContainer(ex)
-                raise
-            except asyncpg.exceptions.ForeignKeyViolationError:
-                txn.deleted[obj._p_oid] = obj
-                raise TIDConflictError(
-                    f'Bad value inserting into database that could be caused '
-                    f'by a bad cache value. This should resolve on request retry.',
-                    oid, txn, old_serial, writer)
-            except asyncpg.exceptions._base.InterfaceError as ex:
-                if 'another operation is in progress' in ex.args[0]:
-                    raise ConflictError(
-                        f'asyncpg error, another operation in progress.',
-                        oid, txn, old_serial, writer)
-                raise
-            except asyncpg.exceptions.DeadlockDetectedError:
-                raise ConflictError(f'Deadlock detected.',
-                                    oid, txn, old_serial, writer)
+            with self._translate_store_errors(txn, [(oid, old_serial, writer, obj)]):
+                result = await conn.fetch(statement_sql, *values)
             if len(result) != 1 or result[0]['count'] != 1:
                 if update:
                     # raise tid conflict error
@@ -633,7 +1191,59 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
                 else:
                     log.error('Incorrect response count from database update. '
                               'This should not happen. tid: {}'.format(txn._tid))
-        await txn._cache.store_object(obj, pickled)
+        await txn._cache.store_object(obj, values[-1])
+
+    @profilable
+    async def store_batch(self, txn, objects):
+        '''
+        Store list of (oid, old_serial, writer, obj) with multi row statements
+        '''
+        upserts = []
+        updates = []
+        for oid, old_serial, writer, obj in objects:
+            assert oid is not None
+            values = await self._get_store_values(oid, old_serial, writer, obj, txn)
+            if self._is_update(obj):
+                updates.append((values, (oid, old_serial, writer, obj)))
+            else:
+                upserts.append((values, (oid, old_serial, writer, obj)))
+
+        conn = await txn.get_connection()
+        for statement_sql, batch in ((BATCHED_UPSERT, upserts),
+                                     (BATCHED_UPDATE, updates)):
+            for idx in range(0, len(batch), BATCH_STORE_SIZE):
+                rows = batch[idx:idx + BATCH_STORE_SIZE]
+                columns = [list(column) for column in zip(*[values for values, _ in rows])]
+                stored = [stored for _, stored in rows]
+                async with txn._lock:
+                    with self._translate_store_errors(txn, stored):
+                        result = await conn.fetch(statement_sql, *columns)
+                written = set(record['zoid'] for record in result)
+                for oid, old_serial, writer, obj in stored:
+                    if oid in written:
+                        continue
+                    if statement_sql == BATCHED_UPDATE:
+                        raise TIDConflictError(
+                            f'Mismatch of tid of object being updated. This is likely '
+                            f'caused by a cache invalidation race condition and should '
+                            f'be an edge case. This should resolve on request retry.',
+                            oid, txn, old_serial, writer)
+                    else:
+                        log.error('Incorrect response count from database update. '
+                                  'This should not happen. tid: {}'.format(txn._tid))
+
+        for values, (oid, old_serial, writer, obj) in upserts + updates:
+            await txn._cache.store_object(obj, values[-1])
+
+    async def publish_invalidations(self, txn, keys, tid=None):
+        if self._invalidations is None or len(keys) == 0:
+            return
+        try:
+            conn = await txn.get_connection()
+            async with txn._lock:
+                await self._invalidations.publish(conn, keys, tid)
+        except Exception:
+            log.warning('Error publishing cache invalidations', exc_info=True)
 
     async def _txn_oid_commit_hook(self, status, oid):
         await self._vacuum.add_to_queue(oid)
@@ -770,6 +1380,21 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
             keys.append(record['id'])
         return keys
 
+    async def get_keys_after(self, txn, oid, after=None, page_size=1000):
+        conn = await txn.get_connection()
+        async with txn._lock:
+            return await conn.fetch(
+                GET_CHILDREN_KEYS_AFTER, oid, after or '', page_size)
+
+    async def get_page_of_children(self, txn, oid, page=1, page_size=1000, after=None):
+        conn = await txn.get_connection()
+        async with txn._lock:
+            if after is not None:
+                return await conn.fetch(
+                    GET_PAGE_OF_CHILDREN_AFTER, oid, after, page_size)
+            return await conn.fetch(
+                GET_PAGE_OF_CHILDREN, oid, page_size, (page - 1) * page_size)
+
     async def keys(self, txn, oid):
         conn = await txn.get_connection()
         async with txn._lock:
@@ -781,11 +1406,33 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
             result = await self.get_one_row(txn, GET_CHILD, parent_oid, id)
         return result
 
+    async def get_children_by_path(self, txn, parent_oid, path):
+        conn = await txn.get_connection()
+        async with txn._lock:
+            return await conn.fetch(GET_CHILDREN_BY_PATH, parent_oid, path)
+
     async def get_children(self, txn, parent_oid, ids):
         conn = await txn.get_connection()
         async with txn._lock:
             return await conn.fetch(GET_CHILDREN_BATCH, parent_oid, ids)
 
+    async def count_subtree(self, txn, oid):
+        conn = await txn.get_connection()
+        async with txn._lock:
+            return await conn.fetchval(COUNT_SUBTREE, oid)
+
+    async def iter_subtree(self, txn, oid, batch_size=SUBTREE_BATCH_SIZE):
+        conn = await txn.get_connection()
+        if conn.is_in_transaction():
+            # locks are dangerous in cursors, see `items`
+            async for record in conn.cursor(GET_SUBTREE, oid, prefetch=batch_size):
+                yield record
+        else:
+            # cursors need a transaction
+            async with conn.transaction():
+                async for record in conn.cursor(GET_SUBTREE, oid, prefetch=batch_size):
+                    yield record
+
     async def has_key(self, txn, parent_oid, id):
         async with txn._lock:
             result = await self.get_one_row(txn, EXIST_CHILD, parent_oid, id)
@@ -800,6 +1447,12 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
             result = await conn.fetchval(NUM_CHILDREN, oid)
         return result
 
+    async def estimate_len(self, txn, oid):
+        conn = await txn.get_connection()
+        async with txn._lock:
+            result = await conn.fetchval(ESTIMATE_NUM_CHILDREN, oid)
+        return ujson.loads(result)[0]['Plan']['Plan Rows']
+
     async def items(self, txn, oid):
         conn = await txn.get_connection()
         async for record in conn.cursor(GET_CHILDREN, oid):
@@ -814,6 +1467,12 @@ ALTER TABLE blobs ALTER COLUMN zoid TYPE varchar({MAX_OID_LENGTH})''')
                 result = None
         return result
 
+    async def get_annotations(self, txn, oids, ids):
+        conn = await txn.get_connection()
+        async with txn._lock:
+            result = await conn.fetch(GET_ANNOTATIONS, oids, ids)
+        return [item for item in result if item['parent_id'] != TRASHED_ID]
+
     async def get_annotation_keys(self, txn, oid):
         conn = await txn.get_connection()
         async with txn._lock:
@@ -851,6 +1510,23 @@ VALUES ($1::varchar({MAX_OID_LENGTH}), -1, 0, 0, TRUE, 'stub')''', oid)
             # sub-queries and they you end up with a deadlock
             yield record
 
+    async def iter_blob_chunks(self, txn, bid, start_index, end_index, prefetch=1):
+        '''
+        Read the chunks with a cursor of a pooled connection so the transaction
+        connection stays available and `prefetch` chunks are read with every
+        round trip. Chunks written by `txn` and not committed are not visible.
+        '''
+        conn = await self.open()
+        try:
+            # cursors need a transaction
+            async with conn.transaction():
+                async for record in conn.cursor(
+                        READ_BLOB_CHUNKS_RANGE, bid, start_index, end_index,
+                        prefetch=max(prefetch, 1)):
+                    yield record
+        finally:
+            await self.close(conn)
+
     async def del_blob(self, txn, bid):
         conn = await txn.get_connection()
         async with txn._lock:
@@ -875,9 +1551,11 @@ VALUES ($1::varchar({MAX_OID_LENGTH}), -1, 0, 0, TRUE, 'stub')''', oid)
         return result
 
     # Massive treatment without security
-    async def _get_page_resources_of_type(self, txn, type_, page, page_size):
+    async def _get_page_resources_of_type(self, txn, type_, page, page_size, after=None):
         conn = await txn.get_connection()
         async with txn._lock:
+            if after is not None:
+                return await conn.fetch(RESOURCES_BY_TYPE_AFTER, type_, after, page_size)
             keys = []
             for record in await conn.fetch(
                     RESOURCES_BY_TYPE, type_, page_size, (page - 1) * page_size):
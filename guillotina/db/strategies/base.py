@@ -4,6 +4,8 @@ class BaseStrategy:
     def __init__(self, transaction):
         self._storage = transaction._manager._storage
         self._transaction = transaction
+        # oids that made tpc_vote fail
+        self.conflicting_oids = []
 
     @property
     def writable_transaction(self):
@@ -26,6 +26,7 @@ class ResolveStrategy(SimpleStrategy):
             # both writing to same object...
             tids.append(conflict["tid"])
             if conflict['zoid'] in self._transaction.modified:
+                self.conflicting_oids.append(conflict['zoid'])
                 modified_keys = [k for k in self._transaction.modified.keys()]
                 logger.warn(
                     f'Could not resolve conflicts in TID: {self._transaction._tid}\n'
@@ -118,6 +118,9 @@ class Transaction(object):
 
         self._query_count_start = self._query_count_end = 0
 
+        # (oid, id) of annotations we know are not stored
+        self._missing_annotations = set()
+
     def get_query_count(self):
         '''
         diff versions of asyncpg
@@ -242,6 +245,8 @@ class Transaction(object):
             oid = new_oid
 
         obj._p_oid = oid
+        if obj.__of__ is not None:
+            self._missing_annotations.discard((obj.__of__, obj.__name__))
         if new or obj.__new_marker__:
             self.added[oid] = obj
         elif oid not in self.modified and oid not in self.added:
@@ -276,6 +281,36 @@ class Transaction(object):
     async def _get(self, oid):
         return await self._manager._storage.load(self, oid)
 
+    @profilable
+    async def load_with_ancestors(self, oid):
+        '''
+        Record of an object followed by the records of its parents. Cached
+        records are used until the first miss and the rest are loaded with
+        a single storage call.
+        '''
+        records = []
+        while oid:
+            record = self._manager._hard_cache.get(oid, None)
+            if record is None:
+                record = await self._cache.get(oid=oid)
+                if record is None:
+                    break
+                self._cache._hits += 1
+            records.append(record)
+            oid = record['parent_id']
+        else:
+            return records
+
+        self._cache._misses += 1
+        loaded = await self._manager._storage.load_with_ancestors(self, oid)
+        if len(loaded) == 0 and len(records) == 0:
+            raise KeyError(oid)
+        for record in loaded:
+            if len(record['state'] or b'') < self._cache.max_cache_record_size:
+                await self._cache.set(record, oid=record['zoid'])
+                self._cache._stored += 1
+        return records + list(loaded)
+
     @profilable
     async def get(self, oid, ignore_registered=False):
         """Getting a oid from the db"""
@@ -369,15 +404,43 @@ class Transaction(object):
         if obj._p_jar is None:
             obj._p_jar = self
 
+    @profilable
+    async def _store_objects(self, objects):
+        """Store list of (oid, obj, added) with a batched write"""
+        batch = []
+        for oid, obj, added in objects:
+            if obj._p_jar is not self and obj._p_jar is not None:
+                raise Exception(f'Invalid reference to txn: {obj}')
+            if added:
+                serial = None
+            else:
+                serial = getattr(obj, "_p_serial", 0)
+            batch.append((oid, serial, IWriter(obj), obj))
+
+        await self._manager._storage.store_batch(self, batch)
+        for oid, _, _, obj in batch:
+            obj._p_serial = self._tid
+            obj._p_oid = oid
+            if obj._p_jar is None:
+                obj._p_jar = self
+
     @profilable
     async def tpc_commit(self):
         """Commit changes to an object"""
         await self._strategy.tpc_commit()
-        for oid, obj in self.added.items():
-            await self._store_object(obj, oid, True)
-            obj.__new_marker__ = False
-        for oid, obj in self.modified.items():
-            await self._store_object(obj, oid)
+        threshold = getattr(self._manager._storage, '_store_batch_threshold', None)
+        if threshold is not None and (len(self.added) + len(self.modified)) > threshold:
+            await self._store_objects(
+                [(oid, obj, True) for oid, obj in self.added.items()] +
+                [(oid, obj, False) for oid, obj in self.modified.items()])
+            for obj in self.added.values():
+                obj.__new_marker__ = False
+        else:
+            for oid, obj in self.added.items():
+                await self._store_object(obj, oid, True)
+                obj.__new_marker__ = False
+            for oid, obj in self.modified.items():
+                await self._store_object(obj, oid)
         for oid, obj in self.deleted.items():
             if obj._p_jar is not self and obj._p_jar is not None:
                 raise Exception(f'Invalid reference to txn: {obj}')
@@ -388,7 +451,7 @@ class Transaction(object):
         """Verify that a data manager can commit the transaction."""
         ok = await self._strategy.tpc_vote()
         if ok is False:
-            raise ConflictError(self)
+            raise ConflictError(self, oids=getattr(self._strategy, 'conflicting_oids', None))
 
     @profilable
     async def tpc_finish(self):
@@ -403,6 +466,7 @@ class Transaction(object):
         self.modified = {}
         self.deleted = {}
         self._db_txn = None
+        self._missing_annotations = set()
 
     # Inspection
 
@@ -432,14 +496,57 @@ class Transaction(object):
         obj._p_jar = self
         return obj
 
+    async def _cache_child(self, parent, item):
+        if len(item['state']) < self._cache.max_cache_record_size:
+            await self._cache.set(item, container=parent, id=item['id'])
+            self._cache._stored += 1
+
     async def _get_batch_children(self, parent, keys):
         for litem in await self._manager._storage.get_children(
                 self, parent._p_oid, keys):
-            if len(litem['state']) < self._cache.max_cache_record_size:
-                await self._cache.set(litem, container=parent, id=litem['id'])
-                self._cache._stored += 1
+            await self._cache_child(parent, litem)
             yield self._fill_object(litem, parent)
 
+    @profilable
+    async def get_children_by_path(self, parent, path):
+        '''
+        Load the objects along `path` below `parent`. Cached objects are used
+        until the first miss and the rest of the path is loaded with a
+        single storage call. Stops at the first id that does not exist.
+        '''
+        children = []
+        for key in path:
+            item = await self._cache.get(container=parent, id=key)
+            if item is None:
+                break
+            self._cache._hits += 1
+            parent = self._fill_object(item, parent)
+            children.append(parent)
+        else:
+            return children
+
+        self._cache._misses += 1
+        for item in await self._manager._storage.get_children_by_path(
+                self, parent._p_oid, path[len(children):]):
+            await self._cache_child(parent, item)
+            parent = self._fill_object(item, parent)
+            children.append(parent)
+        return children
+
+    @profilable
+    async def get_page_of_children(self, parent, page=1, page_size=1000, after=None):
+        '''
+        Load a page of children, ordered by oid, with a single query.
+        With `after`, the page starts after that child oid instead of
+        using `page`.
+        '''
+        children = []
+        for item in await self._manager._storage.get_page_of_children(
+                self, parent._p_oid, page=page, page_size=page_size, after=after):
+            await self._cache_child(parent, item)
+            children.append(self._fill_object(item, parent))
+        return children
+
     async def get_children(self, parent, keys):
         '''
         More performant way to get groups of items.
@@ -483,6 +590,28 @@ class Transaction(object):
     async def len(self, oid):
         return await self._manager._storage.len(self, oid)
 
+    @profilable
+    async def estimate_len(self, oid):
+        return await self._manager._storage.estimate_len(self, oid)
+
+    @profilable
+    async def count_subtree(self, oid):
+        return await self._manager._storage.count_subtree(self, oid)
+
+    async def iter_subtree(self, parent):
+        '''
+        Load all the objects below `parent`, parents before their children.
+        Objects are not cached and only the parents of the current one are
+        kept around so large subtrees can be walked.
+        '''
+        parents = [parent]
+        async for record in self._manager._storage.iter_subtree(self, parent._p_oid):
+            while parents[-1]._p_oid != record['parent_id']:
+                parents.pop()
+            ob = self._fill_object(record, parents[-1])
+            parents.append(ob)
+            yield ob
+
     @profilable
     async def items(self, container):
         # XXX not using cursor because we can't cache with cursor results...
@@ -500,14 +629,67 @@ class Transaction(object):
 
     @profilable
     async def get_annotation(self, base_obj, id):
+        if (base_obj._p_oid, id) in self._missing_annotations:
+            raise KeyError(id)
         result = await self._get_annotation(base_obj, id)
         if result == _EMPTY:
             raise KeyError(id)
-        obj = reader(result)
+        return self._fill_annotation(result, base_obj)
+
+    def _fill_annotation(self, item, base_obj):
+        obj = reader(item)
         obj.__of__ = base_obj._p_oid
         obj._p_jar = self
         return obj
 
+    @profilable
+    async def get_annotations(self, base_objs, ids):
+        '''
+        Load the annotations `ids` of all `base_objs`. Cached annotations
+        are used and the rest are loaded with a single storage call.
+        Returns a dict of (oid, id) -> annotation for the ones found, the
+        ones not found will not be looked up again by `get_annotation`.
+        '''
+        found = {}
+        lookup = []  # (base_obj, id) to get from storage
+        for base_obj in base_objs:
+            for id in ids:
+                key = (base_obj._p_oid, id)
+                if key in self._missing_annotations:
+                    continue
+                item = await self._cache.get(container=base_obj, id=id, variant='annotation')
+                if item is None:
+                    self._cache._misses += 1
+                    lookup.append((base_obj, id))
+                    continue
+                self._cache._hits += 1
+                if item == _EMPTY:
+                    self._missing_annotations.add(key)
+                else:
+                    found[key] = self._fill_annotation(item, base_obj)
+
+        if len(lookup) == 0:
+            return found
+
+        records = {}
+        for item in await self._manager._storage.get_annotations(
+                self, list({ob._p_oid for ob, _ in lookup}),
+                list({id for _, id in lookup})):
+            records[(item['of'], item['id'])] = item
+        for base_obj, id in lookup:
+            key = (base_obj._p_oid, id)
+            item = records.get(key)
+            if item is None:
+                self._missing_annotations.add(key)
+                await self._cache.set(_EMPTY, container=base_obj, id=id, variant='annotation')
+            else:
+                found[key] = self._fill_annotation(item, base_obj)
+                if len(item['state']) >= self._cache.max_cache_record_size:
+                    continue
+                await self._cache.set(item, container=base_obj, id=id, variant='annotation')
+            self._cache._stored += 1
+        return found
+
     @profilable
     @cache(lambda oid: {'oid': oid, 'variant': 'annotation-keys'})
     async def get_annotation_keys(self, oid):
@@ -526,6 +708,10 @@ class Transaction(object):
     async def read_blob_chunks(self, bid):
         return await self._manager._storage.read_blob_chunks(self, bid)
 
+    def iter_blob_chunks(self, bid, start_index, end_index, prefetch=1):
+        return self._manager._storage.iter_blob_chunks(
+            self, bid, start_index, end_index, prefetch)
+
     async def get_total_number_of_objects(self):
         return await self._manager._storage.get_total_number_of_objects(self)
 
@@ -537,28 +723,31 @@ class Transaction(object):
             self, type_)
 
     async def _get_resources_of_type(self, type_, page_size=1000):
-        page = 1
         keys = await self._manager._storage._get_page_resources_of_type(
-            self, type_, page=page, page_size=page_size)
+            self, type_, page=1, page_size=page_size, after='')
         while len(keys) > 0:
             for key in keys:
                 yield key
-            page += 1
             keys = await self._manager._storage._get_page_resources_of_type(
-                self, type_, page=page, page_size=page_size)
+                self, type_, page=1, page_size=page_size, after=keys[-1]['zoid'])
 
     async def get_page_of_keys(self, parent_oid, page=1, page_size=1000):
         return await self._manager._storage.get_page_of_keys(
             self, parent_oid, page=page, page_size=page_size)
 
+    async def get_keys_after(self, parent_oid, after=None, page_size=1000):
+        """
+        Page of (zoid, id) records of children ordered by zoid with zoid
+        greater than `after`
+        """
+        return await self._manager._storage.get_keys_after(
+            self, parent_oid, after=after, page_size=page_size)
+
     @profilable
     async def iterate_keys(self, oid, page_size=1000):
-        page = 1
-        keys = await self._manager._storage.get_page_of_keys(
-            self, oid, page=page, page_size=page_size)
-        while len(keys) > 0:
-            for key in keys:
-                yield key
-            page += 1
-            keys = await self._manager._storage.get_page_of_keys(
-                self, oid, page=page, page_size=page_size)
+        records = await self.get_keys_after(oid, page_size=page_size)
+        while len(records) > 0:
+            for record in records:
+                yield record['id']
+            records = await self.get_keys_after(
+                oid, after=records[-1]['zoid'], page_size=page_size)
@@ -24,3 +24,4 @@ ALREADY_INSTALLED = ErrorReason('alreadyInstalled', 'Addon already installed')
 NOT_INSTALLED = ErrorReason('notInstalled', 'Addon not installed')
 UNRETRYALBE_REQUEST = ErrorReason(
     'unretriableRequest', 'Request retry attempted but not allowed due to error type')
+INVALID_QUERY = ErrorReason('invalidQuery', 'Could not parse search query')
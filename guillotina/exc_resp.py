@@ -5,6 +5,7 @@ from guillotina.exceptions import DeserializationError
 from guillotina.exceptions import InvalidContentType
 from guillotina.exceptions import NotAllowedContentType
 from guillotina.exceptions import PreconditionFailed
+from guillotina.exceptions import QueryParsingError
 from guillotina.exceptions import Unauthorized
 from guillotina.exceptions import UnRetryableRequestError
 from guillotina.interfaces import IErrorResponseException
@@ -76,6 +77,11 @@ register_handler_factory(
     exception_handler_factory(error_reasons.DESERIALIZATION_FAILED,
                               'DeserializationError',
                               serialize_exc=True))
+register_handler_factory(
+    QueryParsingError,
+    exception_handler_factory(error_reasons.INVALID_QUERY,
+                              'QueryParsingError',
+                              serialize_exc=True))
 register_handler_factory(
     UnRetryableRequestError,
     exception_handler_factory(error_reasons.UNRETRYALBE_REQUEST,
@@ -89,8 +89,10 @@ class NoInteraction(Exception):
 
 class ConflictError(Exception):
 
-    def __init__(self, msg='', oid=None, txn=None, old_serial=None, writer=None):
+    def __init__(self, msg='', oid=None, txn=None, old_serial=None, writer=None, oids=None):
         super().__init__()
+        # oids of the objects that conflicted when known
+        self.oids = oids or ([oid] if oid is not None else [])
         if oid is not None:
             conflict_summary = self.get_conflict_summary(oid, txn, old_serial, writer)
             msg = f'{msg}.\n{conflict_summary}'
@@ -221,3 +223,9 @@ class ServerClosingException(Exception):
     '''
     Server closing, can not perform action
     '''
+
+
+class JobPoolFullException(Exception):
+    '''
+    The job pool has `max_pending` jobs waiting to run
+    '''
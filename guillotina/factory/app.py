@@ -10,6 +10,7 @@ from guillotina import configure
 from guillotina import glogging
 from guillotina._settings import app_settings
 from guillotina._settings import default_settings
+from guillotina.auth.cache import principal_cache
 from guillotina.behaviors import apply_concrete_behaviors
 from guillotina.component import get_utility
 from guillotina.component import provide_utility
@@ -18,6 +19,7 @@ from guillotina.content import JavaScriptApplication
 from guillotina.content import StaticDirectory
 from guillotina.content import StaticFile
 from guillotina.content import load_cached_schema
+from guillotina.db.conflicts import conflict_tracker
 from guillotina.event import notify
 from guillotina.events import ApplicationCleanupEvent
 from guillotina.events import ApplicationConfiguredEvent
@@ -90,9 +92,16 @@ def configure_application(module_name, config, root, settings, configured):
 class GuillotinaAIOHTTPApplication(web.Application):
     async def _handle(self, request, retries=0):
         aiotask_context.set('request', request)
+        locked = []
+        if retries == 0 and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            # wait for the retries of requests conflicting on the hot spots
+            # this path last conflicted on
+            locked = await conflict_tracker.acquire(
+                conflict_tracker.get_hot_oids(request.path), request)
         try:
             return await super()._handle(request)
         except (ConflictError, TIDConflictError) as e:
+            conflict_tracker.record_conflict(e.oids, request.path)
             if app_settings.get('conflict_retry_attempts', 3) > retries:
                 label = 'DB Conflict detected'
                 if isinstance(e, TIDConflictError):
@@ -103,12 +112,25 @@ class GuillotinaAIOHTTPApplication(web.Application):
                     exc_info=True)
                 request._retry_attempt = retries + 1
                 request.clear_futures()
-                return await self._handle(request, retries + 1)
+                conflict_tracker.record_retry(request.path)
+                await asyncio.sleep(conflict_tracker.get_retry_delay(retries + 1))
+                locked = await conflict_tracker.acquire(e.oids, request)
+                try:
+                    return await self._handle(request, retries + 1)
+                finally:
+                    conflict_tracker.release(locked, request)
+            conflict_tracker.record_exhausted(request.path)
             logger.error(
                 'Exhausted retry attempts for conflict error on tid: {}'.format(
                     getattr(getattr(request, '_txn', None), '_tid', 'not issued')
                 ))
             return HTTPConflict()
+        finally:
+            if locked:
+                conflict_tracker.release(locked, request)
+            if retries == 0 and getattr(request, '_cache_data', None) is not None:
+                # remove temporary file of uploaded data kept for retries
+                request._cache_data.close()
 
     def _make_request(self, message, payload, protocol, writer, task,
                       _cls=Request):
@@ -260,6 +282,8 @@ async def make_app(config_file=None, settings=None, loop=None, server_app=None):
         root[key] = JavaScriptApplication(path)
 
     root.set_root_user(app_settings['root_user'])
+    # principals of another application are not valid anymore
+    principal_cache.clear()
 
     if RSA is not None and not app_settings.get('rsa'):
         key = RSA.generate(2048)
@@ -4,6 +4,7 @@ from .const import MAX_REQUEST_CACHE_SIZE  # noqa
 from .const import MAX_RETRIES  # noqa
 from .field import BaseCloudFile  # noqa
 from .manager import FileManager  # noqa
+from .utils import RequestDataBuffer  # noqa
 from .utils import convert_base64_to_binary  # noqa
 from .utils import get_contenttype  # noqa
 from .utils import read_request_data  # noqa
@@ -181,8 +181,33 @@ class DBFileStorageManagerAdapter:
         file = self.field.get(self.field.context or self.context)
         blob = file._blob
         bfile = blob.open()
-        async for chunk in bfile.iter_async_read():
-            yield chunk
+        chunks = bfile.iter_async_read()
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    def supports_range(self, file):
+        '''
+        Blobs written before the size of their chunks was tracked are sent
+        whole: their chunks are not of a uniform size, every request body of a
+        resumable upload is a chunk, so the chunk of a byte is not known
+        without reading all the chunks before it
+        '''
+        blob = getattr(file, '_blob', None)
+        return blob is not None and blob.chunk_sizes is not None
+
+    async def iter_data_range(self, start, end):
+        file = self.field.get(self.field.context or self.context)
+        blob = file._blob
+        bfile = blob.open()
+        chunks = bfile.iter_async_read_range(start, end)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
 
     async def append(self, dm, iterable, offset) -> int:
         blob = dm.get('_blob')
@@ -203,6 +228,10 @@ class DBFileStorageManagerAdapter:
         # too much storage manager logic here? only way to give file manager
         # more control for plugins
         await to_storage_manager.start(dm)
-        await to_storage_manager.append(dm, to_storage_manager.iter_data(), 0)
+        chunks = to_storage_manager.iter_data()
+        try:
+            await to_storage_manager.append(dm, chunks, 0)
+        finally:
+            await chunks.aclose()
         await to_storage_manager.finish(dm)
         await dm.finish()
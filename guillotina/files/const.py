@@ -1,3 +1,5 @@
 MAX_REQUEST_CACHE_SIZE = 6 * 1024 * 1024
 CHUNK_SIZE = 1024 * 1024 * 5
 MAX_RETRIES = 5
+# ignore Range headers asking for more ranges
+MAX_RANGES = 20
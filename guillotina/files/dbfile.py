@@ -18,6 +18,12 @@ class DBFile(BaseCloudFile):
             return self._blob.size
         return 0
 
+    @property
+    def etag(self):
+        # every upload writes a new blob
+        if self._blob is not None:
+            return '"{}"'.format(self._blob.bid)
+
     @property
     def size(self):
         if self._blob is not None:
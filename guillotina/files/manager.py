@@ -4,6 +4,7 @@ from guillotina import configure
 from guillotina._settings import app_settings
 from guillotina.component import get_adapter
 from guillotina.component import get_multi_adapter
+from guillotina.files.utils import parse_range_header
 from guillotina.files.utils import read_request_data
 from guillotina.interfaces import IAbsoluteURL
 from guillotina.interfaces import ICloudFileField
@@ -15,6 +16,7 @@ from guillotina.interfaces import IUploadDataManager
 from guillotina.response import HTTPConflict
 from guillotina.response import HTTPNotFound
 from guillotina.response import HTTPPreconditionFailed
+from guillotina.response import HTTPRequestRangeNotSatisfiable
 from guillotina.response import Response
 from guillotina.utils import import_class
 from zope.interface import alsoProvides
@@ -62,17 +64,100 @@ class FileManager(object):
             'Content-Disposition': '{}; filename="{}"'.format(
                 disposition, filename or file.filename)
         })
+        content_type = content_type or file.guess_content_type()
+
+        ranges = None
+        if file is not None and size is None and file.size and self._supports_range(file):
+            headers['Accept-Ranges'] = 'bytes'
+            etag = getattr(file, 'etag', None)
+            if etag is not None:
+                headers['ETag'] = etag
+            ranges = self._get_ranges(file.size, etag)
+
+        if ranges is not None:
+            return await self._download_ranges(file, ranges, headers, content_type)
 
         download_resp = StreamResponse(headers=headers)
-        download_resp.content_type = content_type or file.guess_content_type()
+        download_resp.content_type = content_type
         if size or file.size:
             download_resp.content_length = size or file.size
 
         await download_resp.prepare(self.request)
 
-        async for chunk in self.file_storage_manager.iter_data(**kwargs):
-            await download_resp.write(chunk)
-            await download_resp.drain()
+        chunks = self.file_storage_manager.iter_data(**kwargs)
+        try:
+            async for chunk in chunks:
+                await download_resp.write(chunk)
+                await download_resp.drain()
+        finally:
+            await chunks.aclose()
+        await download_resp.write_eof()
+        return download_resp
+
+    def _supports_range(self, file):
+        if not hasattr(self.file_storage_manager, 'iter_data_range'):
+            return False
+        supports_range = getattr(self.file_storage_manager, 'supports_range', None)
+        return supports_range is None or supports_range(file)
+
+    def _get_ranges(self, size, etag):
+        if 'Range' not in self.request.headers:
+            return None
+        if_range = self.request.headers.get('If-Range')
+        if if_range is not None and (etag is None or if_range != etag):
+            # file changed, send all of it
+            return None
+        return parse_range_header(self.request.headers['Range'], size)
+
+    async def _download_ranges(self, file, ranges, headers, content_type):
+        size = file.size
+        if len(ranges) == 0:
+            raise HTTPRequestRangeNotSatisfiable(headers={
+                'Content-Range': f'bytes */{size}'
+            })
+
+        download_resp = StreamResponse(headers=headers, status=206)
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            download_resp.content_type = content_type
+            download_resp.headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+            download_resp.content_length = end - start
+            await download_resp.prepare(self.request)
+            chunks = self.file_storage_manager.iter_data_range(start, end)
+            try:
+                async for chunk in chunks:
+                    await download_resp.write(chunk)
+                    await download_resp.drain()
+            finally:
+                await chunks.aclose()
+            await download_resp.write_eof()
+            return download_resp
+
+        boundary = uuid.uuid4().hex
+        parts = []
+        for start, end in ranges:
+            parts.append((start, end, (
+                f'--{boundary}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n'
+            ).encode('utf-8')))
+        closing = f'--{boundary}--\r\n'.encode('utf-8')
+        download_resp.headers['Content-Type'] = f'multipart/byteranges; boundary={boundary}'
+        download_resp.content_length = sum(
+            len(part_headers) + end - start + 2
+            for start, end, part_headers in parts) + len(closing)
+        await download_resp.prepare(self.request)
+        for start, end, part_headers in parts:
+            await download_resp.write(part_headers)
+            chunks = self.file_storage_manager.iter_data_range(start, end)
+            try:
+                async for chunk in chunks:
+                    await download_resp.write(chunk)
+                    await download_resp.drain()
+            finally:
+                await chunks.aclose()
+            await download_resp.write(b'\r\n')
+        await download_resp.write(closing)
         await download_resp.write_eof()
         return download_resp
 
@@ -267,8 +352,12 @@ class FileManager(object):
         await self.dm.finish()
 
     async def iter_data(self, *args, **kwargs):
-        async for chunk in self.file_storage_manager.iter_data():
-            yield chunk
+        chunks = self.file_storage_manager.iter_data()
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
 
     async def save_file(self, generator, content_type=None, filename=None,
                         extension=None, size=None):
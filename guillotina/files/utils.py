@@ -1,15 +1,92 @@
+from .const import MAX_RANGES
 from .const import MAX_REQUEST_CACHE_SIZE
 from guillotina.exceptions import UnRetryableRequestError
 from guillotina.utils import get_content_path
+from guillotina.utils import run_async
 from guillotina.utils import to_str
+from typing import List
 
 import asyncio
 import base64
+import bisect
 import mimetypes
 import os
+import tempfile
 import uuid
 
 
+class RequestDataBuffer:
+    '''
+    Keep the data read from a request so it can be read again when the
+    request is retried after a conflict error.
+
+    Chunks are kept as they are read, without copying them, until there is more
+    than `max_memory_size` bytes. Then they are written to a temporary file
+    which is also used for the rest of the data.
+    '''
+
+    def __init__(self, max_memory_size: int=MAX_REQUEST_CACHE_SIZE) -> None:
+        self.max_memory_size = max_memory_size
+        self.size = 0
+        self._chunks: List[bytes] = []
+        self._offsets: List[int] = []
+        self._file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    async def append(self, data: bytes):
+        if not data:
+            return
+        if self._file is None and self.size + len(data) > self.max_memory_size:
+            self._file = await run_async(tempfile.TemporaryFile, buffering=0)
+            chunks = self._chunks
+            self._chunks = []
+            self._offsets = []
+            await run_async(self._write, chunks)
+        if self._file is not None:
+            await run_async(self._write, [data])
+        else:
+            self._offsets.append(self.size)
+            self._chunks.append(data)
+        self.size += len(data)
+
+    def _write(self, chunks: List[bytes]):
+        for chunk in chunks:
+            view = memoryview(chunk)
+            while len(view) > 0:
+                view = view[self._file.write(view):]
+
+    async def read(self, start: int, size: int) -> bytes:
+        if start >= self.size or size <= 0:
+            return b''
+        if self._file is not None:
+            return await run_async(os.pread, self._file.fileno(), size, start)
+        idx = bisect.bisect_right(self._offsets, start) - 1
+        chunk = self._chunks[idx]
+        offset = start - self._offsets[idx]
+        if offset == 0 and len(chunk) <= size and (
+                len(chunk) == size or idx == len(self._chunks) - 1):
+            # same chunks are read on retries, no need to copy them
+            return chunk
+        result = []
+        while size > 0 and idx < len(self._chunks):
+            data = self._chunks[idx][offset:offset + size]
+            result.append(data)
+            size -= len(data)
+            offset = 0
+            idx += 1
+        return b''.join(result)
+
+    def close(self):
+        self._chunks = []
+        self._offsets = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 async def read_request_data(request, chunk_size):
     '''
     cachable request data reader to help with conflict error requests
@@ -18,34 +95,26 @@ async def read_request_data(request, chunk_size):
         # we are on a retry request, see if we have read cached data yet...
         if request._retry_attempt > getattr(request, '_last_cache_data_retry_count', 0):
             if getattr(request, '_cache_data', None) is None:
-                # request payload was too large to fit into request cache.
+                # request payload was not read before the request was retried
                 # so retrying this request is not supported and we need to throw
                 # another error
                 raise UnRetryableRequestError()
-            start = request._last_read_pos
-            end = request._last_read_pos + chunk_size
-            data = request._cache_data[start:end]
+            data = await request._cache_data.read(request._last_read_pos, chunk_size)
             request._last_read_pos += len(data)
-            if request._last_read_pos >= len(request._cache_data):
+            if request._last_read_pos >= request._cache_data.size:
                 # done reading cache data
                 request._last_cache_data_retry_count = request._retry_attempt
             return data
 
-    if not hasattr(request, '_cache_data'):
-        request._cache_data = b''
+    if getattr(request, '_cache_data', None) is None:
+        request._cache_data = RequestDataBuffer()
 
     try:
         data = await request.content.readexactly(chunk_size)
     except asyncio.IncompleteReadError as e:
         data = e.partial
 
-    if request._cache_data is not None:
-        if len(request._cache_data) + len(data) > MAX_REQUEST_CACHE_SIZE:
-            # we only allow caching up to chunk size, otherwise, no cache data..
-            request._cache_data = None
-        else:
-            request._cache_data += data
-
+    await request._cache_data.append(data)
     request._last_read_pos += len(data)
     return data
 
@@ -91,6 +160,49 @@ def guess_content_type(content_type, filename):
     return ct
 
 
+def parse_range_header(value, size):
+    '''
+    Parse a `bytes` Range header value into a list of (start, end) byte
+    positions, end excluded.
+
+    Returns None when the header is not valid and should be ignored and an
+    empty list when none of the ranges can be satisfied.
+    '''
+    unit, _, specs = value.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs.strip():
+        return None
+    specs = specs.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for spec in specs:
+        first, sep, last = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if first == '':
+                # suffix range, last bytes of the file
+                length = int(last)
+                start = max(size - length, 0)
+                end = size if length > 0 else 0
+            else:
+                start = int(first)
+                end = size
+                if last != '':
+                    if int(last) < start:
+                        return None
+                    end = min(int(last) + 1, size)
+        except ValueError:
+            return None
+        if start < 0:
+            return None
+        if start >= end:
+            # not satisfiable
+            continue
+        ranges.append((start, end))
+    return ranges
+
+
 def generate_key(request, context):
     return '{}{}/{}::{}'.format(
         request._container_id,
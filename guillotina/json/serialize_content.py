@@ -6,8 +6,9 @@ from guillotina import configure
 from guillotina.component import ComponentLookupError
 from guillotina.component import get_multi_adapter
 from guillotina.component import query_utility
-from guillotina.content import get_all_behaviors
+from guillotina.content import get_all_behavior_interfaces
 from guillotina.content import get_cached_factory
+from guillotina.content import prefetch_behavior_annotations
 from guillotina.directives import merged_tagged_value_dict
 from guillotina.directives import read_permission
 from guillotina.interfaces import IAbsoluteURL
@@ -20,6 +21,7 @@ from guillotina.interfaces import IResourceSerializeToJson
 from guillotina.interfaces import IResourceSerializeToJsonSummary
 from guillotina.json.serialize_value import json_compatible
 from guillotina.profile import profilable
+from guillotina.schema import Field
 from guillotina.schema import get_fields
 from guillotina.utils import apply_coroutine
 from zope.interface import Interface
@@ -29,6 +31,13 @@ logger = logging.getLogger('guillotina')
 
 
 MAX_ALLOWED = 20
+# number of serialization plans kept before they are computed again
+MAX_PLANS = 2000
+
+_behavior_plans: dict = {}
+_schema_plans: dict = {}
+_field_get = Field.get
+_json_types = (str, bool, int, float, list, dict, type(None))
 
 
 @configure.adapter(
@@ -78,6 +87,44 @@ class SerializeToJson(object):
         main_schema = factory.schema
         await self.get_schema(main_schema, self.context, result, False)
 
+        for behavior_schema, behavior in await self.get_behaviors():
+            if IAsyncBehavior.implementedBy(behavior.__class__):
+                # providedBy not working here?
+                await behavior.load(create=False)
+            await self.get_schema(behavior_schema, behavior, result, True)
+
+        return result
+
+    async def get_behaviors(self):
+        '''
+        Behaviors of the context that are serialized with the include and
+        omit values. Annotations of all of them are loaded at once.
+        '''
+        behavior_schemas = tuple(get_all_behavior_interfaces(self.context))
+        key = (behavior_schemas, tuple(self.include), tuple(self.omit))
+        try:
+            schemas = _behavior_plans[key]
+        except KeyError:
+            if len(_behavior_plans) > MAX_PLANS:
+                _behavior_plans.clear()
+            schemas = _behavior_plans[key] = self._get_serialized_behaviors(
+                behavior_schemas)
+
+        behaviors = []
+        missing = []
+        annotations = self.context.__gannotations__
+        for behavior_schema in schemas:
+            behavior = behavior_schema(self.context)
+            behaviors.append((behavior_schema, behavior))
+            if (IAsyncBehavior.implementedBy(behavior.__class__) and
+                    behavior.__annotations_data_key__ not in annotations):
+                missing.append(behavior_schema)
+        if len(missing) > 1:
+            # load the annotations of all the behaviors at once
+            await prefetch_behavior_annotations([self.context], missing)
+        return behaviors
+
+    def _get_serialized_behaviors(self, behavior_schemas):
         # include can be one of:
         # - <field name> on content schema
         # - namespace.IBehavior
@@ -85,7 +132,9 @@ class SerializeToJson(object):
         included_ifaces = [name for name in self.include if '.' in name]
         included_ifaces.extend([name.rsplit('.', 1)[0] for name in self.include
                                 if '.' in name])
-        for behavior_schema, behavior in await get_all_behaviors(self.context, load=False):
+        schemas = []
+        for behavior_schema in behavior_schemas:
+            behavior = behavior_schema(self.context)
             if '*' not in self.include:
                 dotted_name = behavior_schema.__identifier__
                 if (dotted_name in self.omit or
@@ -95,22 +144,23 @@ class SerializeToJson(object):
                 if (not getattr(behavior, 'auto_serialize', True) and
                         dotted_name not in included_ifaces):
                     continue
-            if IAsyncBehavior.implementedBy(behavior.__class__):
-                # providedBy not working here?
-                await behavior.load(create=False)
-            await self.get_schema(behavior_schema, behavior, result, True)
-
-        return result
+            schemas.append(behavior_schema)
+        return tuple(schemas)
+
+    def get_schema_plan(self, schema, behavior):
+        '''
+        (name, field, read permission) of the fields of schema to serialize
+        with the include and omit values
+        '''
+        key = (schema, behavior, tuple(self.include), tuple(self.omit))
+        try:
+            return _schema_plans[key]
+        except KeyError:
+            pass
 
-    @profilable
-    async def get_schema(self, schema, context, result, behavior):
         read_permissions = merged_tagged_value_dict(schema, read_permission.key)
-        schema_serial = {}
+        plan = []
         for name, field in get_fields(schema).items():
-
-            if not self.check_permission(read_permissions.get(name)):
-                continue
-
             if behavior:
                 # omit/include for behaviors need full name
                 dotted_name = schema.__identifier__ + '.' + name
@@ -123,6 +173,19 @@ class SerializeToJson(object):
                         schema.__identifier__ not in self.include)))):
                 # make sure the fields aren't filtered
                 continue
+            plan.append((name, field, read_permissions.get(name)))
+
+        if len(_schema_plans) > MAX_PLANS:
+            _schema_plans.clear()
+        plan = _schema_plans[key] = tuple(plan)
+        return plan
+
+    @profilable
+    async def get_schema(self, schema, context, result, behavior):
+        schema_serial = {}
+        for name, field, permission_name in self.get_schema_plan(schema, behavior):
+            if permission_name is not None and not self.check_permission(permission_name):
+                continue
 
             value = await self.serialize_field(context, field)
             if not behavior:
@@ -136,13 +199,16 @@ class SerializeToJson(object):
     @profilable
     async def serialize_field(self, context, field, default=None):
         try:
-            value = await apply_coroutine(field.get, context)
+            if type(field).get is _field_get:
+                value = getattr(context, field.__name__)
+            else:
+                value = await apply_coroutine(field.get, context)
         except Exception:
             logger.warning(f'Could not find value for schema field'
-                           f'({self.field.__name__}), falling back to getattr')
+                           f'({field.__name__}), falling back to getattr')
             value = getattr(context, field.__name__, default)
         result = json_compatible(value)
-        if asyncio.iscoroutine(result):
+        if type(result) not in _json_types and asyncio.iscoroutine(result):
             result = await result
         return result
 
@@ -171,25 +237,41 @@ class SerializeFolderToJson(SerializeToJson):
     async def __call__(self, include=[], omit=[]):
         result = await super(SerializeFolderToJson, self).__call__(include=include, omit=omit)
 
-        security = IInteraction(self.request)
         length = await self.context.async_len()
 
-        if length > MAX_ALLOWED or length == 0:
-            result['items'] = []
-        else:
-            result['items'] = []
-            async for ident, member in self.context.async_items(suppress_events=True):
-                if not ident.startswith('_') and bool(
-                        security.check_permission(
-                        'guillotina.AccessContent', member)):
-                    result['items'].append(
-                        await get_multi_adapter(
-                            (member, self.request),
-                            IResourceSerializeToJsonSummary)())
+        result['items'] = []
+        if 0 < length <= MAX_ALLOWED:
+            async for summary in self.iter_items():
+                result['items'].append(summary)
         result['length'] = length
 
         return result
 
+    async def iter_items(self):
+        '''
+        Summaries of the children the user can access, serialized as they are loaded
+        '''
+        security = IInteraction(self.request)
+        async for ident, member in self.context.async_items(suppress_events=True):
+            if not ident.startswith('_') and bool(
+                    security.check_permission(
+                    'guillotina.AccessContent', member)):
+                yield await get_multi_adapter(
+                    (member, self.request),
+                    IResourceSerializeToJsonSummary)()
+
+    async def stream(self, stream, include=[], omit=[]):
+        '''
+        Write the folder to a `JSONStream` with all its items, without the
+        `MAX_ALLOWED` limit
+        '''
+        result = await super(SerializeFolderToJson, self).__call__(include=include, omit=omit)
+        result['length'] = await self.context.async_len()
+        await stream.start(result)
+        async for summary in self.iter_items():
+            await stream.write(summary)
+        return await stream.finish()
+
 
 @configure.adapter(
     for_=(IResource, Interface),
@@ -5,14 +5,37 @@ from datetime import time
 from datetime import timedelta
 from decimal import Decimal
 from guillotina import configure
+from guillotina.component import get_global_components
 from guillotina.component import query_adapter
 from guillotina.i18n import Message
 from guillotina.interfaces import IValueToJson
 from guillotina.profile import profilable
 from guillotina.schema.vocabulary import SimpleVocabulary
+from zope.interface import implementedBy
 
 
 _MISSING = object()
+# converters by type of value, for the registry generation they were found with
+_converters: dict = {}
+_converters_generation = None
+
+
+def get_converter(type_):
+    '''
+    Converter registered for values of a type that do not provide
+    interfaces directly or None
+    '''
+    global _converters_generation
+    registry = get_global_components().adapters
+    if registry._generation != _converters_generation:
+        _converters.clear()
+        _converters_generation = registry._generation
+    try:
+        return _converters[type_]
+    except KeyError:
+        converter = _converters[type_] = registry.lookup(
+            (implementedBy(type_),), IValueToJson)
+        return converter
 
 
 @profilable
@@ -24,6 +47,11 @@ def json_compatible(value):
     if type_ in (str, bool, int, float):
         return value
 
+    if getattr(value, '__provides__', None) is None:
+        converter = get_converter(type_)
+        if converter is not None:
+            return converter(value)
+
     result_value = query_adapter(value, IValueToJson, default=_MISSING)
     if result_value is _MISSING:
         raise TypeError(
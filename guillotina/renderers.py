@@ -1,10 +1,13 @@
 from aiohttp.web import Response as aioResponse
+from aiohttp.web import StreamResponse
 from datetime import datetime
 from guillotina import configure
+from guillotina._settings import app_settings
 from guillotina.interfaces import IResponse
 from guillotina.interfaces.security import PermissionSetting
 from guillotina.profile import profilable
 from typing import Dict
+from typing import List
 from typing import Optional
 from zope.interface.interface import InterfaceClass
 
@@ -12,29 +15,167 @@ import json
 import ujson
 
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(obj):
+    '''
+    Convert values json backends can not serialize natively
+    '''
+    if isinstance(obj, complex):
+        return [obj.real, obj.imag]
+    elif isinstance(obj, datetime):
+        return obj.isoformat()
+    elif isinstance(obj, type):
+        return obj.__module__ + '.' + obj.__name__
+    elif isinstance(obj, InterfaceClass):
+        return [x.__module__ + '.' + x.__name__ for x in obj.__iro__]  # noqa
+    try:
+        iterable = iter(obj)
+    except TypeError:
+        pass
+    else:
+        return list(iterable)
+
+    if isinstance(obj, PermissionSetting):
+        return obj.get_name()
+    if callable(obj):
+        return obj.__module__ + '.' + obj.__name__
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
 class GuillotinaJSONEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, complex):
-            return [obj.real, obj.imag]
-        elif isinstance(obj, datetime):
-            return obj.isoformat()
-        elif isinstance(obj, type):
-            return obj.__module__ + '.' + obj.__name__
-        elif isinstance(obj, InterfaceClass):
-            return [x.__module__ + '.' + x.__name__ for x in obj.__iro__]  # noqa
         try:
-            iterable = iter(obj)
+            return json_default(obj)
         except TypeError:
-            pass
-        else:
-            return list(iterable)
+            # Let the base class default method raise the TypeError
+            return json.JSONEncoder.default(self, obj)
+
+
+def _json_dumps(value) -> bytes:
+    return json.dumps(value, cls=GuillotinaJSONEncoder).encode('utf-8')
+
+
+def _ujson_dumps(value) -> bytes:
+    try:
+        # escaped like json does, bytes are encoded by json_default
+        return ujson.dumps(
+            value, default=json_default, ensure_ascii=True,
+            escape_forward_slashes=False, reject_bytes=True).encode('utf-8')
+    except (TypeError, OverflowError):
+        # bytes, integers too big, ...
+        return _json_dumps(value)
+
+
+def _orjson_dumps(value) -> bytes:
+    try:
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # big integers, ...
+        return _json_dumps(value)
+
+
+json_backends = {
+    'json': _json_dumps,
+    'ujson': _ujson_dumps
+}
+try:
+    ujson.dumps(None, default=json_default, reject_bytes=True)
+except TypeError:
+    # old ujson versions do not support default and have their own datetime format
+    json_backends['ujson'] = _json_dumps
+if orjson is not None:
+    json_backends['orjson'] = _orjson_dumps
+
+
+def json_dumps(value) -> bytes:
+    '''
+    Encode value with the backend configured with the `json_backend` setting
+    '''
+    return json_backends.get(app_settings.get('json_backend'), _json_dumps)(value)
 
-        if isinstance(obj, PermissionSetting):
-            return obj.get_name()
-        if callable(obj):
-            return obj.__module__ + '.' + obj.__name__
-        # Let the base class default method raise the TypeError
-        return json.JSONEncoder.default(self, obj)
+
+# bytes of serialized values buffered before writing a chunk of a stream
+STREAM_CHUNK_SIZE = 64 * 1024
+
+STREAM_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+class JSONStream:
+    '''
+    Write a list of values to a chunked response as they are produced instead
+    of rendering the whole body at once.
+
+    With the `json` format, the values are the items of a json object and with
+    the `ndjson` format, every value is written on its own line.
+    Writing waits for the client to read when too much data is buffered.
+    '''
+
+    def __init__(self, request, format: str='json', key: str='items') -> None:
+        assert format in STREAM_CONTENT_TYPES
+        self.request = request
+        self.format = format
+        self.key = key
+        self.response: Optional[StreamResponse] = None
+        self.count = 0
+        self._buffer: List[bytes] = []
+        self._buffer_size = 0
+
+    async def start(self, data: dict=None) -> StreamResponse:
+        '''
+        Send headers. With the `json` format, `data` is written before the items
+        '''
+        cors_renderer = app_settings['cors_renderer'](self.request)
+        headers = await cors_renderer.get_headers()
+        self.response = StreamResponse(headers=headers)
+        self.response.content_type = STREAM_CONTENT_TYPES[self.format]
+        await self.response.prepare(self.request)
+        if self.format == 'json':
+            body = json_dumps(dict(data or {}, **{self.key: []}))
+            # leave the list open so items can be added to it
+            await self.response.write(body[:-2])
+        return self.response
+
+    async def write(self, value):
+        data = json_dumps(value)
+        if self.format == 'ndjson':
+            data += b'\n'
+        elif self.count > 0:
+            data = b',' + data
+        self.count += 1
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+        if self._buffer_size >= STREAM_CHUNK_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        if self._buffer_size > 0:
+            data = b''.join(self._buffer)
+            self._buffer = []
+            self._buffer_size = 0
+            await self.response.write(data)
+
+    async def finish(self, data: dict=None) -> StreamResponse:
+        '''
+        Close the stream. With the `json` format, `data` is written after the items
+        '''
+        await self.flush()
+        if self.format == 'json':
+            body = b']'
+            if data:
+                body += b',' + json_dumps(data)[1:]
+            else:
+                body += b'}'
+            await self.response.write(body)
+        await self.response.write_eof()
+        return self.response
 
 
 class Renderer:
@@ -75,9 +216,11 @@ class RendererJson(Renderer):
     content_type = 'application/json'
 
     def get_body(self, value) -> Optional[bytes]:
+        if isinstance(value, bytes):
+            # already encoded by the view
+            return value
         if value is not None:
-            value = json.dumps(value, cls=GuillotinaJSONEncoder)
-            return value.encode('utf-8')
+            return json_dumps(value)
         return None
 
 
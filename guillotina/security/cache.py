@@ -1,3 +1,6 @@
+from collections import OrderedDict
+from guillotina._settings import app_settings
+from guillotina.db.orm.base import BaseObject
 
 
 class SecurityMapCacheManager:
@@ -20,3 +23,61 @@ class SecurityMapCacheManager:
             'byrow': security_map._byrow,
             'bycol': security_map._bycol
         }
+
+
+class ACLCache:
+    '''
+    Process wide store of the compiled security settings of objects.
+
+    Entries are keyed by the (oid, tid) of an object and of all its parents
+    so committing a change to any of them uses a new entry. The least
+    recently used entries are dropped once there are more than the
+    `acl_cache.max_size` setting.
+    '''
+
+    def __init__(self):
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_entry(self, key):
+        try:
+            entry = self._data[key]
+        except KeyError:
+            entry = self._data[key] = {}
+            max_size = app_settings.get('acl_cache', {}).get('max_size', 10000)
+            while len(self._data) > max_size:
+                self._data.popitem(last=False)
+        else:
+            self._data.move_to_end(key)
+        return entry
+
+    def invalidate(self, oid):
+        for key in [key for key in self._data if any(oid == k[0] for k in key)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+
+def get_acl_cache_key(ob):
+    '''
+    (oid, tid) of the object and its parents or None when any of them
+    has changes not committed yet.
+    '''
+    key = []
+    while ob is not None:
+        if not isinstance(ob, BaseObject):
+            return None
+        jar = ob._p_jar
+        oid = ob._p_oid
+        if (jar is None or oid is None or ob._p_serial is None or ob.__new_marker__ or
+                oid in jar.modified or oid in jar.added):
+            return None
+        key.append((oid, ob._p_serial))
+        ob = ob.__parent__
+    return tuple(key)
+
+
+acl_cache = ACLCache()
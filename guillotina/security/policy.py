@@ -21,16 +21,20 @@ from guillotina.interfaces import AllowSingle
 from guillotina.interfaces import Deny
 from guillotina.interfaces import IGroups
 from guillotina.interfaces import IInteraction
+from guillotina.interfaces import IObjectPermissionsModifiedEvent
 from guillotina.interfaces import IPrincipalPermissionMap
 from guillotina.interfaces import IInheritPermissionMap
 from guillotina.interfaces import IPrincipalRoleMap
 from guillotina.interfaces import IRequest
+from guillotina.interfaces import IResource
 from guillotina.interfaces import IRolePermissionMap
 from guillotina.interfaces import ISecurityPolicy
 from guillotina.interfaces import IView
 from guillotina.interfaces import Public
 from guillotina.interfaces import Unset
 from guillotina.profile import profilable
+from guillotina.security.cache import acl_cache
+from guillotina.security.cache import get_acl_cache_key
 from guillotina.security.security_code import principal_permission_manager
 from guillotina.security.security_code import principal_role_manager
 from guillotina.security.security_code import role_permission_manager
@@ -81,6 +85,11 @@ def get_current_interaction(request):
     return interaction
 
 
+@configure.subscriber(for_=(IResource, IObjectPermissionsModifiedEvent))
+def invalidate_acl_cache(obj, event):
+    acl_cache.invalidate(obj._p_oid)
+
+
 @implementer(IInteraction)
 @provider(ISecurityPolicy)
 class Interaction(object):
@@ -163,6 +172,23 @@ class Interaction(object):
             self._cache[id(parent)] = cache, parent
         return cache
 
+    def compiled(self, parent):
+        """Security settings computed for parent that do not depend on
+        the global settings of the principal.
+
+        Shared between requests while parent and its parents are not changed.
+        """
+        cache = self.cache(parent)
+        try:
+            return cache.compiled
+        except AttributeError:
+            key = get_acl_cache_key(parent)
+            if key is None:
+                cache.compiled = {}
+            else:
+                cache.compiled = acl_cache.get_entry(key)
+        return cache.compiled
+
     @profilable
     def cached_decision(self, parent, principal, groups, permission):
         # Return the decision for a principal and permission
@@ -257,8 +283,31 @@ class Interaction(object):
             cache_prin_per[permission] = prinper
             return prinper
 
+        prinper = self.cached_local_principal_permission(
+            parent, principal, groups, permission, level)
+        if prinper is None:
+            # Not set on the objects, look at the global ones
+            prinper = self.cached_principal_permission(
+                None, principal, groups, permission, 'p')
+        cache_prin_per[permission] = prinper
+        return prinper
+
+    def cached_local_principal_permission(
+            self, parent, principal, groups, permission, level):
+        # Compute the permission set on parent and its parents, if any
+        if parent is None:
+            return None
+
+        compiled = self.compiled(parent)
+        key = ('principal_permission', principal, tuple(groups), permission, level)
+        try:
+            return compiled[key]
+        except KeyError:
+            pass
+
         # Get the local map of the permissions
         # As we want to quit as soon as possible we check first locally
+        prinper = None
         prinper_map = IPrincipalPermissionMap(parent, None)
         if prinper_map is not None:
             prinper = level_setting_as_boolean(
@@ -273,14 +322,12 @@ class Interaction(object):
                         # May happen that first group Deny and second
                         # allows which will result on Deny for the first
                         break
-            if prinper is not None:
-                return prinper
 
-        # Find the permission recursivelly set to a user
-        parent = getattr(parent, '__parent__', None)
-        prinper = self.cached_principal_permission(
-            parent, principal, groups, permission, 'p')
-        cache_prin_per[permission] = prinper
+        if prinper is None:
+            # Find the permission recursivelly set to a user
+            prinper = self.cached_local_principal_permission(
+                getattr(parent, '__parent__', None), principal, groups, permission, 'p')
+        compiled[key] = prinper
         return prinper
 
     def global_principal_roles(self, principal, groups):
@@ -317,7 +364,28 @@ class Interaction(object):
             cache_principal_roles[principal] = roles
             return roles
 
-        roles = self.cached_principal_roles(
+        roles = self.cached_principal_roles(None, principal, groups, 'p')
+        local_roles = self.cached_local_principal_roles(parent, principal, groups, level)
+        if local_roles:
+            roles = roles.copy()
+            roles.update(local_roles)
+
+        cache_principal_roles[principal] = roles
+        return roles
+
+    def cached_local_principal_roles(self, parent, principal, groups, level):
+        # Roles set on parent and its parents
+        if parent is None:
+            return {}
+
+        compiled = self.compiled(parent)
+        key = ('principal_roles', principal, tuple(groups), level)
+        try:
+            return compiled[key]
+        except KeyError:
+            pass
+
+        roles = self.cached_local_principal_roles(
             getattr(parent, '__parent__', None),
             principal,
             groups,
@@ -336,7 +404,7 @@ class Interaction(object):
                         group):
                     roles[role] = level_setting_as_boolean(level, setting)
 
-        cache_principal_roles[principal] = roles
+        compiled[key] = roles
         return roles
 
     def _groups_for(self, principal):
@@ -348,17 +416,16 @@ class Interaction(object):
 
         Global + Local + Code
         """
-        cache = self.cache(parent)
-        try:
-            cache_roles = cache.roles
-        except AttributeError:
-            cache_roles = cache.roles = {}
-        try:
-            return cache_roles[permission]
-        except KeyError:
-            pass
-
         if parent is None:
+            cache = self.cache(parent)
+            try:
+                cache_roles = cache.roles
+            except AttributeError:
+                cache_roles = cache.roles = {}
+            try:
+                return cache_roles[permission]
+            except KeyError:
+                pass
             roles = dict(
                 [(role, 1)
                  for (role, setting) in code_roles_for_permission(permission)
@@ -366,6 +433,13 @@ class Interaction(object):
             cache_roles[permission] = roles
             return roles
 
+        compiled = self.compiled(parent)
+        key = ('roles', permission, level)
+        try:
+            return compiled[key]
+        except KeyError:
+            pass
+
         perminhe = IInheritPermissionMap(parent, None)
 
         if perminhe is None or perminhe.get_inheritance(permission) is Allow:
@@ -388,9 +462,7 @@ class Interaction(object):
                 elif setting is Deny and role in roles:
                     del roles[role]
 
-        if level != 'o':
-            # Only cache on non 1rst level queries needs new way
-            cache_roles[permission] = roles
+        compiled[key] = roles
         return roles
 
     def cached_principals(self, parent, roles, permission, level):
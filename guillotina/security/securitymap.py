@@ -1,5 +1,6 @@
 from guillotina.exceptions import RequestNotFound
 from guillotina.interfaces import IInteraction
+from guillotina.security.cache import acl_cache
 from guillotina.utils import get_current_request
 
 
@@ -33,6 +34,7 @@ class SecurityMap(object):
         col[rowentry] = value
 
         self._invalidated_interaction_cache()
+        self._invalidated_acl_cache()
 
         return True
 
@@ -51,6 +53,10 @@ class SecurityMap(object):
             else:
                 invalidate_cache()
 
+    def _invalidated_acl_cache(self):
+        # global settings are used by all the objects
+        acl_cache.clear()
+
     def del_cell(self, rowentry, colentry):
         row = self._byrow.get(rowentry)
         if row and (colentry in row):
@@ -63,6 +69,7 @@ class SecurityMap(object):
                 del self._bycol[colentry]
 
             self._invalidated_interaction_cache()
+            self._invalidated_acl_cache()
 
             return True
 
@@ -128,6 +135,10 @@ class GuillotinaSecurityMap(SecurityMap):
             self.context.__acl__[self.key] = map
         self.context._p_register()
 
+    def _invalidated_acl_cache(self):
+        # the tid of the context changes when the settings are committed
+        pass
+
     def add_cell(self, rowentry, colentry, value):
         if super().add_cell(rowentry, colentry, value):
             self._changed()
@@ -28,6 +28,7 @@ class MockTransaction:
         self._manager = self.manager = manager
         self._tid = 1
         self.modified = {}
+        self.added = {}
         self.request = None
         self._strategy = get_adapter(
             self, ITransactionStrategy,
@@ -58,6 +59,9 @@ class MockTransaction:
     async def get_annotation(self, ob, key):
         pass
 
+    async def get_annotations(self, obs, keys):
+        return {}
+
 
 @implementer(IStorage)
 class MockStorage:
@@ -82,6 +86,9 @@ class MockStorage:
     async def get_annotation(self, trns, oid, id):
         return None
 
+    async def get_annotations(self, trns, oids, ids):
+        return []
+
     async def start_transaction(self, trns):
         self._transaction = MockDBTransaction(self, trns)
         return self._transaction
@@ -1,11 +1,15 @@
 from guillotina.annotations import AnnotationData
+from guillotina.behaviors.dublincore import IDublinCore
 from guillotina.component import get_utility
 from guillotina.content import create_content_in_container
+from guillotina.content import prefetch_behavior_annotations
 from guillotina.interfaces import IAnnotations
 from guillotina.interfaces import IApplication
 from guillotina.tests.utils import get_mocked_request
 from guillotina.tests.utils import login
+from guillotina.transactions import get_transaction
 from guillotina.transactions import managed_transaction
+from unittest import mock
 
 
 async def test_create_annotation(db, guillotina_main):
@@ -39,3 +43,44 @@ async def test_create_annotation(db, guillotina_main):
         annotations = IAnnotations(ob)
         assert 'foobar' not in (await annotations.async_keys())
         await db.async_del('container')
+
+
+async def test_prefetch_behavior_annotations(db, guillotina_main):
+    root = get_utility(IApplication, name='root')
+    db = root['db']
+    request = get_mocked_request(db)
+    login(request)
+
+    async with managed_transaction(request=request):
+        container = await create_content_in_container(
+            db, 'Container', 'container', request=request,
+            title='Container')
+        ob = await create_content_in_container(
+            container, 'Item', 'foo', request=request)
+        await create_content_in_container(
+            container, 'Item', 'bar', request=request)
+        behavior = IDublinCore(ob)
+        await behavior.load(create=True)
+        behavior.tags = ['foo']
+        behavior._p_register()
+
+    async with managed_transaction(request=request):
+        container = await db.async_get('container')
+        foo = await container.async_get('foo')
+        bar = await container.async_get('bar')
+        await prefetch_behavior_annotations([foo, bar])
+        assert 'default' in foo.__gannotations__
+        assert 'default' not in bar.__gannotations__
+        txn = get_transaction(request)
+        assert (bar._p_oid, 'default') in txn._missing_annotations
+
+        # loading the behaviors does not query the storage anymore
+        with mock.patch.object(txn._manager._storage, 'get_annotation',
+                               side_effect=AssertionError):
+            behavior = IDublinCore(foo)
+            await behavior.load(create=False)
+            assert behavior.tags == ['foo']
+            behavior = IDublinCore(bar)
+            await behavior.load(create=False)
+            assert behavior.tags is None
+        await db.async_del('container')
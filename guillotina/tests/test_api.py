@@ -1,5 +1,7 @@
 import json
+from collections import OrderedDict
 from datetime import datetime
+from unittest import mock
 
 import pytest
 from zope.interface import Interface
@@ -7,8 +9,13 @@ from zope.interface import Interface
 from guillotina import configure
 from guillotina import schema
 from guillotina.addons import Addon
+from guillotina.api.content import BatchPOST
 from guillotina.behaviors.dublincore import IDublinCore
 from guillotina.behaviors.attachment import IAttachment
+from guillotina.db.transaction_manager import TransactionManager
+from guillotina.event import notify as original_notify
+from guillotina.events import ObjectLoadedEvent
+from guillotina.exceptions import ConflictError
 from guillotina.tests import utils
 from guillotina.transactions import managed_transaction
 
@@ -519,7 +526,8 @@ async def test_get_subscribers(container_requester):
         response, status = await requester('GET', '/@component-subscribers')
         resource = response['guillotina.interfaces.content.IResource']
         modified = resource['guillotina.interfaces.events.IObjectPermissionsModifiedEvent']
-        assert modified == ['guillotina.catalog.index.security_changed']
+        assert modified == ['guillotina.security.policy.invalidate_acl_cache',
+                            'guillotina.catalog.index.security_changed']
         assert status == 200
 
 
@@ -840,3 +848,251 @@ async def test_do_not_error_with_invalid_payload(container_requester):
             })
         )
         assert status == 204
+
+
+async def test_batch_create(container_requester):
+    async with container_requester as requester:
+        lines = [json.dumps({
+            '@type': 'Item',
+            'id': f'item{idx}',
+            'title': f'Item {idx}'
+        }) for idx in range(5)]
+        # invalid items are reported and skipped
+        lines.insert(2, json.dumps({'id': 'foobar'}))
+        lines.insert(4, '{"foobar": "}')
+        lines.append('')
+        response, status = await requester(
+            'POST', '/db/guillotina/@batch-create?chunk_size=2',
+            data='\n'.join(lines))
+        assert status == 200
+        results = sorted([json.loads(line) for line in response.decode('utf-8').splitlines()],
+                         key=lambda r: r['line'])
+        assert [r['status'] for r in results] == [201, 201, 412, 201, 412, 201, 201]
+        assert results[0]['id'] == 'item0'
+        assert results[0]['@id'].endswith('/db/guillotina/item0')
+
+        response, _ = await requester('GET', '/db/guillotina/@ids')
+        assert sorted(response) == [f'item{idx}' for idx in range(5)]
+        response, _ = await requester('GET', '/db/guillotina/item3')
+        assert response['title'] == 'Item 3'
+
+
+async def test_batch_create_duplicate_id(container_requester):
+    async with container_requester as requester:
+        lines = [json.dumps({
+            '@type': 'Item',
+            'id': 'item'
+        }) for _ in range(2)]
+        response, status = await requester(
+            'POST', '/db/guillotina/@batch-create', data='\n'.join(lines))
+        results = [json.loads(line) for line in response.decode('utf-8').splitlines()]
+        assert len(results) == 2
+        assert set(r['status'] for r in results) == {201, 409}
+
+        response, _ = await requester('GET', '/db/guillotina/@ids')
+        assert response == ['item']
+
+
+async def test_batch_create_failed_line_restores_transaction():
+    view = BatchPOST(None, utils.get_mocked_request())
+    txn = mock.MagicMock()
+    txn.added = OrderedDict([('a', 'a')])
+    txn.modified = {'b': 'b'}
+    txn.deleted = {'c': 'c'}
+
+    async def add_content(payload):
+        txn.added['d'] = 'd'
+        txn.modified['e'] = 'e'
+        txn.deleted['f'] = 'f'
+        del txn.modified['b']
+        raise ValueError('foobar')
+
+    with mock.patch.object(view, 'add_content', add_content):
+        result = await view.create(txn, 1, b'{}', set())
+    assert result['status'] == 500
+    assert txn.added == OrderedDict([('a', 'a')])
+    assert txn.modified == {'b': 'b'}
+    assert txn.deleted == {'c': 'c'}
+
+
+async def test_batch_create_retries_conflicts(container_requester):
+    async with container_requester as requester:
+        conflicts = []
+        original_commit = TransactionManager.commit
+
+        async def commit(self, request=None, txn=None):
+            if len(conflicts) == 0 and len(txn.added) > 0:
+                conflicts.append(txn)
+                await original_commit(self, request=request, txn=txn)
+                # the content was created by a concurrent request
+                raise ConflictError('conflict', oids=['foobar'])
+            return await original_commit(self, request=request, txn=txn)
+
+        lines = [json.dumps({
+            '@type': 'Item',
+            'id': f'item{idx}'
+        }) for idx in range(2)]
+        with mock.patch.object(TransactionManager, 'commit', commit):
+            response, status = await requester(
+                'POST', '/db/guillotina/@batch-create', data='\n'.join(lines))
+        assert status == 200
+        assert len(conflicts) == 1
+        results = [json.loads(line) for line in response.decode('utf-8').splitlines()]
+        # created again, they exist now
+        assert [r['status'] for r in results] == [409, 409]
+
+        lines = [json.dumps({
+            '@type': 'Item',
+            'id': f'item{idx}'
+        }) for idx in range(2, 4)]
+        conflicts.clear()
+
+        async def commit_once(self, request=None, txn=None):
+            if len(conflicts) == 0 and len(txn.added) > 0:
+                conflicts.append(txn)
+                await txn.abort()
+                raise ConflictError('conflict', oids=['foobar'])
+            return await original_commit(self, request=request, txn=txn)
+
+        with mock.patch.object(TransactionManager, 'commit', commit_once):
+            response, status = await requester(
+                'POST', '/db/guillotina/@batch-create', data='\n'.join(lines))
+        results = [json.loads(line) for line in response.decode('utf-8').splitlines()]
+        assert [r['status'] for r in results] == [201, 201]
+        response, _ = await requester('GET', '/db/guillotina/@ids')
+        assert sorted(response) == ['item0', 'item1', 'item2', 'item3']
+
+
+async def test_items_cursor(container_requester):
+    async with container_requester as requester:
+        for _ in range(22):
+            await requester(
+                'POST', '/db/guillotina/',
+                data=json.dumps({
+                    '@type': 'Item'
+                }))
+        response, _ = await requester('GET', '/db/guillotina/@items?page_size=10')
+        assert response['page'] == 1
+        items = [i['UID'] for i in response['items']]
+        cursor = response['cursor']
+        while cursor is not None:
+            response, _ = await requester(
+                'GET', f'/db/guillotina/@items?page_size=10&cursor={cursor}')
+            assert 'page' not in response
+            assert response['total'] == 22
+            items.extend([i['UID'] for i in response['items']])
+            cursor = response['cursor']
+
+        assert len(items) == 22
+        assert len(set(items)) == 22
+
+        response, _ = await requester('GET', '/db/guillotina/@items?page_size=10&cursor=')
+        assert [i['UID'] for i in response['items']] == items[:10]
+
+        _, status = await requester('GET', '/db/guillotina/@items?cursor=@@@')
+        assert status == 412
+
+
+async def test_items_total(container_requester):
+    async with container_requester as requester:
+        for _ in range(3):
+            await requester(
+                'POST', '/db/guillotina/',
+                data=json.dumps({
+                    '@type': 'Item'
+                }))
+        response, _ = await requester('GET', '/db/guillotina/@items?page_size=2')
+        assert len(response['items']) == 2
+        assert response['total'] == 3
+        response, _ = await requester('GET', '/db/guillotina/@items?page_size=2&page=2')
+        assert len(response['items']) == 1
+        assert response['cursor'] is None
+
+        response, _ = await requester('GET', '/db/guillotina/@items?total=none')
+        assert len(response['items']) == 3
+        assert response['total'] is None
+
+        response, _ = await requester('GET', '/db/guillotina/@items?total=estimate')
+        assert len(response['items']) == 3
+        assert isinstance(response['total'], int)
+
+        _, status = await requester('GET', '/db/guillotina/@items?total=foobar')
+        assert status == 412
+
+
+async def test_items_stream(container_requester):
+    async with container_requester as requester:
+        for idx in range(5):
+            await requester(
+                'POST', '/db/guillotina/',
+                data=json.dumps({
+                    '@type': 'Item',
+                    'id': f'item{idx}'
+                }))
+        response, status = await requester(
+            'GET', '/db/guillotina/@items?stream=json&page_size=2&include=title')
+        assert status == 200
+        assert response['total'] == 5
+        assert sorted(i['@name'] for i in response['items']) == [
+            f'item{idx}' for idx in range(5)]
+
+        response, status = await requester(
+            'GET', '/db/guillotina/@items?stream=ndjson&page_size=2')
+        results = [json.loads(line) for line in response.decode('utf-8').splitlines()]
+        assert sorted(i['@name'] for i in results) == [f'item{idx}' for idx in range(5)]
+
+        _, status = await requester('GET', '/db/guillotina/@items?stream=foobar')
+        assert status == 412
+
+
+async def test_items_notify_loaded_events(container_requester):
+    async with container_requester as requester:
+        for idx in range(3):
+            await requester(
+                'POST', '/db/guillotina/',
+                data=json.dumps({
+                    '@type': 'Item',
+                    'id': f'item{idx}'
+                }))
+
+        loaded = []
+
+        async def notify(event, *args, **kwargs):
+            if isinstance(event, ObjectLoadedEvent):
+                loaded.append(event.object.__name__)
+            return await original_notify(event, *args, **kwargs)
+
+        with mock.patch('guillotina.api.content.notify', notify):
+            _, status = await requester('GET', '/db/guillotina/@items')
+            assert status == 200
+            assert sorted(loaded) == ['item0', 'item1', 'item2']
+
+            loaded.clear()
+            _, status = await requester('GET', '/db/guillotina/@items?stream=ndjson')
+            assert status == 200
+            assert sorted(loaded) == ['item0', 'item1', 'item2']
+
+
+async def test_folder_stream(container_requester):
+    async with container_requester as requester:
+        # more items than the folder serializer returns without streaming
+        for idx in range(25):
+            await requester(
+                'POST', '/db/guillotina/',
+                data=json.dumps({
+                    '@type': 'Item',
+                    'id': f'item{idx}'
+                }))
+        response, _ = await requester('GET', '/db/guillotina')
+        assert response['length'] == 25
+        assert response['items'] == []
+
+        response, status = await requester('GET', '/db/guillotina?stream=json')
+        assert status == 200
+        assert response['@type'] == 'Container'
+        assert response['length'] == 25
+        assert len(response['items']) == 25
+
+        response, status = await requester('GET', '/db/guillotina?stream=ndjson')
+        results = [json.loads(line) for line in response.decode('utf-8').splitlines()]
+        assert sorted(i['@name'] for i in results) == sorted(f'item{idx}' for idx in range(25))
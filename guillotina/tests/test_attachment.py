@@ -1,8 +1,12 @@
 from guillotina.behaviors.attachment import IAttachment
 from guillotina.component import get_multi_adapter
+from guillotina.exceptions import ConflictError
 from guillotina.interfaces import IFileManager
 from guillotina.tests import utils
+from guillotina.transactions import abort
+from guillotina.transactions import commit as original_commit
 from guillotina.transactions import managed_transaction
+from unittest import mock
 
 import json
 import random
@@ -79,6 +83,172 @@ async def test_large_upload_chunks(container_requester):
             assert behavior.file._blob.chunks == 2
 
 
+async def test_large_upload_retried_on_conflict(container_requester):
+    async with container_requester as requester:
+        response, status = await requester(
+            'POST',
+            '/db/guillotina/',
+            data=json.dumps({
+                '@type': 'Item',
+                '@behaviors': [IAttachment.__identifier__],
+                'id': 'foobar'
+            })
+        )
+        assert status == 201
+
+        conflicts = []
+
+        async def commit(request, **kwargs):
+            if len(conflicts) == 0:
+                conflicts.append(request)
+                await abort(request)
+                raise ConflictError('conflict')
+            await original_commit(request, **kwargs)
+
+        # larger than the request data kept in memory
+        data = b'X' * 1024 * 1024 * 7 + b'Y' * 1024 * 1024 * 3
+        with mock.patch('guillotina.traversal.commit', commit):
+            response, status = await requester(
+                'PATCH',
+                '/db/guillotina/foobar/@upload/file',
+                data=data,
+                headers={
+                    'x-upload-size': str(len(data))
+                }
+            )
+        assert status == 200
+        assert len(conflicts) == 1
+        assert conflicts[0]._retry_attempt == 1
+
+        response, status = await requester(
+            'GET',
+            '/db/guillotina/foobar/@download/file'
+        )
+        assert status == 200
+        assert response == data
+
+
+async def test_download_range(container_requester):
+    async with container_requester as requester:
+        response, status = await requester(
+            'POST',
+            '/db/guillotina/',
+            data=json.dumps({
+                '@type': 'Item',
+                '@behaviors': [IAttachment.__identifier__],
+                'id': 'foobar'
+            })
+        )
+        assert status == 201
+
+        chunk_size = 1024 * 1024 * 5
+        data = b'A' * chunk_size + b'B' * chunk_size + b'C' * 10
+        response, status = await requester(
+            'PATCH',
+            '/db/guillotina/foobar/@upload/file',
+            data=data,
+            headers={
+                'x-upload-size': str(len(data))
+            }
+        )
+        assert status == 200
+
+        response, status, headers = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file')
+        assert status == 200
+        assert headers['Accept-Ranges'] == 'bytes'
+        etag = headers['ETag']
+
+        # crossing chunk boundary
+        response, status, headers = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file',
+            headers={'Range': f'bytes={chunk_size - 2}-{chunk_size + 1}'})
+        assert status == 206
+        assert response == b'AABB'
+        assert headers['Content-Range'] == f'bytes {chunk_size - 2}-{chunk_size + 1}/{len(data)}'
+
+        response, status, headers = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file',
+            headers={'Range': 'bytes=-12'})
+        assert status == 206
+        assert response == b'BB' + b'C' * 10
+
+        response, status, headers = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file',
+            headers={'Range': 'bytes=0-1,-3'})
+        assert status == 206
+        assert headers['Content-Type'].startswith('multipart/byteranges; boundary=')
+        boundary = headers['Content-Type'].split('boundary=')[1].encode('utf-8')
+        assert int(headers['Content-Length']) == len(response)
+        parts = response.split(b'--' + boundary)
+        assert parts[1].endswith(b'\r\n\r\nAA\r\n')
+        assert f'bytes 0-1/{len(data)}'.encode('utf-8') in parts[1]
+        assert parts[2].endswith(b'\r\n\r\nCCC\r\n')
+        assert parts[3] == b'--\r\n'
+
+        response, status, headers = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file',
+            headers={'Range': f'bytes={len(data)}-'})
+        assert status == 416
+        assert headers['Content-Range'] == f'bytes */{len(data)}'
+
+        # If-Range not matching sends the whole file
+        response, status, _ = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file',
+            headers={'Range': 'bytes=0-1', 'If-Range': '"foobar"'})
+        assert status == 200
+        assert len(response) == len(data)
+
+        response, status, _ = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file',
+            headers={'Range': 'bytes=0-1', 'If-Range': etag})
+        assert status == 206
+        assert response == b'AA'
+
+
+async def test_download_range_of_blob_without_chunk_sizes(container_requester):
+    async with container_requester as requester:
+        response, status = await requester(
+            'POST',
+            '/db/guillotina/',
+            data=json.dumps({
+                '@type': 'Item',
+                '@behaviors': [IAttachment.__identifier__],
+                'id': 'foobar'
+            })
+        )
+        assert status == 201
+
+        data = b'0123456789'
+        response, status = await requester(
+            'PATCH',
+            '/db/guillotina/foobar/@upload/file',
+            data=data,
+            headers={
+                'x-upload-size': str(len(data))
+            }
+        )
+        assert status == 200
+
+        # stored before chunk sizes were tracked
+        request = utils.get_mocked_request(requester.db)
+        root = await utils.get_root(request)
+        async with managed_transaction(request=request):
+            container = await root.async_get('guillotina')
+            obj = await container.async_get('foobar')
+            behavior = IAttachment(obj)
+            await behavior.load()
+            behavior.file._blob.chunk_sizes = None
+            behavior._p_register()
+
+        response, status, headers = await requester.make_request(
+            'GET', '/db/guillotina/foobar/@download/file',
+            headers={'Range': 'bytes=2-4'})
+        assert status == 200
+        assert 'Accept-Ranges' not in headers
+        assert response == data
+
+
 async def test_tus(container_requester):
     async with container_requester as requester:
         response, status = await requester(
@@ -1,8 +1,19 @@
 from datetime import datetime
 from datetime import timedelta
 from guillotina._settings import app_settings
+from guillotina.auth.cache import PrincipalCache
+from guillotina.auth.cache import principal_cache
+from guillotina.auth.groups import GroupsUtility
+from guillotina.auth.users import GuillotinaUser
+from guillotina.auth.validators import check_password
+from guillotina.event import notify
+from guillotina.events import ObjectModifiedEvent
+from unittest import mock
 
+import base64
+import json
 import jwt
+import time
 
 
 async def test_jwt_auth(container_requester):
@@ -19,3 +30,117 @@ async def test_jwt_auth(container_requester):
             auth_type='Bearer'
         )
         assert status == 200
+
+
+async def test_authenticated_principals_are_cached(container_requester):
+    async with container_requester as requester:
+        principal_cache.clear()
+        with mock.patch('guillotina.auth.validators.check_password',
+                        side_effect=check_password) as checker:
+            for _ in range(2):
+                response, status = await requester('GET', '/db/guillotina/@addons')
+                assert status == 200
+            assert checker.call_count == 1
+
+            # not authenticated with another password
+            response, status = await requester(
+                'GET', '/db/guillotina/@addons',
+                token=base64.b64encode(b'root:foobar').decode('utf-8'))
+            assert status == 401
+            assert checker.call_count == 2
+
+
+async def test_principal_cache_entries_expire():
+    cache = PrincipalCache()
+    key = cache.get_key('bearer', {'type': 'bearer', 'token': 'foobar'})
+    assert key != cache.get_key('bearer', {'type': 'bearer', 'token': 'foobar2'})
+    user = GuillotinaUser('foobar', groups=['Managers'])
+    cache.put(key, user)
+    assert cache.get(key).id == 'foobar'
+
+    # token expired
+    cache.put(key, user, time.time() - 1)
+    assert cache.get(key) is None
+
+    cache.put(key, user)
+    with mock.patch('guillotina.auth.cache.time.time', return_value=time.time() + 61):
+        assert cache.get(key) is None
+
+    cache.put(key, user)
+    cache.invalidate('Managers')
+    assert len(cache) == 0
+
+
+class StoredUser(GuillotinaUser):
+    '''
+    Principal bound to the transaction it was loaded with
+    '''
+
+    _p_jar = mock.MagicMock()
+
+
+async def test_principal_cache_keeps_plain_data(container_requester):
+    async with container_requester:
+        principal_cache.clear()
+        key = principal_cache.get_key('bearer', {'type': 'bearer', 'token': 'foobar'})
+        user = StoredUser('foobar', groups=['Managers'], roles={'guillotina.Owner': 1},
+                          properties={'email': 'foo@bar.com'})
+        principal_cache.put(key, user)
+        user.roles['guillotina.Reader'] = 1
+
+        cached = principal_cache.get(key)
+        assert cached is not user
+        assert not hasattr(cached, '_p_jar')
+        assert cached.id == 'foobar'
+        assert cached.groups == ['Managers']
+        assert cached.roles == {'guillotina.Owner': 1}
+        assert cached.properties == {'email': 'foo@bar.com'}
+
+        await notify(ObjectModifiedEvent(user))
+        assert principal_cache.get(key) is None
+
+
+class ContainerUserIdentifier:
+    '''
+    Finds users only in the guillotina container
+    '''
+
+    def __init__(self, request):
+        self.request = request
+
+    async def get_user(self, token):
+        if self.request._container_id == 'guillotina':
+            return GuillotinaUser(token['id'], groups=['Managers'])
+
+
+async def test_cached_principals_are_scoped_to_container(container_requester):
+    async with container_requester as requester:
+        response, status = await requester('POST', '/db', data=json.dumps({
+            '@type': 'Container',
+            'id': 'other'
+        }))
+        assert status == 200
+        principal_cache.clear()
+        jwt_token = jwt.encode({
+            'exp': datetime.utcnow() + timedelta(seconds=60),
+            'id': 'foobar'
+        }, app_settings['jwt']['secret']).decode('utf-8')
+        with mock.patch.dict(app_settings, {
+                'auth_user_identifiers': [ContainerUserIdentifier]}):
+            response, status = await requester(
+                'GET', '/db/guillotina/@addons', token=jwt_token, auth_type='Bearer')
+            assert status == 200
+            response, status = await requester(
+                'GET', '/db/other/@addons', token=jwt_token, auth_type='Bearer')
+            assert status == 401
+
+
+def test_groups_are_bounded():
+    utility = GroupsUtility()
+    with mock.patch.dict(app_settings, {'principal_cache': {'max_size': 2}}), \
+            mock.patch('guillotina.auth.groups.get_current_request'):
+        group = utility.get_principal('foo')
+        utility.get_principal('bar')
+        assert utility.get_principal('foo') is group
+        utility.get_principal('baz')
+    assert list(utility._groups.keys()) == ['foo', 'baz']
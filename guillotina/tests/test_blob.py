@@ -1,10 +1,14 @@
 from guillotina.blob import Blob
 from guillotina.component import get_utility
 from guillotina.content import create_content_in_container
+from guillotina.exceptions import BlobChunkNotFound
 from guillotina.interfaces import IApplication
 from guillotina.tests.utils import get_mocked_request
 from guillotina.tests.utils import login
 from guillotina.transactions import managed_transaction
+from unittest import mock
+
+import pytest
 
 
 async def test_create_blob(db, guillotina_main):
@@ -80,3 +84,110 @@ async def test_write_large_blob_data(db, guillotina_main):
         assert container.blob.chunks == 6
 
         await db.async_del('container')
+
+
+async def test_read_blob_data_with_prefetch(db, guillotina_main):
+    root = get_utility(IApplication, name='root')
+    db = root['db']
+    request = get_mocked_request(db)
+    login(request)
+
+    async with managed_transaction(request=request):
+        container = await create_content_in_container(
+            db, 'Container', 'container', request=request,
+            title='Container')
+
+        blob = Blob(container)
+        container.blob = blob
+
+        blobfi = blob.open('w')
+        await blobfi.async_write(b'0123456789', chunk_size=3)
+
+    async with managed_transaction(request=request):
+        container = await db.async_get('container')
+        assert container.blob.chunks == 4
+        for prefetch in (0, 1, 2, 10):
+            chunks = []
+            async for chunk in container.blob.open().iter_async_read(prefetch=prefetch):
+                chunks.append(chunk)
+            assert chunks == [b'012', b'345', b'678', b'9']
+
+        # stop consuming before the end
+        async for chunk in container.blob.open().iter_async_read(prefetch=2):
+            break
+        assert chunk == b'012'
+        assert await container.blob.open().async_read() == b'0123456789'
+
+        await db.async_del('container')
+
+
+async def test_read_committed_blob_outside_of_transaction(db, guillotina_main):
+    root = get_utility(IApplication, name='root')
+    db = root['db']
+    request = get_mocked_request(db)
+    login(request)
+
+    async with managed_transaction(request=request):
+        container = await create_content_in_container(
+            db, 'Container', 'container', request=request,
+            title='Container')
+
+        blob = Blob(container)
+        container.blob = blob
+
+        blobfi = blob.open('w')
+        await blobfi.async_write(b'0123456789', chunk_size=3)
+        # uncommitted chunks are read through the transaction
+        assert await blob.open().async_read() == b'0123456789'
+
+    async with managed_transaction(request=request) as txn:
+        container = await db.async_get('container')
+        with mock.patch.object(txn, 'read_blob_chunk', side_effect=Exception('txn read')):
+            assert await container.blob.open().async_read() == b'0123456789'
+
+        # the blob has less chunks than recorded
+        container.blob.chunks = 5
+        container._p_changed = False
+        with pytest.raises(BlobChunkNotFound):
+            await container.blob.open().async_read()
+        container.blob.chunks = 4
+
+        await db.async_del('container')
+
+
+async def test_read_blob_range(db, guillotina_main):
+    root = get_utility(IApplication, name='root')
+    db = root['db']
+    request = get_mocked_request(db)
+    login(request)
+
+    async with managed_transaction(request=request):
+        container = await create_content_in_container(
+            db, 'Container', 'container', request=request,
+            title='Container')
+
+        blob = Blob(container)
+        container.blob = blob
+
+        blobfi = blob.open('w')
+        await blobfi.async_write(b'0123456789', chunk_size=3)
+        assert blob.chunk_sizes == [3, 3, 3, 1]
+
+    async with managed_transaction(request=request):
+        container = await db.async_get('container')
+
+        async def read_range(start, end):
+            data = b''
+            async for chunk in container.blob.open().iter_async_read_range(start, end):
+                data += chunk
+            return data
+
+        for start, end in ((0, 10), (0, 1), (2, 4), (3, 6), (4, 5), (8, 10), (9, 10)):
+            assert await read_range(start, end) == b'0123456789'[start:end]
+            # blobs written before chunk sizes were tracked
+            container.blob.chunk_sizes = None
+            assert await read_range(start, end) == b'0123456789'[start:end]
+            container.blob.chunk_sizes = [3, 3, 3, 1]
+        assert await read_range(10, 12) == b''
+
+        await db.async_del('container')
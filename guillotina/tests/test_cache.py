@@ -1,4 +1,8 @@
 from guillotina.db.cache.base import BaseCache
+from guillotina.db.cache.lru import LRU
+from guillotina.db.cache.memory import MemoryCache as ProcessMemoryCache
+from guillotina.db.cache.memory import get_memory_store
+from guillotina.db.storages.dummy import DummyStorage
 from guillotina.db.transaction import Transaction
 from guillotina.tests import mocks
 from guillotina.tests.utils import create_content
@@ -103,3 +107,108 @@ async def test_do_not_cache_large_object(dummy_guillotina):
     assert id(loaded) != id(ob)
     assert loaded._p_oid == ob._p_oid
     assert len(cache._actions) == 0
+
+
+def test_lru_evicts_by_size():
+    lru = LRU(100)
+    lru.set('foo', 'X' * 40, 40)
+    lru.set('bar', 'X' * 40, 40)
+    assert lru.size == 80
+    lru.get('foo')  # foo is now most recently used
+    lru.set('foobar', 'X' * 40, 40)
+    assert 'bar' not in lru
+    assert 'foo' in lru
+    assert 'foobar' in lru
+    assert lru.size == 80
+    assert lru.evictions == 1
+
+    # values larger than the store are never kept
+    lru.set('large', 'X' * 101, 101)
+    assert 'large' not in lru
+
+
+async def test_memory_cache_shared_between_transactions(dummy_guillotina):
+    tm = mocks.MockTransactionManager(mocks.MockStorage(cache_strategy='memory'))
+    storage = tm._storage
+    ob = create_content()
+    storage.store(ob)
+
+    txn = Transaction(tm)
+    assert isinstance(txn._cache, ProcessMemoryCache)
+    await txn.get(ob._p_oid)
+    assert txn._cache._misses == 1
+
+    txn = Transaction(tm)
+    loaded = await txn.get(ob._p_oid)
+    assert loaded._p_oid == ob._p_oid
+    assert txn._cache._hits == 1
+    assert txn._cache._misses == 0
+
+
+async def test_memory_cache_invalidated_on_commit(dummy_guillotina):
+    tm = mocks.MockTransactionManager(mocks.MockStorage(cache_strategy='memory'))
+    storage = tm._storage
+    parent = create_content()
+    ob = create_content()
+    ob.__parent__ = parent
+    storage.store(parent)
+    storage.store(ob)
+
+    txn = Transaction(tm)
+    await txn.get(ob._p_oid)
+    await txn.get_child(parent, ob.id)
+    store = get_memory_store(storage)
+    assert len(store) == 2
+
+    txn = Transaction(tm)
+    txn.modified[ob._p_oid] = ob
+    await txn._cache.close()
+    assert len(store) == 0
+
+
+async def test_memory_cache_does_not_store_stale_values(dummy_guillotina):
+    tm = mocks.MockTransactionManager(mocks.MockStorage(cache_strategy='memory'))
+    storage = tm._storage
+    ob = create_content()
+    storage.store(ob)
+
+    txn = Transaction(tm)
+    assert await txn._cache.get(oid=ob._p_oid) is None
+
+    # other transaction modifies object before we are done loading it
+    other_txn = Transaction(tm)
+    other_txn.modified[ob._p_oid] = ob
+    await other_txn._cache.close()
+
+    await txn._cache.set(await storage.load(txn, ob._p_oid), oid=ob._p_oid)
+    assert await txn._cache.get(oid=ob._p_oid) is None
+
+
+def test_lru_keeps_newer_values_on_late_invalidations():
+    lru = LRU(1000)
+    lru.set('foo', {'tid': 5, 'state': b'X'}, 10)
+    lru.invalidate(['foo'], 4)
+    assert 'foo' in lru
+    lru.invalidate(['foo'], 5)
+    assert 'foo' not in lru
+
+    # values older than the last invalidation are refused
+    lru.set('foo', {'tid': 4, 'state': b'X'}, 10)
+    assert 'foo' not in lru
+    lru.set('foo', {'tid': 6, 'state': b'X'}, 10)
+    assert 'foo' in lru
+
+
+async def test_memory_cache_invalidated_by_storage(dummy_guillotina):
+    storage = DummyStorage(cache_strategy='memory')
+    tm = mocks.MockTransactionManager(storage)
+    txn = Transaction(tm)
+    await txn._cache.set({'tid': 1, 'state': b'X'}, oid='foobar')
+    assert await txn._cache.get(oid='foobar') is not None
+
+    storage.invalidate_cache([txn._cache.get_key(oid='foobar')], 2)
+    assert await txn._cache.get(oid='foobar') is None
+
+    await txn._cache.set({'tid': 2, 'state': b'X'}, oid='foobar')
+    storage.invalidate_cache(None)
+    assert len(get_memory_store(storage)) == 0
@@ -10,6 +10,18 @@ from guillotina.interfaces import ICatalogDataAdapter
 from guillotina.interfaces import ICatalogUtility
 from guillotina.interfaces import ISecurityInfo
 from guillotina.tests import utils as test_utils
+from guillotina.auth.users import GuillotinaUser
+from guillotina.catalog.pg import PGSearchUtility
+from guillotina.component import provide_utility
+from guillotina.transactions import managed_transaction
+
+import asyncio
+import json
+import os
+import pytest
+
+
+DATABASE = os.environ.get('DATABASE', 'DUMMY')
 
 
 def test_indexed_fields(dummy_guillotina, loop):
@@ -127,3 +139,104 @@ async def test_create_catalog(container_requester):
         assert status == 200
         response, status = await requester('DELETE', '/db/guillotina/@catalog')
         assert status == 200
+
+
+@pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
+async def test_pg_catalog(container_requester):
+    async with container_requester as requester:
+        util = query_utility(ICatalogUtility)
+        provide_utility(PGSearchUtility(), ICatalogUtility)
+        try:
+            response, status = await requester('POST', '/db/guillotina/@catalog', data='{}')
+            assert status == 200
+            await requester('POST', '/db/guillotina', data=json.dumps({
+                '@type': 'Folder',
+                'id': 'folder',
+                'title': 'Folder'
+            }))
+            await requester('POST', '/db/guillotina', data=json.dumps({
+                '@type': 'Item',
+                'id': 'item1',
+                'title': 'Foo bar'
+            }))
+            await requester('POST', '/db/guillotina/folder', data=json.dumps({
+                '@type': 'Item',
+                'id': 'item2',
+                'title': 'Other'
+            }))
+
+            response, status = await requester(
+                'GET', '/db/guillotina/@search?q=type_name%3DItem')
+            assert status == 200
+            assert response['items_count'] == 2
+
+            response, _ = await requester('GET', '/db/guillotina/@search?q=foo')
+            assert response['items_count'] == 1
+            assert response['member'][0]['@name'] == 'item1'
+            assert response['member'][0]['@absolute_url'].endswith('/db/guillotina/item1')
+
+            response, _ = await requester(
+                'POST', '/db/guillotina/@search', data=json.dumps({
+                    '_sort_asc': 'title',
+                    '_metadata': 'title'
+                }))
+            assert response['items_count'] == 3
+            assert [m['title'] for m in response['member']] == ['Folder', 'Foo bar', 'Other']
+            assert 'path' not in response['member'][0]
+
+            response, _ = await requester(
+                'POST', '/db/guillotina/@search', data=json.dumps({
+                    'depth__gt': '2',
+                    '_size': '1'
+                }))
+            assert response['items_count'] == 1
+            assert response['member'][0]['@name'] == 'item2'
+
+            response, _ = await requester(
+                'POST', '/db/guillotina/folder/@search', data='{}')
+            assert response['items_count'] == 1
+            assert response['member'][0]['@name'] == 'item2'
+
+            response, status = await requester(
+                'POST', '/db/guillotina/@search', data=json.dumps({'foobar': 'foo'}))
+            assert status == 412
+
+            # remove data of deleted content
+            await requester('DELETE', '/db/guillotina/folder')
+            for _ in range(20):
+                response, _ = await requester(
+                    'POST', '/db/guillotina/@search', data='{}')
+                if response['items_count'] == 1:
+                    break
+                await asyncio.sleep(0.05)
+            assert response['items_count'] == 1
+        finally:
+            provide_utility(util, ICatalogUtility)
+
+
+@pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
+async def test_pg_catalog_filters_by_access(container_requester):
+    async with container_requester as requester:
+        util = query_utility(ICatalogUtility)
+        provide_utility(PGSearchUtility(), ICatalogUtility)
+        try:
+            await requester('POST', '/db/guillotina/@catalog', data='{}')
+            await requester('POST', '/db/guillotina', data=json.dumps({
+                '@type': 'Item',
+                'id': 'item1'
+            }))
+            pg_util = query_utility(ICatalogUtility)
+            request = test_utils.get_mocked_request(requester.db)
+            test_utils.login(request)
+            container = await test_utils.get_container(requester, request)
+            async with managed_transaction(request=request):
+                response = await pg_util.search(container, {})
+                assert response['items_count'] == 1
+
+                user = GuillotinaUser(request)
+                user.id = 'foobar'
+                test_utils.login(request, user)
+                response = await pg_util.search(container, {})
+                assert response['items_count'] == 0
+        finally:
+            provide_utility(util, ICatalogUtility)
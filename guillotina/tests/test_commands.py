@@ -1,9 +1,12 @@
+import json
 import os
 from tempfile import mkstemp
 
 import pytest
 from guillotina import testing
 from guillotina.commands import get_settings
+from guillotina.commands.bench import BenchCommand
+from guillotina.commands.bench import parse_mix
 from guillotina.commands.run import RunCommand
 
 
@@ -53,3 +56,30 @@ def test_get_settings():
     ])
     assert settings['foobar'] == 'foobar'
     assert settings['foo']['bar'] == 'foobar'
+
+
+def test_bench_command(command_arguments):
+    _, filepath = mkstemp(suffix='.json')
+    command_arguments.db = None
+    command_arguments.container = 'bench'
+    command_arguments.width = 2
+    command_arguments.depth = 2
+    command_arguments.behaviors = []
+    command_arguments.requests = 50
+    command_arguments.concurrency = 4
+    command_arguments.mix = parse_mix('traverse=1,get=1,items=1,patch=1,post=1,upload=1')
+    command_arguments.upload_size = 1024
+    command_arguments.seed = 0
+    command_arguments.output = filepath
+    command = BenchCommand(command_arguments)
+    command.run_command(settings=testing.get_settings())
+    with open(filepath) as fi:
+        results = json.loads(fi.read())
+    assert results['generate']['objects'] == 6
+    assert results['requests'] == 50
+    assert results['errors'] == 0
+    assert set(results['operations'].keys()) == {
+        'traverse', 'get', 'items', 'patch', 'post', 'upload'}
+    assert sum(op['requests'] for op in results['operations'].values()) == 50
+    assert results['latency']['p50'] <= results['latency']['p99']
+    assert 'hit_rate' in results['cache']
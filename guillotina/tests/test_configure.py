@@ -11,6 +11,9 @@ from guillotina.factory.content import ApplicationRoot
 from guillotina.interfaces import IApplication
 from guillotina.interfaces import IContainer
 from zope.interface import Interface
+from zope.interface import implementer
+
+import asyncio
 
 
 async def test_register_service(container_requester):
@@ -210,3 +213,70 @@ def test_loading_nested_configuration():
     configure_application('guillotina.test_package', config, root, {}, configured)
     assert 'guillotina' in configured
     assert 'guillotina.test_package' in configured
+
+
+async def test_subscribers_run_by_priority(dummy_guillotina):
+    from guillotina.component.globalregistry import provide_handler
+    from guillotina.event import notify
+
+    class IFoobarEvent(Interface):
+        pass
+
+    @implementer(IFoobarEvent)
+    class FoobarEvent:
+        pass
+
+    called = []
+
+    async def second(event):
+        called.append('second')
+    second.priority = 200
+
+    def first(event):
+        called.append('first')
+    first.priority = 50
+
+    provide_handler(second, (IFoobarEvent,))
+    provide_handler(first, (IFoobarEvent,))
+    await notify(FoobarEvent())
+    assert called == ['first', 'second']
+
+    # registry changes are taken into account
+    async def third(event):
+        called.append('third')
+    provide_handler(third, (IFoobarEvent,))
+    called.clear()
+    await notify(FoobarEvent())
+    assert called == ['first', 'third', 'second']
+
+
+async def test_subscribers_with_same_priority_run_concurrently(dummy_guillotina):
+    from guillotina._settings import app_settings
+    from guillotina.component.globalregistry import provide_handler
+    from guillotina.event import notify
+
+    class IFoobarEvent(Interface):
+        pass
+
+    @implementer(IFoobarEvent)
+    class FoobarEvent:
+        pass
+
+    called = []
+
+    async def slow(event):
+        called.append('slow start')
+        await asyncio.sleep(0.05)
+        called.append('slow end')
+
+    async def fast(event):
+        called.append('fast')
+
+    provide_handler(slow, (IFoobarEvent,))
+    provide_handler(fast, (IFoobarEvent,))
+    app_settings['concurrent_subscribers'] = True
+    try:
+        await notify(FoobarEvent())
+    finally:
+        app_settings['concurrent_subscribers'] = False
+    assert called == ['slow start', 'fast', 'slow end']
@@ -0,0 +1,119 @@
+from guillotina.db.conflicts import ConflictTracker
+from guillotina.db.conflicts import conflict_tracker
+from guillotina.exceptions import ConflictError
+from guillotina.tests.utils import get_mocked_request
+from guillotina.transactions import abort
+from guillotina.transactions import commit as original_commit
+from unittest import mock
+
+import asyncio
+import json
+import time
+
+
+def test_hot_spots():
+    tracker = ConflictTracker()
+    for _ in range(2):
+        tracker.record_conflict(['foo', 'bar'], '/db/guillotina')
+    assert not tracker.is_hot('foo')
+    tracker.record_conflict(['foo'], '/db/guillotina')
+    assert tracker.is_hot('foo')
+    assert not tracker.is_hot('bar')
+
+    metrics = tracker.get_metrics()
+    assert metrics['conflicts'] == 3
+    assert metrics['hot_spots'] == {'foo': 3}
+    assert metrics['paths']['/db/guillotina']['conflicts'] == 3
+    assert tracker.get_hot_oids('/db/guillotina') == ['foo']
+    assert tracker.get_hot_oids('/db') == []
+
+    # conflicts are counted again after the window
+    with mock.patch('guillotina.db.conflicts.time.time', return_value=time.time() + 11):
+        assert not tracker.is_hot('foo')
+        tracker.record_conflict(['foo'])
+        assert not tracker.is_hot('foo')
+
+
+def test_retry_delay():
+    tracker = ConflictTracker()
+    for attempt in range(1, 4):
+        assert 0 <= tracker.get_retry_delay(attempt) <= 0.01 * (2 ** (attempt - 1))
+    assert tracker.get_retry_delay(20) <= 0.5
+
+
+async def test_retries_of_hot_spots_run_one_at_a_time():
+    tracker = ConflictTracker()
+    request1 = get_mocked_request()
+    request2 = get_mocked_request()
+    assert await tracker.acquire(['foo'], request1) == []
+    for _ in range(3):
+        tracker.record_conflict(['foo'])
+
+    assert await tracker.acquire(['foo'], request1) == ['foo']
+    # already held by the request
+    assert await tracker.acquire(['foo'], request1) == []
+    task = asyncio.ensure_future(tracker.acquire(['foo'], request2))
+    await asyncio.sleep(0.01)
+    assert not task.done()
+    tracker.release(['foo'], request1)
+    assert await task == ['foo']
+    tracker.release(['foo'], request2)
+    assert tracker.get_metrics()['locked'] == 0
+
+
+async def test_conflicting_request_is_retried(container_requester):
+    async with container_requester as requester:
+        conflict_tracker.clear()
+        conflicts = []
+
+        async def commit(request, **kwargs):
+            if len(conflicts) < 2:
+                conflicts.append(getattr(request, '_retry_attempt', 0))
+                await abort(request)
+                raise ConflictError('conflict', oids=['foobar'])
+            await original_commit(request, **kwargs)
+
+        with mock.patch('guillotina.traversal.commit', commit):
+            response, status = await requester(
+                'POST', '/db/guillotina/',
+                data=json.dumps({
+                    '@type': 'Item',
+                    'id': 'item'
+                }))
+        assert status == 201
+        assert conflicts == [0, 1]
+
+        response, status = await requester('GET', '/@conflicts')
+        assert status == 200
+        assert response['conflicts'] == 2
+        assert response['retries'] == 2
+        assert response['exhausted'] == 0
+        assert response['paths']['/db/guillotina/']['retries'] == 2
+        assert response['locked'] == 0
+
+
+async def test_first_attempt_waits_for_hot_spots_of_path(container_requester):
+    async with container_requester as requester:
+        conflict_tracker.clear()
+        for _ in range(3):
+            conflict_tracker.record_conflict(['foobar'], '/db/guillotina/')
+        other = get_mocked_request()
+        assert await conflict_tracker.acquire(['foobar'], other) == ['foobar']
+
+        task = asyncio.ensure_future(requester(
+            'POST', '/db/guillotina/',
+            data=json.dumps({
+                '@type': 'Item',
+                'id': 'item'
+            })))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        # reads do not wait
+        response, status = await requester('GET', '/db/guillotina/')
+        assert status == 200
+
+        conflict_tracker.release(['foobar'], other)
+        response, status = await task
+        assert status == 201
+        assert conflict_tracker.get_metrics()['locked'] == 0
+        conflict_tracker.clear()
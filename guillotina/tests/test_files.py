@@ -1,5 +1,7 @@
 from guillotina.exceptions import UnRetryableRequestError
+from guillotina.files.utils import RequestDataBuffer
 from guillotina.files.utils import get_contenttype
+from guillotina.files.utils import parse_range_header
 from guillotina.files.utils import read_request_data
 from guillotina.tests.utils import get_mocked_request
 
@@ -10,10 +12,38 @@ async def test_read_request_data_handles_retries():
     request = get_mocked_request()
     request._retry_attempt = 1
     request._last_read_pos = 0
-    request._cache_data = b'aaa'
+    request._cache_data = RequestDataBuffer()
+    await request._cache_data.append(b'aaa')
     assert await read_request_data(request, 5) == b'aaa'
 
 
+async def test_request_data_buffer_keeps_chunks():
+    buffer = RequestDataBuffer(max_memory_size=10)
+    chunks = [b'aaa', b'bbb', b'cc']
+    for chunk in chunks:
+        await buffer.append(chunk)
+    assert not buffer.spilled
+    assert buffer.size == 8
+    # not copied when read again with the same size
+    assert await buffer.read(3, 3) is chunks[1]
+    assert await buffer.read(2, 4) == b'abbb'
+    assert await buffer.read(6, 5) == b'cc'
+    assert await buffer.read(8, 5) == b''
+
+
+async def test_request_data_buffer_spills_to_file(dummy_guillotina):
+    buffer = RequestDataBuffer(max_memory_size=10)
+    for chunk in (b'aaaa', b'bbbb', b'cccc', b'dddd'):
+        await buffer.append(chunk)
+    assert buffer.spilled
+    assert buffer.size == 16
+    assert await buffer.read(0, 16) == b'aaaabbbbccccdddd'
+    assert await buffer.read(6, 4) == b'bbcc'
+    assert await buffer.read(14, 4) == b'dd'
+    buffer.close()
+    assert not buffer.spilled
+
+
 async def test_read_request_data_throws_exception_if_no_cache_data():
     request = get_mocked_request()
     request._retry_attempt = 1
@@ -31,3 +61,18 @@ def test_get_content_type():
     assert get_contenttype(Foobar()) == 'application/json'
     assert get_contenttype(Foobar2()) == 'application/json'
     assert get_contenttype(None, default='application/json') == 'application/json'
+
+
+def test_parse_range_header():
+    assert parse_range_header('bytes=0-9', 100) == [(0, 10)]
+    assert parse_range_header('bytes=90-', 100) == [(90, 100)]
+    assert parse_range_header('bytes=-10', 100) == [(90, 100)]
+    assert parse_range_header('bytes=-200', 100) == [(0, 100)]
+    assert parse_range_header('bytes=90-200', 100) == [(90, 100)]
+    assert parse_range_header('bytes=0-1, 5-6', 100) == [(0, 2), (5, 7)]
+    assert parse_range_header('bytes=100-', 100) == []
+    assert parse_range_header('bytes=-0', 100) == []
+    assert parse_range_header('bytes=5-1', 100) is None
+    assert parse_range_header('bytes=a-b', 100) is None
+    assert parse_range_header('items=0-1', 100) is None
+    assert parse_range_header('bytes=' + ','.join(['0-1'] * 50), 100) is None
@@ -1,11 +1,16 @@
 from guillotina.content import Folder
+from guillotina.db.cache.memory import get_memory_store
+from guillotina.db.storages import pg
 from guillotina.db.storages.cockroach import CockroachStorage
 from guillotina.db.storages.pg import PostgresqlStorage
 from guillotina.db.transaction_manager import TransactionManager
 from guillotina.exceptions import ConflictError
+from guillotina.exceptions import TIDConflictError
 from guillotina.tests import mocks
 from guillotina.tests.utils import create_content
+from unittest import mock
 
+import aiotask_context
 import asyncio
 import asyncpg
 import concurrent
@@ -35,7 +40,8 @@ async def cleanup(aps):
     await aps.finalize()
 
 
-async def get_aps(postgres, strategy=None, pool_size=16):
+async def get_aps(postgres, strategy=None, pool_size=16, cache_strategy='dummy',
+                  store_batch_threshold=10):
     dsn = "postgres://postgres:@{}:{}/guillotina".format(
         postgres[0],
         postgres[1],
@@ -55,7 +61,8 @@ async def get_aps(postgres, strategy=None, pool_size=16):
     aps = klass(
         dsn=dsn, name='db',
         transaction_strategy=strategy, pool_size=pool_size,
-        conn_acquire_timeout=0.1)
+        conn_acquire_timeout=0.1, cache_strategy=cache_strategy,
+        store_batch_threshold=store_batch_threshold)
     await aps.initialize()
     return aps
 
@@ -163,6 +170,167 @@ async def test_deleting_parent_deletes_children(db, dummy_request):
     await cleanup(aps)
 
 
+@pytest.mark.skipif(DATABASE in ('cockroachdb', 'DUMMY'),
+                    reason="Cockroach does not have cascade support")
+async def test_vacuum_deletes_subtree_in_batches(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps = await get_aps(db)
+    tm = TransactionManager(aps)
+    txn = await tm.begin()
+
+    folder = create_content(Folder, 'Folder')
+    txn.register(folder)
+    obs = []
+    for idx in range(3):
+        sub = create_content(Folder, 'Folder', id=f'sub{idx}', parent=folder)
+        txn.register(sub)
+        ob = create_content(id='item', parent=sub)
+        txn.register(ob)
+        obs.extend([sub, ob])
+    await tm.commit(txn=txn)
+
+    txn = await tm.begin()
+    assert await txn.count_subtree(folder._p_oid) == 6
+    children = [ob async for ob in txn.iter_subtree(folder)]
+    # depth first and in key order
+    assert [ob._p_oid for ob in children[::2]] == sorted(ob._p_oid for ob in obs[::2])
+    for sub, item in zip(children[::2], children[1::2]):
+        assert item.__parent__ is sub
+        assert sub.__parent__ is folder
+    for idx, ob in enumerate(obs[1::2]):
+        for chunk_index in range(idx + 1):
+            await txn.write_blob_chunk(f'bid{idx}', ob._p_oid, chunk_index, b'foobar')
+    txn.delete(folder)
+    aps._vacuum._batch_size = 2
+    await tm.commit(txn=txn)
+    await aps._vacuum._queue.join()
+
+    txn = await tm.begin()
+    for ob in [folder] + obs:
+        with pytest.raises(KeyError):
+            await txn.get(ob._p_oid)
+    for idx in range(3):
+        assert await txn.read_blob_chunk(f'bid{idx}', 0) is None
+    await tm.abort(txn=txn)
+
+    metrics = aps.get_vacuum_metrics()
+    assert metrics['queued'] == 0
+    assert metrics['vacuumed'] >= 1
+    assert metrics['deleted_objects'] >= 7
+    assert metrics['deleted_blob_chunks'] >= 6
+    assert metrics['errors'] == 0
+
+    await aps.remove()
+    await cleanup(aps)
+
+
+@pytest.mark.skipif(DATABASE in ('cockroachdb', 'DUMMY'),
+                    reason="Cockroach does not have cascade support")
+async def test_vacuum_objects_deleted_by_other_processes(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps = await get_aps(db)
+    tm = TransactionManager(aps)
+    txn = await tm.begin()
+
+    folder = create_content(Folder, 'Folder')
+    txn.register(folder)
+    subs = []
+    items = []
+    for idx in range(3):
+        sub = create_content(Folder, 'Folder', id=f'sub{idx}', parent=folder)
+        txn.register(sub)
+        ob = create_content(id='item', parent=sub)
+        txn.register(ob)
+        subs.append(sub)
+        items.append(ob)
+    await tm.commit(txn=txn)
+
+    original_execute = asyncpg.connection.Connection.execute
+
+    async def execute(self, query, *args, **kwargs):
+        result = await original_execute(self, query, *args, **kwargs)
+        if query == pg.FILL_VACUUM_TABLE_ANNOTATIONS:
+            # another process vacuumed part of the subtree meanwhile
+            await original_execute(
+                self, 'DELETE FROM objects WHERE zoid = ANY($1::varchar[])',
+                [ob._p_oid for ob in items])
+        return result
+
+    txn = await tm.begin()
+    txn.delete(folder)
+    aps._vacuum._batch_size = 2
+    with mock.patch.object(asyncpg.connection.Connection, 'execute', execute):
+        await tm.commit(txn=txn)
+        await aps._vacuum._queue.join()
+
+    txn = await tm.begin()
+    for ob in [folder] + subs:
+        with pytest.raises(KeyError):
+            await txn.get(ob._p_oid)
+    await tm.abort(txn=txn)
+
+    metrics = aps.get_vacuum_metrics()
+    assert metrics['deleted_objects'] == 4
+    assert metrics['errors'] == 0
+
+    await aps.remove()
+    await cleanup(aps)
+
+
+@pytest.mark.skipif(DATABASE in ('cockroachdb', 'DUMMY'),
+                    reason="Cockroach does not have cascade support")
+async def test_vacuum_resumes_where_it_stopped(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps = await get_aps(db)
+    tm = TransactionManager(aps)
+    txn = await tm.begin()
+
+    folder = create_content(Folder, 'Folder')
+    txn.register(folder)
+    obs = []
+    for idx in range(3):
+        sub = create_content(Folder, 'Folder', id=f'sub{idx}', parent=folder)
+        txn.register(sub)
+        ob = create_content(id='item', parent=sub)
+        txn.register(ob)
+        obs.extend([sub, ob])
+    await tm.commit(txn=txn)
+
+    txn = await tm.begin()
+    txn.delete(folder)
+    aps._vacuum._batch_size = 2
+    # stop after the first batch like a restart would
+    with mock.patch.object(aps._vacuum, '_wait', side_effect=Exception('stopped')):
+        await tm.commit(txn=txn)
+        await aps._vacuum._queue.join()
+
+    metrics = aps.get_vacuum_metrics()
+    assert metrics['errors'] == 1
+    assert metrics['deleted_objects'] == 2
+    assert await aps.get_vacuum_progress() == {folder._p_oid: 5}
+
+    await aps._vacuum.add_to_queue(folder._p_oid)
+    await aps._vacuum._queue.join()
+
+    txn = await tm.begin()
+    for ob in [folder] + obs:
+        with pytest.raises(KeyError):
+            await txn.get(ob._p_oid)
+    await tm.abort(txn=txn)
+
+    metrics = aps.get_vacuum_metrics()
+    assert metrics['resumed'] == 1
+    assert metrics['deleted_objects'] == 7
+    assert metrics['vacuumed'] == 1
+    assert await aps.get_vacuum_progress() == {}
+
+    await aps.remove()
+    await cleanup(aps)
+
+
 @pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
 async def test_create_blob(db, dummy_request):
     request = dummy_request  # noqa so magically get_current_request can find
@@ -259,8 +427,9 @@ async def test_should_raise_conflict_error_when_editing_diff_data_with_resolve_s
 
     # commit 2 before 1
     await tm.commit(txn=txn2)
-    with pytest.raises(ConflictError):
+    with pytest.raises(ConflictError) as exc_info:
         await tm.commit(txn=txn1)
+    assert exc_info.value.oids == [ob._p_oid]
 
     await aps.remove()
     await cleanup(aps)
@@ -628,6 +797,186 @@ async def test_iterate_keys(db, dummy_request):
     await tm.abort(txn=txn)
 
 
+@pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
+async def test_get_children_by_path(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps = await get_aps(db)
+    tm = TransactionManager(aps)
+    txn = await tm.begin()
+
+    parent = create_content(Folder, 'Folder')
+    txn.register(parent)
+    folder = create_content(Folder, 'Folder', id='folder', parent=parent)
+    txn.register(folder)
+    item = create_content(id='item', parent=folder)
+    txn.register(item)
+    await tm.commit(txn=txn)
+
+    txn = await tm.begin()
+    children = await txn.get_children_by_path(parent, ['folder', 'item'])
+    assert [c._p_oid for c in children] == [folder._p_oid, item._p_oid]
+    assert children[1].__parent__ is children[0]
+    assert children[0].__parent__ is parent
+
+    children = await txn.get_children_by_path(parent, ['folder', 'missing', 'item'])
+    assert [c._p_oid for c in children] == [folder._p_oid]
+    assert await txn.get_children_by_path(parent, ['missing']) == []
+
+    records = await txn.load_with_ancestors(item._p_oid)
+    assert [r['zoid'] for r in records] == [item._p_oid, folder._p_oid, parent._p_oid]
+    with pytest.raises(KeyError):
+        await txn.load_with_ancestors('foobar')
+    await tm.abort(txn=txn)
+    await aps.remove()
+    await cleanup(aps)
+
+
+@pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
+async def test_store_batch(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps = await get_aps(db, store_batch_threshold=2)
+    tm = TransactionManager(aps)
+    txn = await tm.begin()
+
+    parent = create_content(Folder, 'Folder')
+    txn.register(parent)
+    items = []
+    for _ in range(20):
+        item = create_content()
+        item.__parent__ = parent
+        txn.register(item)
+        items.append(item)
+    await tm.commit(txn=txn)
+    assert parent._p_serial == txn._tid
+
+    txn = await tm.begin()
+    assert await txn.len(parent._p_oid) == 20
+    for item in items:
+        item = await txn.get(item._p_oid)
+        item.title = 'foobar'
+        txn.register(item)
+    await tm.commit(txn=txn)
+    tid = txn._tid
+
+    txn = await tm.begin()
+    for item in items:
+        item = await txn.get(item._p_oid)
+        assert item.title == 'foobar'
+        assert item._p_serial == tid
+    await tm.abort(txn=txn)
+
+    await aps.remove()
+    await cleanup(aps)
+
+
+@pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
+async def test_store_batch_mismatched_tid_causes_conflict_error(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps = await get_aps(db, store_batch_threshold=2)
+    tm = TransactionManager(aps)
+    txn = await tm.begin()
+    items = []
+    for _ in range(5):
+        item = create_content()
+        txn.register(item)
+        items.append(item)
+    await tm.commit(txn=txn)
+
+    txn = await tm.begin()
+    for item in items:
+        item = await txn.get(item._p_oid)
+        txn.register(item)
+    # modify p_serial, try committing, should raise conflict error
+    item._p_serial = 3242432
+
+    with pytest.raises(TIDConflictError) as exc_info:
+        await tm.commit(txn=txn)
+    assert exc_info.value.oids == [item._p_oid]
+    await aps.remove()
+    await cleanup(aps)
+
+
+@pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
+async def test_store_batch_missing_parent_only_marks_its_children(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps = await get_aps(db, store_batch_threshold=2)
+    tm = TransactionManager(aps)
+    txn = await tm.begin()
+    # never stored
+    missing = create_content(Folder, 'Folder')
+    items = []
+    orphans = []
+    for idx in range(6):
+        item = create_content()
+        if idx % 3 == 0:
+            item.__parent__ = missing
+            orphans.append(item)
+        txn.register(item)
+        items.append(item)
+
+    aiotask_context.set('request', request)
+    with pytest.raises(TIDConflictError) as exc_info:
+        await tm.commit(txn=txn)
+    assert sorted(exc_info.value.oids) == sorted(ob._p_oid for ob in orphans)
+    await aps.remove()
+    await cleanup(aps)
+
+
+@pytest.mark.skipif(DATABASE in ('cockroachdb', 'DUMMY'),
+                    reason="Cockroach does not support LISTEN/NOTIFY")
+async def test_cache_invalidations_between_storages(db, dummy_request):
+    request = dummy_request  # noqa so magically get_current_request can find
+
+    aps1 = await get_aps(db, cache_strategy='memory')
+    aps2 = await get_aps(db, cache_strategy='memory')
+    # wait for listener connections
+    while not (aps1._invalidations._listening and aps2._invalidations._listening):
+        await asyncio.sleep(0.01)
+    tm1 = TransactionManager(aps1)
+    tm2 = TransactionManager(aps2)
+
+    txn = await tm1.begin()
+    ob = create_content()
+    txn.register(ob)
+    await tm1.commit(txn=txn)
+    # wait for the invalidation of the new object to not race with loading it
+    for _ in range(100):
+        if aps2._invalidations.last_tid == ob._p_serial:
+            break
+        await asyncio.sleep(0.01)
+
+    # load it in the other process cache
+    request._txn = None
+    txn = await tm2.begin()
+    await txn.get(ob._p_oid)
+    await tm2.abort(txn=txn)
+    store = get_memory_store(aps2)
+    key = txn._cache.get_key(oid=ob._p_oid)
+    assert key in store
+
+    request._txn = None
+    txn = await tm1.begin()
+    ob = await txn.get(ob._p_oid)
+    ob.title = 'foobar'
+    txn.register(ob)
+    await tm1.commit(txn=txn)
+
+    for _ in range(100):
+        if key not in store:
+            break
+        await asyncio.sleep(0.01)
+    assert key not in store
+    assert aps2._invalidations.last_tid == ob._p_serial
+
+    await aps2.finalize()
+    await aps1.remove()
+    await cleanup(aps1)
+
+
 @pytest.mark.skipif(DATABASE in ('cockroachdb', 'DUMMY'),
                     reason="Cockroach does not like this test...")
 async def test_handles_asyncpg_trying_savepoints(db, dummy_request):
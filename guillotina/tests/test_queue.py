@@ -1,10 +1,15 @@
+from guillotina.async_util import PRIORITY_HIGH
+from guillotina.async_util import PRIORITY_LOW
+from guillotina.async_util import AsyncJobPool
 from guillotina.async_util import IAsyncJobPool
 from guillotina.async_util import IQueueUtility
 from guillotina.browser import View
 from guillotina.component import get_utility
+from guillotina.exceptions import JobPoolFullException
 from guillotina.tests import utils
 
 import asyncio
+import pytest
 
 
 class AsyncMockView(View):
@@ -86,3 +91,92 @@ async def test_run_many_jobs(guillotina, dummy_request):
 
     for job in jobs:
         assert job.func.done
+
+
+async def test_jobs_run_by_priority(guillotina):
+    pool = AsyncJobPool({'max_size': 1})
+    ran = []
+
+    async def job(name):
+        ran.append(name)
+
+    pool.add_job(job, args=['first'])
+    pool.add_job(job, args=['low'], priority=PRIORITY_LOW)
+    pool.add_job(job, args=['normal'])
+    pool.add_job(job, args=['high'], priority=PRIORITY_HIGH)
+    assert pool.num_pending == 3
+    await pool.join()
+    assert ran == ['first', 'high', 'normal', 'low']
+    metrics = pool.get_metrics()
+    assert metrics['queued'] == 4
+    assert metrics['completed'] == 4
+    assert metrics['run_latency']['count'] == 4
+
+
+async def test_queue_concurrency_limit(guillotina):
+    pool = AsyncJobPool({'max_size': 5, 'queues': {'catalog': 1}})
+    jobs = [pool.add_job(JobRunner(), args=['foobar'], queue='catalog')
+            for _ in range(3)]
+    other = pool.add_job(JobRunner(), args=['foobar'])
+    assert pool.num_running == 2
+    assert pool.get_metrics()['pending_by_queue']['catalog'] == 2
+
+    other.func.wait = False
+    for job in jobs:
+        job.func.wait = False
+    await pool.join()
+    assert all(job.func.done for job in jobs)
+    assert pool.num_running == 0
+
+
+async def test_job_timeout(guillotina):
+    pool = AsyncJobPool({'max_size': 5})
+    job = pool.add_job(JobRunner(), args=['foobar'], timeout=0.1)
+    await pool.join()
+    assert not job.func.done
+    assert pool.get_metrics()['timed_out'] == 1
+
+
+async def test_add_job_waits_for_capacity(guillotina):
+    pool = AsyncJobPool({'max_size': 1, 'max_pending': 1})
+    job = pool.add_job(JobRunner(), args=['foobar'])
+    pool.add_job(JobRunner(), args=['foobar'])
+    assert pool.num_pending == 1
+
+    task = asyncio.ensure_future(pool.async_add_job(JobRunner(), args=['foobar']))
+    await asyncio.sleep(0.1)
+    assert not task.done()
+
+    job.func.wait = False
+    await asyncio.sleep(0.1)
+    assert task.done()
+    assert pool.num_pending == 1
+
+
+async def test_add_job_rejected_when_full(guillotina):
+    pool = AsyncJobPool({'max_size': 1, 'max_pending': 1})
+    job = pool.add_job(JobRunner(), args=['foobar'])
+    pool.add_job(JobRunner(), args=['foobar'])
+    with pytest.raises(JobPoolFullException):
+        pool.add_job(JobRunner(), args=['foobar'])
+    assert pool.num_pending == 1
+    assert pool.get_metrics()['rejected'] == 1
+
+    # jobs added after commit wait instead
+    task = asyncio.ensure_future(pool._add_job_after_commit(True, JobRunner(), args=['foobar']))
+    await asyncio.sleep(0.1)
+    assert not task.done()
+
+    job.func.wait = False
+    await asyncio.sleep(0.1)
+    assert task.done()
+    assert pool.num_pending == 1
+
+
+async def test_get_async_jobs_metrics(container_requester):
+    async with container_requester as requester:
+        response, status = await requester('GET', '/@async-jobs')
+        assert status == 200
+        assert response['pending'] >= 0
+        assert 'rejected' in response
+        assert 'wait_latency' in response
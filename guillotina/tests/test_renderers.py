@@ -0,0 +1,48 @@
+from datetime import datetime
+from guillotina.interfaces import Allow
+from guillotina.interfaces import IResource
+from guillotina.renderers import RendererJson
+from guillotina.renderers import json_backends
+
+import json
+import pytest
+
+
+@pytest.mark.parametrize('backend', list(json_backends.keys()))
+def test_json_backends(backend):
+    dumps = json_backends[backend]
+    value = {
+        'date': datetime(2018, 1, 1, 10, 30, 5, 12),
+        'setting': Allow,
+        'iface': IResource,
+        'tuple': (1, 2),
+        'set': {'foo'},
+        'text': 'Ñoño/ñoño',
+        1: None
+    }
+    assert json.loads(dumps(value)) == {
+        'date': '2018-01-01T10:30:05.000012',
+        'setting': 'Allow',
+        'iface': json.loads(json_backends['json'](IResource)),
+        'tuple': [1, 2],
+        'set': ['foo'],
+        'text': 'Ñoño/ñoño',
+        '1': None
+    }
+    # not supported by all the backends
+    assert json.loads(dumps({'foo': 2 ** 70})) == {'foo': 2 ** 70}
+
+
+@pytest.mark.parametrize('backend', ['json', 'ujson'])
+def test_json_backends_encode_like_json(backend):
+    dumps = json_backends[backend]
+    value = {'text': 'Ñoño/ñoño', 'bytes': b'foo'}
+    assert json.loads(dumps(value)) == {'text': 'Ñoño/ñoño', 'bytes': [102, 111, 111]}
+    assert b'\\u00d1o\\u00f1o/' in dumps(value)
+
+
+def test_json_renderer_does_not_encode_bytes(dummy_request):
+    renderer = RendererJson(None, dummy_request)
+    assert renderer.get_body(b'{"foo": "bar"}') == b'{"foo": "bar"}'
+    assert json.loads(renderer.get_body({'foo': 'bar'})) == {'foo': 'bar'}
+    assert renderer.get_body(None) is None
@@ -1,3 +1,5 @@
+from guillotina.security.cache import acl_cache
+from guillotina.security.cache import get_acl_cache_key
 from guillotina.security.utils import get_principals_with_access_content
 from guillotina.security.utils import get_roles_with_access_content
 from guillotina.security.utils import settings_for_object
@@ -454,3 +456,59 @@ async def test_allowsingle2(container_requester):
             'guillotina.ViewContent', test1)
         assert request.security.check_permission(
             'guillotina.ViewContent', test2)
+
+
+async def test_acl_cache_shared_between_requests(container_requester):
+    async with container_requester as requester:
+        response, status = await requester(
+            'POST',
+            '/db/guillotina/',
+            data=json.dumps({
+                '@type': 'Item',
+                'id': 'testing'
+            }))
+        assert status == 201
+
+        user = GuillotinaUser(None)
+        user.id = 'user1'
+        user._groups = []
+
+        request = utils.get_mocked_request(requester.db)
+        container = await utils.get_container(requester, request)
+        content = await container.async_get('testing')
+        utils.login(request, user)
+        assert not request.security.check_permission('guillotina.AccessContent', content)
+        key = get_acl_cache_key(content)
+        assert len(acl_cache.get_entry(key)) > 0
+
+        # other requests use the settings compiled for the object
+        request = utils.get_mocked_request(requester.db)
+        container = await utils.get_container(requester, request)
+        content = await container.async_get('testing')
+        assert get_acl_cache_key(content) == key
+        utils.login(request, user)
+        assert request.security.compiled(content) is acl_cache.get_entry(key)
+        assert not request.security.check_permission('guillotina.AccessContent', content)
+
+        response, status = await requester(
+            'POST',
+            '/db/guillotina/testing/@sharing',
+            data=json.dumps({
+                'prinperm': [{
+                    'principal': 'user1',
+                    'permission': 'guillotina.AccessContent',
+                    'setting': 'Allow'
+                }]
+            }))
+        assert status == 200
+
+        request = utils.get_mocked_request(requester.db)
+        container = await utils.get_container(requester, request)
+        content = await container.async_get('testing')
+        assert get_acl_cache_key(content) != key
+        utils.login(request, user)
+        assert request.security.check_permission('guillotina.AccessContent', content)
+
+        # changes not committed are not shared
+        content._p_register()
+        assert get_acl_cache_key(content) is None
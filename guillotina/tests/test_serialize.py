@@ -1,13 +1,17 @@
 from datetime import datetime
 from guillotina import fields
 from guillotina import schema
+from guillotina.behaviors.dublincore import IDublinCore
 from guillotina.component import get_adapter
+from guillotina.component import get_global_components
 from guillotina.component import get_multi_adapter
+from guillotina.component import provide_adapter
 from guillotina.exceptions import ValueDeserializationError
 from guillotina.files.dbfile import DBFile
 from guillotina.interfaces import IJSONToValue
 from guillotina.interfaces import IResourceDeserializeFromJson
 from guillotina.interfaces import IResourceSerializeToJson
+from guillotina.interfaces import IValueToJson
 from guillotina.json import deserialize_value
 from guillotina.json.deserialize_value import schema_compatible
 from guillotina.json.serialize_value import json_compatible
@@ -16,6 +20,7 @@ from guillotina.tests import mocks
 from guillotina.tests.utils import create_content
 from guillotina.tests.utils import login
 from zope.interface import Interface
+from zope.interface import alsoProvides
 
 
 async def test_serialize_resource(dummy_request):
@@ -58,6 +63,49 @@ async def test_serialize_resource_include_field(dummy_request):
     assert 'file' not in result
 
 
+async def test_serialize_plan_reused(dummy_request):
+    content = create_content()
+    serializer = get_multi_adapter(
+        (content, dummy_request),
+        IResourceSerializeToJson)
+    result = await serializer(omit=['guillotina.behaviors.dublincore.IDublinCore.creators'])
+    assert 'creators' not in result['guillotina.behaviors.dublincore.IDublinCore']
+    plan = serializer.get_schema_plan(IDublinCore, True)
+    assert 'creators' not in [name for name, _, _ in plan]
+
+    serializer = get_multi_adapter(
+        (create_content(), dummy_request),
+        IResourceSerializeToJson)
+    result = await serializer(omit=['guillotina.behaviors.dublincore.IDublinCore.creators'])
+    assert serializer.get_schema_plan(IDublinCore, True) is plan
+
+    # other include/omit values do not use the same plan
+    result = await serializer()
+    assert 'creators' in result['guillotina.behaviors.dublincore.IDublinCore']
+
+
+def test_json_compatible_directly_provided_value():
+    class IMarker(Interface):
+        pass
+
+    class Value(dict):
+        pass
+
+    def marker_converter(value):
+        return 'marker'
+
+    value = Value(foo='bar')
+    assert json_compatible(value) == {'foo': 'bar'}
+    provide_adapter(marker_converter, adapts=(IMarker,), provides=IValueToJson)
+    try:
+        alsoProvides(value, IMarker)
+        assert json_compatible(value) == 'marker'
+        assert json_compatible(Value(foo='bar')) == {'foo': 'bar'}
+    finally:
+        get_global_components().unregisterAdapter(
+            marker_converter, required=(IMarker,), provided=IValueToJson)
+
+
 async def test_serialize_omit_main_interface_field(dummy_request):
     from guillotina.test_package import FileContent
     obj = create_content(FileContent, type_name='File')
@@ -59,6 +59,18 @@ async def test_delete_database(container_requester):
         assert 'foobar' not in response['databases']
 
 
+async def test_get_vacuum_metrics(container_requester):
+    async with container_requester as requester:
+        response, status = await requester('GET', '/db/@vacuum')
+        if DATABASE == 'DUMMY':
+            assert status == 412
+        else:
+            assert status == 200
+            assert response['queued'] >= 0
+            assert response['errors'] == 0
+            assert isinstance(response['progress'], dict)
+
+
 @pytest.mark.skipif(DATABASE == 'DUMMY', reason='Not for dummy db')
 async def test_storage_impl(db, guillotina_main):
     storages = app_settings['storages']
@@ -1,7 +1,12 @@
+from guillotina.db.storages.dummy import DummyStorage
 from guillotina.db.transaction import Transaction
+from guillotina.db.transaction_manager import TransactionManager
 from guillotina.tests import mocks
 from guillotina.tests import utils
 from guillotina.transactions import managed_transaction
+from guillotina.utils import get_content_path
+
+import json
 
 
 async def test_no_tid_created_for_reads(dummy_request, loop):
@@ -43,3 +48,67 @@ async def test_managed_transaction_with_adoption(container_requester):
         async with managed_transaction(request=request, abort_when_done=True):
             container = await root.async_get('guillotina')
             assert container.title == 'changed title'
+
+
+async def test_commit_with_store_batch(dummy_request, loop):
+    dummy_request._db_write_enabled = True
+    storage = DummyStorage()
+    storage._store_batch_threshold = 1
+    tm = TransactionManager(storage)
+    trns = Transaction(tm, dummy_request, loop=loop)
+    await trns.tpc_begin()
+    obs = [utils.create_content(), utils.create_content()]
+    for ob in obs:
+        trns.register(ob)
+    await trns.commit()
+    for ob in obs:
+        assert ob._p_serial == trns._tid
+        assert not ob.__new_marker__
+        assert ob._p_oid in storage._db
+
+
+async def test_get_resources_of_type_with_dummy_storage(dummy_request, loop):
+    dummy_request._db_write_enabled = True
+    storage = DummyStorage()
+    tm = TransactionManager(storage)
+    trns = Transaction(tm, dummy_request, loop=loop)
+    await trns.tpc_begin()
+    obs = [utils.create_content() for _ in range(5)]
+    for ob in obs:
+        trns.register(ob)
+    await trns.commit()
+
+    trns = Transaction(tm, dummy_request, loop=loop)
+    assert await storage.get_total_resources_of_type(trns, 'Item') == 5
+    records = [record async for record in trns._get_resources_of_type('Item', page_size=2)]
+    assert [record['zoid'] for record in records] == sorted(ob._p_oid for ob in obs)
+    assert [record async for record in trns._get_resources_of_type('Folder')] == []
+
+
+async def test_iter_subtree(container_requester):
+    async with container_requester as requester:
+        for path, type_name, id in (('', 'Folder', 'folder'),
+                                    ('/folder', 'Folder', 'sub'),
+                                    ('/folder/sub', 'Item', 'item'),
+                                    ('/folder', 'Item', 'item'),
+                                    ('', 'Item', 'item')):
+            await requester(
+                'POST', f'/db/guillotina{path}',
+                data=json.dumps({
+                    '@type': type_name,
+                    'id': id
+                }))
+        request = utils.get_mocked_request(requester.db)
+        root = await utils.get_root(request)
+        async with managed_transaction(request=request, abort_when_done=True) as txn:
+            container = await root.async_get('guillotina')
+            folder = await container.async_get('folder')
+            assert await txn.count_subtree(container._p_oid) == 5
+            assert await txn.count_subtree(folder._p_oid) == 3
+
+            obs = [ob async for ob in txn.iter_subtree(folder)]
+            paths = [get_content_path(ob) for ob in obs]
+            assert sorted(paths) == [
+                '/folder/item', '/folder/sub', '/folder/sub/item']
+            # parents are listed before their children
+            assert paths.index('/folder/sub') < paths.index('/folder/sub/item')
@@ -10,6 +10,8 @@ from guillotina.tests.utils import get_root
 from guillotina.utils import get_behavior
 from guillotina.utils.navigator import Navigator
 
+import pytest
+
 
 def test_module_resolve_path():
     assert utils.resolve_module_path('guillotina') == 'guillotina'
@@ -186,6 +188,43 @@ async def test_object_utils(container_requester):
         await request._tm.abort(txn=txn)
 
 
+async def test_navigate_to_path(container_requester):
+    async with container_requester as requester:
+        path = '/db/guillotina'
+        for type_name, id in (('Folder', 'folder1'), ('Folder', 'folder2'), ('Item', 'item')):
+            response, status = await requester(
+                'POST', path, data=json.dumps({"@type": type_name, "id": id}))
+            assert status == 201
+            path += '/' + id
+
+        response, status = await requester('GET', path)
+        assert status == 200
+        assert response['@uid'] is not None
+        _, status = await requester('GET', '/db/guillotina/folder1/missing/item')
+        assert status == 404
+        response, status = await requester('GET', '/db/guillotina/folder1/folder2/@ids')
+        assert response == ['item']
+
+        request = get_mocked_request(requester.db)
+        root = await get_root(request)
+        txn = await request._tm.begin(request)
+        container = await root.async_get('guillotina')
+
+        ob = await utils.navigate_to(container, 'folder1/folder2/item')
+        assert ob.__name__ == 'item'
+        assert ob.__parent__.__name__ == 'folder2'
+        assert utils.get_content_path(ob) == '/folder1/folder2/item'
+        with pytest.raises(KeyError):
+            await utils.navigate_to(container, 'folder1/missing/item')
+
+        ob = await utils.get_object_by_oid(ob._p_oid, txn)
+        assert utils.get_content_path(ob) == '/folder1/folder2/item'
+        assert ob.__parent__.__parent__.__parent__._p_oid == container._p_oid
+        assert await utils.get_object_by_oid('foobar', txn) is None
+
+        await request._tm.abort(txn=txn)
+
+
 async def test_run_async():
     def _test():
         return 'foobar'
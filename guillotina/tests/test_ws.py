@@ -1,7 +1,10 @@
+from guillotina.api.ws import WebsocketsView
 from guillotina.testing import ADMIN_TOKEN
+from unittest import mock
 
 import aiohttp
 import json
+import pytest
 
 
 async def test_hello(guillotina, container_requester):
@@ -20,7 +23,8 @@ async def test_hello(guillotina, container_requester):
                 msg = await ws.receive()
                 assert msg.type == aiohttp.WSMsgType.text
                 message = json.loads(msg.data)
-                assert message == {'data': '{"value": []}', 'id': '0'}
+                assert message['id'] == '0'
+                assert json.loads(message['data']) == {'value': []}
                 await ws.close()
 
 
@@ -45,3 +49,125 @@ async def test_ws_token(container_requester):
             'GET', '/db/guillotina?ws_token=' + response['token'],
             authenticated=False)
         assert status == 200
+
+
+async def test_write_frames_are_committed(guillotina, container_requester):
+    async with container_requester as requester:
+        async with aiohttp.ClientSession() as session:
+            url = guillotina.server.make_url('db/guillotina/@ws')
+            async with session.ws_connect(
+                    url,
+                    headers={'AUTHORIZATION': 'Basic %s' % ADMIN_TOKEN}) as ws:
+                await ws.send_str(json.dumps({
+                    'op': 'POST',
+                    'id': 'create',
+                    'value': '/',
+                    'payload': {
+                        '@type': 'Item',
+                        'id': 'foobar'
+                    }
+                }))
+                message = json.loads((await ws.receive()).data)
+                assert message['id'] == 'create'
+                assert message['status'] == 201
+
+                await ws.send_str(json.dumps({
+                    'op': 'PATCH',
+                    'id': 'edit',
+                    'value': '/foobar',
+                    'payload': {
+                        'title': 'Foobar'
+                    }
+                }))
+                message = json.loads((await ws.receive()).data)
+                assert message['status'] == 204
+
+                await ws.send_str(json.dumps({
+                    'op': 'GET',
+                    'id': 'missing',
+                    'value': '/missing/@foobar'
+                }))
+                message = json.loads((await ws.receive()).data)
+                assert message['id'] == 'missing'
+                assert message['status'] == 404
+                await ws.close()
+
+        response, status = await requester('GET', '/db/guillotina/foobar')
+        assert status == 200
+        assert response['title'] == 'Foobar'
+
+
+async def test_pipelined_frames(guillotina, container_requester):
+    async with container_requester:
+        async with aiohttp.ClientSession() as session:
+            url = guillotina.server.make_url('db/guillotina/@ws')
+            async with session.ws_connect(
+                    url,
+                    headers={'AUTHORIZATION': 'Basic %s' % ADMIN_TOKEN}) as ws:
+                for idx in range(20):
+                    await ws.send_str(json.dumps({
+                        'op': 'GET',
+                        'id': str(idx),
+                        'value': '/'
+                    }))
+                received = {}
+                for _ in range(20):
+                    message = json.loads((await ws.receive()).data)
+                    received[message['id']] = message
+                assert set(received) == set(str(idx) for idx in range(20))
+                for message in received.values():
+                    assert message['status'] == 200
+                    assert json.loads(message['data'])['@name'] == 'guillotina'
+                await ws.close()
+
+
+async def test_frames_have_their_own_security(guillotina, container_requester):
+    interactions = []
+    original_render_frame = WebsocketsView.render_frame
+
+    async def render_frame(self, request, method, path):
+        interactions.append(request.security)
+        return await original_render_frame(self, request, method, path)
+
+    async with container_requester:
+        async with aiohttp.ClientSession() as session:
+            url = guillotina.server.make_url('db/guillotina/@ws')
+            with mock.patch.object(WebsocketsView, 'render_frame', render_frame):
+                async with session.ws_connect(
+                        url,
+                        headers={'AUTHORIZATION': 'Basic %s' % ADMIN_TOKEN}) as ws:
+                    for idx in range(2):
+                        await ws.send_str(json.dumps({
+                            'op': 'GET',
+                            'id': str(idx),
+                            'value': '/'
+                        }))
+                        message = json.loads((await ws.receive()).data)
+                        assert message['status'] == 200
+                    await ws.close()
+    assert len(interactions) == 2
+    assert interactions[0] is not interactions[1]
+    for interaction in interactions:
+        assert [p.principal.id for p in interaction.participations] == ['root']
+
+
+async def test_msgpack_frames(guillotina, container_requester):
+    msgpack = pytest.importorskip('msgpack')
+    async with container_requester:
+        async with aiohttp.ClientSession() as session:
+            url = guillotina.server.make_url('db/guillotina/@ws')
+            async with session.ws_connect(
+                    url,
+                    headers={'AUTHORIZATION': 'Basic %s' % ADMIN_TOKEN}) as ws:
+                await ws.send_bytes(msgpack.packb({
+                    'op': 'GET',
+                    'id': 1,
+                    'value': '/'
+                }, use_bin_type=True))
+                msg = await ws.receive()
+                assert msg.type == aiohttp.WSMsgType.binary
+                message = msgpack.unpackb(msg.data, raw=False)
+                assert message['id'] == 1
+                assert message['status'] == 200
+                assert json.loads(message['data'])['@name'] == 'guillotina'
+                await ws.close()
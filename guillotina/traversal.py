@@ -60,7 +60,25 @@ from guillotina.utils import import_class
 from zope.interface import alsoProvides
 
 
-async def traverse(request, parent, path):
+async def _prefetch_children(parent, path):
+    '''
+    Load the objects of the path below a resource with one storage call.
+    Returns None when they need to be loaded one by one.
+    '''
+    if getattr(parent, '_p_jar', None) is None:
+        # not stored in a database
+        return None
+    names = []
+    for name in path:
+        if name[0] in ('_', '@') or name in ('.', '..'):
+            break
+        names.append(name)
+    if len(names) < 2:
+        return None
+    return await parent._p_jar.get_children_by_path(parent, names)
+
+
+async def traverse(request, parent, path, prefetched=None):
     """Do not use outside the main router function."""
     if IApplication.providedBy(parent):
         request.application = parent
@@ -81,7 +99,12 @@ async def traverse(request, parent, path):
             return parent, path
 
         if IAsyncContainer.providedBy(parent):
-            context = await parent.async_get(path[0], suppress_events=True)
+            if prefetched is None:
+                prefetched = await _prefetch_children(parent, path)
+            if prefetched:
+                context = prefetched.pop(0)
+            else:
+                context = await parent.async_get(path[0], suppress_events=True)
             if context is None:
                 return parent, path
         else:
@@ -111,7 +134,7 @@ async def traverse(request, parent, path):
             except ModuleNotFoundError:
                 logger.error('Can not apply layer ' + layer, request=request)
 
-    return await traverse(request, context, path[1:])
+    return await traverse(request, context, path[1:], prefetched)
 
 
 def generate_error_response(e, request, error, status=500):
@@ -5,6 +5,8 @@ from guillotina import glogging
 from guillotina.component import get_utility
 from guillotina.component import query_multi_adapter
 from guillotina.db.reader import reader
+from guillotina.event import notify
+from guillotina.events import ObjectLoadedEvent
 from guillotina.interfaces import IAbsoluteURL
 from guillotina.interfaces import IApplication
 from guillotina.interfaces import IContainer
@@ -128,14 +130,20 @@ async def navigate_to(obj: IResource, path: str):
     :param path: relative path to object you want to retrieve
     '''
     actual = obj
-    path_components = path.strip('/').split('/')
+    path_components = [p for p in path.strip('/').split('/') if p != '']
+    txn = getattr(obj, '_p_jar', None)
+    if txn is not None and len(path_components) > 1:
+        # load as much of the path as possible with one storage call
+        for item in await txn.get_children_by_path(obj, path_components):
+            await notify(ObjectLoadedEvent(item))
+            actual = item
+            path_components.pop(0)
     for p in path_components:
-        if p != '':
-            item = await actual.async_get(p)
-            if item is None:
-                raise KeyError('No %s in %s' % (p, actual))
-            else:
-                actual = item
+        item = await actual.async_get(p)
+        if item is None:
+            raise KeyError('No %s in %s' % (p, actual))
+        else:
+            actual = item
     return actual
 
 
@@ -167,17 +175,19 @@ async def get_object_by_oid(oid: str, txn=None) -> typing.Optional[IResource]:
     if txn is None:
         from guillotina.transactions import get_transaction
         txn = get_transaction()
-    result = txn._manager._hard_cache.get(oid, None)
-    if result is None:
-        try:
-            result = await txn._get(oid)
-        except KeyError:
-            return None
-
-    obj = reader(result)
-    obj._p_jar = txn
-    if result['parent_id']:
-        obj.__parent__ = await get_object_by_oid(result['parent_id'], txn)
+    try:
+        # object and parents loaded at once
+        records = await txn.load_with_ancestors(oid)
+    except KeyError:
+        return None
+
+    obj = None
+    for record in reversed(records):
+        parent = obj
+        obj = reader(record)
+        obj._p_jar = txn
+        if parent is not None:
+            obj.__parent__ = parent
     return obj
 
 
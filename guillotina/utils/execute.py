@@ -103,7 +103,7 @@ async def __add_to_pool(func: Callable[..., Coroutine[Any, Any, Any]],
                         request, args, kwargs):
     # make add_job async
     util = get_utility(IAsyncJobPool)
-    util.add_job(func, request=request, args=args, kwargs=kwargs)
+    await util.async_add_job(func, request=request, args=args, kwargs=kwargs)
 
 
 def in_pool(func: Callable[..., Coroutine[Any, Any, Any]],
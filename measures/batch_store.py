@@ -0,0 +1,46 @@
+from guillotina.content import create_content_in_container
+from guillotina.transactions import get_tm
+from guillotina.transactions import get_transaction
+from guillotina.utils import get_current_request
+
+import time
+import uuid
+
+
+ITERATIONS = 10
+OBJECT_COUNTS = (1, 10, 100, 1000)
+
+# ----------------------------------------------------
+# Measure commit latency against the number of objects stored
+# in one commit with and without batched multi row statements
+#
+# Lessons:
+#   - batching saves a database round trip per object on commit
+# ----------------------------------------------------
+
+
+async def runner(container, threshold, count):
+    request = get_current_request()
+    txn = get_transaction(request)
+    tm = get_tm(request)
+    await tm.abort(txn=txn)
+
+    tm._storage._store_batch_threshold = threshold
+
+    print(f'Test committing {count} items with batch threshold {threshold}')
+    elapsed = 0.0
+    for _ in range(ITERATIONS):
+        txn = await tm.begin(request=request)
+        for _ in range(count):
+            await create_content_in_container(container, 'Item', uuid.uuid4().hex)
+        start = time.time()
+        await tm.commit(txn=txn)
+        elapsed += time.time() - start
+    print(f'Done with {ITERATIONS} commits in {elapsed} seconds, '
+          f'{elapsed / ITERATIONS * 1000} ms per commit\n')
+
+
+async def run(container):
+    for count in OBJECT_COUNTS:
+        await runner(container, None, count)
+        await runner(container, 10, count)
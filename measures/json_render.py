@@ -0,0 +1,51 @@
+from guillotina.component import get_multi_adapter
+from guillotina.content import create_content
+from guillotina.interfaces import IResourceSerializeToJson
+from guillotina.interfaces import IResourceSerializeToJsonSummary
+from guillotina.renderers import json_backends
+from guillotina.tests import mocks
+from guillotina.utils import get_current_request
+
+import time
+
+
+ITERATIONS = 100
+
+# ----------------------------------------------------
+# Measure performance of encoding responses to json
+#
+# Lessons:
+#   - ujson is about twice as fast as stdlib json with the python encoder
+#     class and orjson(when installed) about six times
+# ----------------------------------------------------
+
+
+async def get_items():
+    request = get_current_request()
+    request._db_id = 'foobar'
+    ob = await create_content('Item', id='foobar', title='Foobar')
+    ob._p_jar = mocks.MockTransaction()
+    full = await get_multi_adapter((ob, request), IResourceSerializeToJson)()
+    summary = await get_multi_adapter((ob, request), IResourceSerializeToJsonSummary)()
+    return full, summary
+
+
+async def runit(name, items, size):
+    value = {
+        'items': [items] * size,
+        'total': size
+    }
+    for backend, dumps in json_backends.items():
+        start = time.time()
+        for _ in range(ITERATIONS):
+            dumps(value)
+        end = time.time()
+        print(f'{backend}: {name}, {size} items, {len(dumps(value))} bytes: '
+              f'{ITERATIONS} in {end - start} seconds')
+
+
+async def run():
+    full, summary = await get_items()
+    for size in (20, 100, 1000):
+        await runit('@items page', full, size)
+    await runit('folder summaries', summary, 1000)
@@ -0,0 +1,54 @@
+from guillotina._settings import app_settings
+from guillotina.component import get_global_components
+from guillotina.content import create_content
+from guillotina.event import notify
+from guillotina.events import ObjectLoadedEvent
+from guillotina.events import ObjectModifiedEvent
+
+import time
+
+
+ITERATIONS = 100000
+
+# ----------------------------------------------------
+# Measure throughput of notifying events to subscribers
+#
+# Lessons:
+#   - subscriptions are looked up and sorted once per type of event/object
+#     and reused until the registry changes
+#   - running subscribers concurrently adds overhead when they do not wait
+#     on io, only enable it when subscribers do network calls
+# ----------------------------------------------------
+
+
+async def runit(event_factory, concurrent=False):
+    ob = await create_content('Item', id='foobar')
+    event = event_factory(ob)
+    app_settings['concurrent_subscribers'] = concurrent
+    print(f'Test notify {event.__class__.__name__}(concurrent subscribers: {concurrent})')
+    start = time.time()
+    for _ in range(ITERATIONS):
+        await notify(event)
+    end = time.time()
+    print(f'Done with {ITERATIONS} in {end - start} seconds')
+
+
+async def run_uncached():
+    ob = await create_content('Item', id='foobar')
+    event = ObjectLoadedEvent(ob)
+    lookup = get_global_components().adapters._v_lookup
+    print('Test notify ObjectLoadedEvent computing subscriptions every time')
+    start = time.time()
+    for _ in range(ITERATIONS):
+        lookup._subscriber_plans = None
+        await notify(event)
+    end = time.time()
+    print(f'Done with {ITERATIONS} in {end - start} seconds')
+
+
+async def run():
+    await run_uncached()
+    await runit(ObjectLoadedEvent)
+    await runit(ObjectModifiedEvent)
+    await runit(ObjectModifiedEvent, concurrent=True)
+    app_settings['concurrent_subscribers'] = False
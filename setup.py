@@ -74,6 +74,12 @@ setup(
             'coverage>=4.0.3',
             'pytest-docker-fixtures'
         ],
+        'orjson': [
+            'orjson'
+        ],
+        'msgpack': [
+            'msgpack'
+        ],
         'docs': [
             'sphinx',
             'recommonmark',